@@ -0,0 +1,107 @@
+"""
+Check parity and compare latency of compiled forests against scikit-learn.
+
+Trains the power regressor on the bundled dataset and a role classifier on
+TF-IDF vectorized powers, compiles both with ``src/models/compiled_forest.py``,
+checks that predictions match the source estimators on every row, and times
+single-row and batch inference plus the artifact size on disk.
+
+Usage:
+    python benchmarks/compiled_forest.py --repeat 200
+"""
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.models.compiled_forest import CompiledForest, CompiledPowerPredictor, check_parity
+from src.models.power_predictor import PowerPredictor
+from src.models.role_predictor import RolePredictor
+from src.preprocessing.data_processor import MarvelDataProcessor
+
+
+def time_call(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def report(label, estimator, compiled, X, batch_sizes, repeat):
+    parity = check_parity(estimator, compiled, X)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        compiled.save(os.path.join(tmp, 'compiled'))
+        compiled_size = directory_size(os.path.join(tmp, 'compiled'))
+    sklearn_size = len(pickle.dumps(estimator))
+
+    print(f"{label}: parity={'ok' if parity['match'] else 'MISMATCH'} (max diff {parity['max_abs_diff']:.2e})")
+    for size in batch_sizes:
+        batch = X[:size]
+        n_repeat = max(1, repeat * 10 // (size + 9))
+        sklearn_time = time_call(lambda: estimator.predict(batch), n_repeat)
+        compiled_time = time_call(lambda: compiled.predict(batch), n_repeat)
+        print(f"  {batch.shape[0]:>6} rows: sklearn {sklearn_time * 1e3:8.3f} ms  compiled {compiled_time * 1e3:8.3f} ms "
+              f"({sklearn_time / compiled_time:.1f}x)")
+    print(f"  size: pickle {sklearn_size / 1e3:.0f} KB  compiled {compiled_size / 1e3:.0f} KB")
+    return parity['match']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark compiled forests against scikit-learn')
+    parser.add_argument('--data', default=os.path.join(project_root, 'data', 'marvel_characters_dataset.csv'))
+    parser.add_argument('--rows', type=int, default=5000, help='Rows to replicate the dataset to')
+    parser.add_argument('--repeat', type=int, default=100, help='Timed repetitions of single-row calls')
+    parser.add_argument('--batch-sizes', default='1,64,1000', help='Comma-separated batch sizes to time')
+    args = parser.parse_args()
+
+    base = MarvelDataProcessor(data_path=args.data).fill_missing().get_processed_data()
+    df = pd.concat([base] * (args.rows // len(base) + 1), ignore_index=True).iloc[:args.rows]
+    if 'Hero/Villain' not in df.columns:
+        df['Hero/Villain'] = df['Role']
+
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',')]
+    ok = True
+
+    # Power regressor on the scaled dummy features
+    power = PowerPredictor()
+    power.train(MarvelDataProcessor(df=df).estimate_power_levels().get_processed_data())
+    X = power.scaler.transform(power.encode_features(df).reindex(columns=power.feature_names, fill_value=0))
+    ok &= report('power regressor', power.model, CompiledForest.from_sklearn(power.model), X, batch_sizes, args.repeat)
+
+    compiled_power = power.compile()
+    legacy = (power.predict_power_level('Hero', 'High'), compiled_power.predict_power_level('Hero', 'High'))
+    print(f"  predict_power_level: sklearn {legacy[0]:.12f}  compiled {legacy[1]:.12f}")
+    ok &= bool(np.isclose(legacy[0], legacy[1], rtol=0, atol=1e-12))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        compiled_power.save(tmp)
+        reloaded = CompiledPowerPredictor.load(tmp)
+        ok &= bool(np.allclose(reloaded.predict(df), power.predict(df), rtol=0, atol=1e-12))
+
+    # Role classifier on sparse TF-IDF powers
+    processor = MarvelDataProcessor(df=df).vectorize_powers(min_df=1)
+    role = RolePredictor()
+    role.train(processor.get_tfidf_matrix(), df['Role'].astype(str).values)
+    tfidf = processor.get_tfidf_matrix()
+    ok &= report('role classifier', role.model, role.compile(), tfidf, batch_sizes, args.repeat)
+
+    print('All parity checks passed.' if ok else 'Parity checks FAILED.')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+"""
+Load-test the PowerVerse API and report latency percentiles.
+
+Starts the Flask or ASGI server locally (or targets ``--url``) and drives a
+weighted mix of /api/characters, /api/status and /api/predict-power (numeric
+and legacy payloads) either
+
+- closed-loop: ``--concurrency`` clients each send a request as soon as the
+  previous one returns, or
+- open-loop: requests are scheduled at a fixed ``--rate`` regardless of how
+  fast the server answers (``--max-in-flight`` caps outstanding requests).
+
+Latency percentiles cover every request, including shed (503), failed and
+timed-out ones, which count with the time they took (at most ``--timeout``),
+so the slowest requests are not dropped from the tail. They are corrected
+for coordinated omission: in open-loop mode every request is timed from its
+scheduled start, so time spent waiting behind a slow server counts. In
+closed-loop mode, given ``--expected-interval-ms`` (the interval at which a
+client would send requests), a response slower than that interval also
+records the requests that would have been sent in the meantime
+(HdrHistogram-style correction); without it closed-loop latencies are
+uncorrected. Raw service times are reported alongside the corrected values.
+
+Usage:
+    python benchmarks/load_test.py --mode asgi --concurrency 32 --duration 20 --output asgi.json
+    python benchmarks/load_test.py --mode flask --rate 200 --duration 20 --output flask.json
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --mix status=1,predict=1
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import subprocess
+import tempfile
+import time
+import urllib.parse
+
+import numpy as np
+
+from serving_modes import free_port, project_root, start_server
+
+PERCENTILES = {'p50': 50, 'p95': 95, 'p99': 99, 'p999': 99.9}
+
+DEFAULT_MIX = 'characters=1,status=4,predict=4,predict_legacy=1'
+
+ATTRIBUTES = ['strength', 'speed', 'durability', 'intelligence', 'energy_projection', 'fighting_skills']
+
+
+def parse_mix(mix):
+    """Parse 'name=weight,...' into a dict of positive weights."""
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}'. Expected one of {list(ENDPOINTS)}.")
+        weights[name] = float(weight or 1)
+    if not any(w > 0 for w in weights.values()):
+        raise ValueError("The mix needs at least one positive weight.")
+    return weights
+
+
+def _numeric_body(rng):
+    return {attr: int(rng.integers(1, 11)) for attr in ATTRIBUTES}
+
+
+def _legacy_body(rng):
+    return {
+        'heroVillain': ['Hero', 'Villain', 'Antihero'][int(rng.integers(3))],
+        'estimatedPowerLevel': ['Low', 'Medium', 'High'][int(rng.integers(3))],
+    }
+
+
+# Endpoint name -> (method, path, body factory)
+ENDPOINTS = {
+    'characters': ('GET', '/api/characters', None),
+    'status': ('GET', '/api/status', None),
+    'predict': ('POST', '/api/predict-power', _numeric_body),
+    'predict_legacy': ('POST', '/api/predict-power', _legacy_body),
+}
+
+
+def build_request(name, host, port, rng):
+    method, path, make_body = ENDPOINTS[name]
+    body = json.dumps(make_body(rng)).encode('utf-8') if make_body else None
+    lines = [f'{method} {path} HTTP/1.1', f'Host: {host}:{port}', 'Connection: close']
+    if body is not None:
+        lines += ['Content-Type: application/json', f'Content-Length: {len(body)}']
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('ascii') + (body or b'')
+
+
+async def send(host, port, payload, timeout):
+    """Send one request and return its HTTP status (0 on connection errors and timeouts)."""
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        writer.write(payload)
+        await writer.drain()
+        # Reading to EOF also consumes chunked (streamed) bodies
+        response = await asyncio.wait_for(reader.read(), timeout)
+        return int(response[9:12]) if response.startswith(b'HTTP/') else 0
+    except (OSError, asyncio.TimeoutError, ValueError):
+        return 0
+    finally:
+        # Also on timeouts and errors, so failed requests do not leak sockets
+        if writer is not None:
+            writer.close()
+
+
+class Recorder:
+    """Collects (endpoint, status, scheduled, sent, finished) samples."""
+
+    def __init__(self, measure_from):
+        self.measure_from = measure_from
+        self.samples = []
+
+    def record(self, name, status, scheduled, sent, finished):
+        if scheduled >= self.measure_from:
+            self.samples.append((name, status, scheduled, sent, finished))
+
+
+async def closed_loop(host, port, names, cdf, concurrency, deadline, recorder, timeout, seed):
+    async def client(index):
+        rng = np.random.default_rng([seed, index])
+        while time.perf_counter() < deadline:
+            name = names[int(np.searchsorted(cdf, rng.random(), side='right'))]
+            payload = build_request(name, host, port, rng)
+            start = time.perf_counter()
+            status = await send(host, port, payload, timeout)
+            recorder.record(name, status, start, start, time.perf_counter())
+
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+
+
+async def open_loop(host, port, names, cdf, rate, start, deadline, max_in_flight, recorder, timeout, seed):
+    rng = np.random.default_rng(seed)
+    slots = asyncio.Semaphore(max_in_flight)
+    tasks = set()
+
+    async def issue(name, payload, scheduled):
+        try:
+            sent = time.perf_counter()
+            status = await send(host, port, payload, timeout)
+            recorder.record(name, status, scheduled, sent, time.perf_counter())
+        finally:
+            slots.release()
+
+    i = 0
+    while True:
+        scheduled = start + i / rate
+        if scheduled >= deadline:
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # When the cap is reached we fall behind schedule; the lag counts
+        # towards latency because it is measured from the scheduled time
+        await slots.acquire()
+        name = names[int(np.searchsorted(cdf, rng.random(), side='right'))]
+        task = asyncio.create_task(issue(name, build_request(name, host, port, rng), scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        i += 1
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+def corrected_latencies(latencies, expected_interval):
+    """
+    HdrHistogram-style coordinated-omission correction: a latency L longer
+    than the expected interval I also records L - I, L - 2I, ... down to I.
+    """
+    if expected_interval is None or expected_interval <= 0:
+        return latencies
+    extra = []
+    for latency in latencies[latencies > expected_interval]:
+        extra.append(np.arange(latency - expected_interval, expected_interval - 1e-12, -expected_interval))
+    return np.concatenate([latencies] + extra) if extra else latencies
+
+
+def summarize(samples, duration, open_loop_mode, expected_interval):
+    """Throughput, error counts and raw/corrected percentiles (ms)."""
+    if not samples:
+        return {'requests': 0, 'ok': 0, 'shed': 0, 'errors': 0, 'throughputRps': 0.0}
+
+    status = np.array([s[1] for s in samples])
+    scheduled = np.array([s[2] for s in samples])
+    sent = np.array([s[3] for s in samples])
+    finished = np.array([s[4] for s in samples])
+    ok = (status >= 200) & (status < 300)
+
+    # Failed and timed-out requests stay in the distribution at the time
+    # they took; leaving them out would hide the slowest requests
+    service = finished - sent
+    if open_loop_mode:
+        corrected = finished - scheduled
+    else:
+        corrected = corrected_latencies(service, expected_interval)
+
+    def percentiles(values):
+        if len(values) == 0:
+            return None
+        result = {key: float(np.percentile(values, q) * 1000) for key, q in PERCENTILES.items()}
+        result['max'] = float(values.max() * 1000)
+        result['mean'] = float(values.mean() * 1000)
+        return result
+
+    return {
+        'requests': int(len(samples)),
+        'ok': int(ok.sum()),
+        'shed': int((status == 503).sum()),
+        'errors': int((~ok & (status != 503)).sum()),
+        'failedOrTimedOut': int((status == 0).sum()),
+        'throughputRps': float(ok.sum() / duration),
+        'latencyMs': percentiles(corrected),
+        'serviceTimeMs': percentiles(service),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=project_root,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(host, port, args):
+    weights = parse_mix(args.mix)
+    names = [name for name, weight in weights.items() if weight > 0]
+    cdf = np.cumsum([weights[name] for name in names])
+    cdf /= cdf[-1]
+
+    async def drive():
+        start = time.perf_counter()
+        deadline = start + args.warmup + args.duration
+        recorder = Recorder(start + args.warmup)
+        if args.rate:
+            await open_loop(host, port, names, cdf, args.rate, start, deadline, args.max_in_flight,
+                            recorder, args.timeout, args.seed)
+        else:
+            await closed_loop(host, port, names, cdf, args.concurrency, deadline, recorder,
+                              args.timeout, args.seed)
+        return recorder.samples
+
+    samples = asyncio.run(drive())
+
+    # Only an interval chosen independently of the run corrects anything:
+    # one derived from the measured service times would add synthetic
+    # samples to about half of the requests by construction
+    expected_interval = None
+    if not args.rate and args.expected_interval_ms is not None:
+        expected_interval = args.expected_interval_ms / 1000
+
+    report = {
+        'overall': summarize(samples, args.duration, bool(args.rate), expected_interval),
+        'endpoints': {
+            name: summarize([s for s in samples if s[0] == name], args.duration, bool(args.rate), expected_interval)
+            for name in names
+        },
+        'expectedIntervalMs': None if expected_interval is None else expected_interval * 1000,
+        'coordinatedOmissionCorrected': bool(args.rate) or expected_interval is not None,
+    }
+    return report
+
+
+def print_report(report):
+    def line(label, result):
+        latency = result.get('latencyMs')
+        if not latency:
+            return f"{label:>15}: {result['requests']:7d} req  no responses"
+        return (f"{label:>15}: {result['throughputRps']:8.1f} req/s  "
+                + '  '.join(f"{key}={latency[key]:.1f}ms" for key in PERCENTILES)
+                + f"  shed={result['shed']} errors={result['errors']}")
+
+    if not report['coordinatedOmissionCorrected']:
+        print("Closed-loop latencies are not corrected for coordinated omission; "
+              "pass --expected-interval-ms or use --rate")
+    print(line('overall', report['overall']))
+    for name, result in report['endpoints'].items():
+        print(line(name, result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the PowerVerse API')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--mode', choices=['flask', 'asgi'], default='flask', help='Server to start locally')
+    target.add_argument('--url', help='Target an already running server instead')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Endpoint weights (default: {DEFAULT_MIX})")
+    parser.add_argument('--concurrency', type=int, default=16, help='Closed-loop clients')
+    parser.add_argument('--rate', type=float, help='Open-loop arrival rate in requests/s')
+    parser.add_argument('--max-in-flight', type=int, default=1000, help='Open-loop cap on outstanding requests')
+    parser.add_argument('--duration', type=float, default=10.0, help='Measured seconds')
+    parser.add_argument('--warmup', type=float, default=2.0, help='Seconds excluded from the results')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds')
+    parser.add_argument('--expected-interval-ms', type=float,
+                        help='Closed-loop correction interval: the intended time between one '
+                             "client's requests (default: no correction)")
+    parser.add_argument('--data', help='Dataset for the local server (POWERVERSE_DATA_PATH)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    process = None
+    if args.url:
+        parsed = urllib.parse.urlparse(args.url)
+        host, port = parsed.hostname, parsed.port or 80
+        target_label = args.url
+    else:
+        env = dict(os.environ)
+        # Keep load-test predictions out of the real data directory
+        env['POWERVERSE_STORAGE_DIR'] = tempfile.mkdtemp(prefix='powerverse-load-')
+        if args.data:
+            env['POWERVERSE_DATA_PATH'] = os.path.abspath(args.data)
+        host, port = '127.0.0.1', free_port()
+        process = start_server(args.mode, port, env)
+        target_label = args.mode
+
+    try:
+        report = run(host, port, args)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    report = {
+        'target': target_label,
+        'commit': git_commit(),
+        'timestamp': datetime.datetime.now().isoformat(),
+        'config': vars(args),
+        'loop': 'open' if args.rate else 'closed',
+        **report,
+    }
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Compare micro-batched and per-request power predictions under concurrency.
+
+Trains and compiles the power predictor on the bundled dataset, then has
+``--concurrency`` threads each issue single legacy predictions for
+``--duration`` seconds, first calling ``predict_power_level`` directly (one
+model pass per request) and then through a ``MicroBatcher``. Every batched
+result is checked against the direct prediction of the same input, and the
+throughput, latency and batch size / queue wait metrics are reported.
+
+Batching pays off most for the scikit-learn model (``--sklearn``), whose
+per-call overhead dominates a single prediction. The compiled predictor the
+service uses is already cheap per call; with it a shorter window (down to
+``--max-wait-ms 0``, which only batches what queued during the previous
+call) gives the best throughput.
+
+Usage:
+    python benchmarks/micro_batching.py --concurrency 32 --duration 5 --max-wait-ms 2 --sklearn
+    python benchmarks/micro_batching.py --concurrency 4 --max-wait-ms 0
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.models.batching import MicroBatcher
+from src.models.power_predictor import PowerPredictor
+from src.preprocessing.data_processor import MarvelDataProcessor
+
+INPUTS = [(role, tier) for role in ('Hero', 'Villain', 'Antihero') for tier in ('Low', 'Medium', 'High')]
+
+
+def drive(predict, concurrency, duration, seed):
+    """Call ``predict(pair)`` from ``concurrency`` threads; return latencies and results."""
+    latencies = [[] for _ in range(concurrency)]
+    results = [[] for _ in range(concurrency)]
+    deadline = time.perf_counter() + duration
+
+    def client(index):
+        rng = np.random.default_rng(seed + index)
+        while time.perf_counter() < deadline:
+            pair = INPUTS[int(rng.integers(len(INPUTS)))]
+            start = time.perf_counter()
+            value = predict(pair)
+            latencies[index].append(time.perf_counter() - start)
+            results[index].append((pair, value))
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return np.concatenate([np.array(values) for values in latencies]) * 1000, \
+        [item for part in results for item in part], elapsed
+
+
+def report(label, latencies, elapsed):
+    print(f"{label:>8}: {len(latencies) / elapsed:9.0f} predictions/s  "
+          f"p50={np.percentile(latencies, 50):.2f}ms  p99={np.percentile(latencies, 99):.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark micro-batched power predictions')
+    parser.add_argument('--data', default=os.path.join(project_root, 'data', 'Marvels - 2 (1).csv'))
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=1.0)
+    parser.add_argument('--sklearn', action='store_true', help='Serve the scikit-learn model instead of the compiled one')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    processor = MarvelDataProcessor(data_path=args.data).fill_missing().label_power_levels_from_alignment()
+    predictor = PowerPredictor()
+    predictor.train(processor.get_processed_data())
+    if not args.sklearn:
+        predictor = predictor.compile()
+    expected = {pair: predictor.predict_power_level(*pair) for pair in INPUTS}
+
+    latencies, _, elapsed = drive(lambda pair: predictor.predict_power_level(*pair),
+                                  args.concurrency, args.duration, args.seed)
+    report('direct', latencies, elapsed)
+    direct_throughput = len(latencies) / elapsed
+
+    batcher = MicroBatcher(lambda items: predictor.predict_power_levels(*zip(*items)),
+                           max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    latencies, results, elapsed = drive(batcher.submit, args.concurrency, args.duration, args.seed)
+    report('batched', latencies, elapsed)
+    print(f"Speedup: {len(latencies) / elapsed / direct_throughput:.2f}x")
+
+    stats = batcher.stats()
+    print(f"Batches: {stats['batches']}, mean size {stats['meanBatchSize']:.1f}, "
+          f"p99 size {stats['batchSize']['p99']:.0f}, queue wait p50 {stats['queueWaitMs']['p50']:.2f}ms "
+          f"p99 {stats['queueWaitMs']['p99']:.2f}ms")
+
+    mismatches = sum(not np.isclose(value, expected[pair], rtol=0, atol=1e-12) for pair, value in results)
+    if mismatches:
+        sys.exit(f"{mismatches} batched predictions differ from direct predictions")
+    print('Batched predictions identical to direct predictions')
+
+
+if __name__ == '__main__':
+    main()
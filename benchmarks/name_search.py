@@ -0,0 +1,70 @@
+"""
+Time building and querying the trigram name index.
+
+Generates a synthetic dataset with ``src/preprocessing/synthetic.py``, builds
+the index behind /api/search, then times queries derived from random names:
+the exact name, a 4-character prefix, an inner substring, a one-character
+typo and the first word. Typo queries are checked to find the name they were
+made from.
+
+Usage:
+    python benchmarks/name_search.py --rows 1000000 --queries 200
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.preprocessing.name_index import NameIndex
+from src.preprocessing.synthetic import SyntheticDatasetGenerator
+
+QUERY_KINDS = {
+    'exact': lambda name: name,
+    'prefix': lambda name: name[:4],
+    'substring': lambda name: name[2:8],
+    'typo': lambda name: name[:3] + name[4:],
+    'word': lambda name: name.split()[0],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the trigram name index')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=200, help='Names sampled per query kind')
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    df = SyntheticDatasetGenerator(args.rows, seed=args.seed).to_dataframe()
+    start = time.perf_counter()
+    index = NameIndex.build(df)
+    print(f"Built index over {args.rows} rows ({len(index.terms)} terms) in {time.perf_counter() - start:.1f}s")
+
+    rng = np.random.default_rng(args.seed)
+    rows = rng.choice(len(df), size=min(args.queries, len(df)), replace=False)
+    names = df['Character'].to_numpy()[rows]
+
+    missed = 0
+    for kind, make_query in QUERY_KINDS.items():
+        latencies = []
+        for name in names:
+            query = make_query(name)
+            begin = time.perf_counter()
+            results = index.search(query, limit=args.limit)
+            latencies.append(time.perf_counter() - begin)
+            if kind == 'typo' and len(name) > 4 and not any(r['name'] == name for r in results):
+                missed += 1
+        latencies = np.array(latencies) * 1000
+        print(f"{kind:>10}: p50={np.percentile(latencies, 50):.2f}ms  p95={np.percentile(latencies, 95):.2f}ms"
+              f"  max={latencies.max():.2f}ms")
+
+    print(f"Typo queries that missed their source name: {missed}/{len(names)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Compare incremental affiliation network updates with full rebuilds.
+
+Builds the network of a synthetic dataset (``src/preprocessing/synthetic.py``),
+warms the cached degree ranking and components, then applies a random
+stream of character additions, removals, affiliation changes and role
+updates through the incremental API. The same changes are applied to a
+plain copy of the data, and the final network is checked against a full
+rebuild of that copy (nodes, edges, groups and cached analytics).
+
+Usage:
+    python benchmarks/network_updates.py --rows 20000 --updates 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.preprocessing.synthetic import SyntheticDatasetGenerator
+from src.visualization.network_visualizer import MarvelNetworkVisualizer
+
+OPERATIONS = ('add', 'remove', 'change_affiliation', 'update_role')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark incremental affiliation network updates')
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--affiliations', type=int, default=2000)
+    parser.add_argument('--updates', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    df = SyntheticDatasetGenerator(args.rows, seed=args.seed, n_affiliations=args.affiliations).to_dataframe()
+    df = df.drop_duplicates('Character')
+    df['Estimated_Power_Level'] = df['Power Level']
+    affiliations = df['Affiliation'].unique()
+    roles = df['Role'].unique()
+
+    start = time.perf_counter()
+    visualizer = MarvelNetworkVisualizer(df).create_affiliation_network(compute_layout=False)
+    rebuild_seconds = time.perf_counter() - start
+    print(f"Full build: {visualizer.graph.number_of_nodes()} nodes, {visualizer.graph.number_of_edges()} edges "
+          f"in {rebuild_seconds:.2f}s")
+    visualizer.get_most_connected_characters(10)
+    visualizer.analytics.connected_components()
+
+    # Reference copy of the data the updates are mirrored into
+    rows = {row['Character']: row for row in df[['Character', 'Role', 'Affiliation', 'Estimated_Power_Level']]
+            .to_dict('records')}
+    rng = np.random.default_rng(args.seed)
+    timings = {operation: [] for operation in OPERATIONS}
+    for i in range(args.updates):
+        operation = OPERATIONS[int(rng.integers(len(OPERATIONS)))]
+        names = list(rows) if operation != 'add' else None
+        if operation == 'add':
+            name = f'new character {i}'
+            affiliation = affiliations[int(rng.integers(len(affiliations)))]
+            role = roles[int(rng.integers(len(roles)))]
+            begin = time.perf_counter()
+            visualizer.add_character(name, role=role, affiliation=affiliation, power_level='Low')
+            rows[name] = {'Character': name, 'Role': role, 'Affiliation': affiliation, 'Estimated_Power_Level': 'Low'}
+        else:
+            name = names[int(rng.integers(len(names)))]
+            begin = time.perf_counter()
+            if operation == 'remove':
+                visualizer.remove_character(name)
+                del rows[name]
+            elif operation == 'change_affiliation':
+                affiliation = affiliations[int(rng.integers(len(affiliations)))]
+                visualizer.change_affiliation(name, affiliation)
+                rows[name]['Affiliation'] = affiliation
+            else:
+                role = roles[int(rng.integers(len(roles)))]
+                visualizer.update_character(name, role=role)
+                rows[name]['Role'] = role
+        timings[operation].append(time.perf_counter() - begin)
+        if i % 50 == 0:
+            # Keep the cached analytics in use while updating
+            visualizer.get_most_connected_characters(10)
+
+    for operation, values in timings.items():
+        if values:
+            values = np.array(values) * 1000
+            print(f"{operation:>18}: {len(values):5d} updates  p50={np.percentile(values, 50):.3f}ms  "
+                  f"p99={np.percentile(values, 99):.3f}ms")
+    total = sum(sum(values) for values in timings.values())
+    print(f"{args.updates} incremental updates took {total:.2f}s; rebuilding after each would take about "
+          f"{rebuild_seconds * args.updates:.0f}s")
+
+    problems = visualizer.check_consistency(pd.DataFrame(list(rows.values())))
+    if problems:
+        sys.exit('Inconsistent with a full rebuild: ' + '; '.join(problems))
+    print('Network and cached analytics match a full rebuild')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Time the parallel MarvelDataProcessor stages over 1..N worker processes.
+
+Generates a synthetic dataset with ``src/preprocessing/synthetic.py`` and
+runs ``clean_data``, ``estimate_power_levels`` and ``vectorize_powers`` with
+``n_jobs`` from 1 (serial) up to ``--max-jobs``. Every parallel run is
+checked against the serial one: the cleaned frame, the power level column,
+the vocabulary and the TF-IDF arrays must be identical, otherwise the
+script exits with an error.
+
+Usage:
+    python benchmarks/preprocessing_scaling.py --rows 500000 --max-jobs 8
+    python benchmarks/preprocessing_scaling.py --rows 20000 --max-jobs 4 --min-df 2 --max-features 500
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.preprocessing.data_processor import MarvelDataProcessor
+from src.preprocessing.synthetic import SyntheticDatasetGenerator
+
+STAGES = ('clean_data', 'estimate_power_levels', 'vectorize_powers')
+
+
+def run_stages(df, n_jobs, min_df, max_features):
+    """Run the stages on a copy of ``df``; return the processor and stage timings."""
+    processor = MarvelDataProcessor(df=df, n_jobs=n_jobs)
+    timings = {}
+    for stage in STAGES:
+        kwargs = {'min_df': min_df, 'max_features': max_features} if stage == 'vectorize_powers' else {}
+        start = time.perf_counter()
+        getattr(processor, stage)(**kwargs)
+        timings[stage] = time.perf_counter() - start
+    return processor, timings
+
+
+def check_equivalent(serial, parallel):
+    """Return a list of differences between a serial and a parallel run."""
+    problems = []
+    if not serial.df.equals(parallel.df) or not (serial.df.dtypes == parallel.df.dtypes).all():
+        problems.append('processed frame differs')
+    if not np.array_equal(serial.feature_names, parallel.feature_names):
+        problems.append('vocabulary differs')
+    for name in ('data', 'indices', 'indptr', 'idf'):
+        if not np.array_equal(getattr(serial.tfidf, name), getattr(parallel.tfidf, name)):
+            problems.append(f'TF-IDF {name} differs')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark parallel preprocessing over 1..N workers')
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--max-jobs', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--min-df', type=int, default=2)
+    parser.add_argument('--max-features', type=int)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    df = SyntheticDatasetGenerator(args.rows, seed=args.seed).to_dataframe()
+    print(f"{args.rows} rows, {os.cpu_count()} CPUs")
+    print(f"{'jobs':>4}  " + '  '.join(f"{stage:>22}" for stage in STAGES) + f"  {'total':>8}  {'speedup':>7}")
+
+    serial = None
+    serial_total = None
+    failed = False
+    for n_jobs in range(1, args.max_jobs + 1):
+        processor, timings = run_stages(df, n_jobs, args.min_df, args.max_features)
+        total = sum(timings.values())
+        if serial is None:
+            serial, serial_total = processor, total
+            problems = []
+        else:
+            problems = check_equivalent(serial, processor)
+        print(f"{n_jobs:>4}  " + '  '.join(f"{timings[stage]:>21.2f}s" for stage in STAGES)
+              + f"  {total:>7.2f}s  {serial_total / total:>6.2f}x"
+              + (f"  MISMATCH: {', '.join(problems)}" if problems else ''))
+        failed = failed or bool(problems)
+
+    if failed:
+        sys.exit('Parallel results differ from serial mode')
+    print('Parallel results identical to serial mode')
+
+
+if __name__ == '__main__':
+    main()
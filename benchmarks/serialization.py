@@ -0,0 +1,48 @@
+"""
+Measure payload size and encode time of the /api/characters formats.
+
+The bundled dataset is replicated to the requested row count and encoded
+with the previous approach (``to_dict(orient='records')`` + stdlib json) and
+with each streaming format from ``src/utils/serialization.py``.
+
+Usage:
+    python benchmarks/serialization.py --rows 500000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.utils.serialization import available_formats, iter_frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark character serialization formats')
+    parser.add_argument('--data', default=os.path.join(project_root, 'data', 'marvel_characters_dataset.csv'))
+    parser.add_argument('--rows', type=int, default=200000, help='Number of rows to encode')
+    args = parser.parse_args()
+
+    base = pd.read_csv(args.data).fillna('')
+    df = pd.concat([base] * (args.rows // len(base) + 1), ignore_index=True).iloc[:args.rows]
+
+    start = time.perf_counter()
+    baseline = json.dumps(df.to_dict(orient='records')).encode('utf-8')
+    baseline_time = time.perf_counter() - start
+    print(f"{'records+stdlib':>15}: {baseline_time * 1000:9.1f} ms  {len(baseline) / 1e6:8.2f} MB")
+
+    for fmt in available_formats():
+        start = time.perf_counter()
+        size = sum(len(chunk) for chunk in iter_frame(df, fmt))
+        elapsed = time.perf_counter() - start
+        print(f"{fmt:>15}: {elapsed * 1000:9.1f} ms  {size / 1e6:8.2f} MB  "
+              f"({baseline_time / elapsed:.1f}x faster, {size / len(baseline):.0%} of baseline size)")
+
+
+if __name__ == '__main__':
+    main()
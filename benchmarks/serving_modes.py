@@ -0,0 +1,167 @@
+"""
+Compare concurrent-connection throughput of the Flask and ASGI serving modes.
+
+Each mode is started in its own subprocess. A pool of asyncio clients then
+hammers /api/status and /api/predict-power. A configurable fraction of the
+clients behaves like a slow mobile connection: it trickles the request out in
+two halves separated by a delay, holding a connection open the whole time.
+
+Usage:
+    python benchmarks/serving_modes.py --concurrency 200 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PREDICT_BODY = json.dumps({
+    'strength': 8, 'speed': 7, 'durability': 9,
+    'intelligence': 10, 'energy_projection': 8, 'fighting_skills': 6
+}).encode('utf-8')
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def server_command(mode, port):
+    if mode == 'flask':
+        return [sys.executable, os.path.join(project_root, 'src', 'api.py'), '--port', str(port), '--max-attempts', '1']
+    return [sys.executable, '-m', 'uvicorn', 'src.asgi:app', '--host', '127.0.0.1',
+            '--port', str(port), '--log-level', 'warning']
+
+
+def start_server(mode, port, env, timeout=120):
+    """
+    Start a server subprocess and wait until /api/status answers and the
+    background training of the power model has finished.
+    """
+    process = subprocess.Popen(
+        server_command(mode, port), cwd=project_root, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{mode} server exited with code {process.returncode}")
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/api/status', timeout=1) as response:
+                status = json.loads(response.read())
+            if status.get('ready', True) or status.get('modelState') == 'idle':
+                return process
+        except OSError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{mode} server did not become ready within {timeout}s")
+
+
+def build_request(path, port, body=None):
+    method = 'POST' if body is not None else 'GET'
+    lines = [f'{method} {path} HTTP/1.1', f'Host: 127.0.0.1:{port}', 'Connection: close']
+    if body is not None:
+        lines += ['Content-Type: application/json', f'Content-Length: {len(body)}']
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('ascii') + (body or b'')
+
+
+async def client(port, deadline, slow, slow_delay, results, index):
+    requests = [build_request('/api/status', port), build_request('/api/predict-power', port, PREDICT_BODY)]
+    sent = index
+    while time.perf_counter() < deadline:
+        payload = requests[sent % len(requests)]
+        sent += 1
+        start = time.perf_counter()
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            if slow:
+                # Trickle the request like a slow mobile client
+                half = len(payload) // 2
+                writer.write(payload[:half])
+                await writer.drain()
+                await asyncio.sleep(slow_delay)
+                writer.write(payload[half:])
+            else:
+                writer.write(payload)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            ok = response.startswith(b'HTTP/1.1 200') or response.startswith(b'HTTP/1.0 200')
+        except OSError:
+            ok = False
+        latency = time.perf_counter() - start
+        if ok:
+            results['latencies'].append(latency)
+        else:
+            results['errors'] += 1
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+async def drive(port, concurrency, duration, slow_fraction, slow_delay):
+    results = {'latencies': [], 'errors': 0}
+    deadline = time.perf_counter() + duration
+    n_slow = int(concurrency * slow_fraction)
+    await asyncio.gather(*(
+        client(port, deadline, i < n_slow, slow_delay, results, i) for i in range(concurrency)
+    ))
+    latencies = results['latencies']
+    return {
+        'requests': len(latencies),
+        'errors': results['errors'],
+        'throughput_rps': len(latencies) / duration,
+        'p50_ms': None if not latencies else percentile(latencies, 50) * 1000,
+        'p99_ms': None if not latencies else percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Flask vs ASGI serving modes')
+    parser.add_argument('--modes', default='flask,asgi', help='Comma-separated modes to run')
+    parser.add_argument('--concurrency', type=int, default=100, help='Concurrent client connections')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds to drive each mode')
+    parser.add_argument('--slow-fraction', type=float, default=0.5, help='Fraction of slow clients')
+    parser.add_argument('--slow-delay', type=float, default=0.2, help='Seconds a slow client pauses mid-request')
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    # Keep benchmark predictions out of the real data directory
+    env['POWERVERSE_STORAGE_DIR'] = tempfile.mkdtemp(prefix='powerverse-bench-')
+
+    report = {'config': vars(args), 'results': {}}
+    for mode in args.modes.split(','):
+        port = free_port()
+        process = start_server(mode, port, env)
+        try:
+            result = asyncio.run(drive(port, args.concurrency, args.duration, args.slow_fraction, args.slow_delay))
+        finally:
+            process.terminate()
+            process.wait()
+        report['results'][mode] = result
+        p50 = 'n/a' if result['p50_ms'] is None else f"{result['p50_ms']:.1f}ms"
+        p99 = 'n/a' if result['p99_ms'] is None else f"{result['p99_ms']:.1f}ms"
+        print(f"{mode:>6}: {result['throughput_rps']:8.1f} req/s  p50={p50}  p99={p99}  errors={result['errors']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,161 +1,183 @@
-import pandas as pd
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import os
 import sys
-import json
-import datetime
 import socket
-from urllib.parse import quote as url_quote
+import argparse
+import functools
 
 # Add the project root to the Python path to import from src
 script_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(script_dir) # Go up one level from 'src'
 sys.path.append(project_root)
 
-# Import the power predictor model
-from src.models.power_predictor import PowerPredictor
+# The service layer owns the dataset, model and caches shared with src/asgi.py
+from src.service import ServiceError, choose_format, get_service, parse_bool
+from src.utils import serialization
+from src.utils.admission import AdmissionController, AdmissionRejected, admission_config_from_env
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider that encodes responses with the fast serializer."""
+
+    def dumps(self, obj, **kwargs):
+        return serialization.dumps(obj).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(serialization.dumps(obj), mimetype=self.mimetype)
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)  # Enable CORS for all routes
 
-# Construct the absolute path to the CSV file
-marvel_data_path = os.path.join(project_root, 'data', 'Marvels - 2 (1).csv')
+service = get_service()
 
-# Load the dataset
-try:
-    df = pd.read_csv(marvel_data_path)
-    # Basic data cleaning: fill NaN values with empty strings or appropriate defaults
-    df.fillna('', inplace=True)
-    print(f"Successfully loaded Marvel dataset with {len(df)} characters")
-except FileNotFoundError:
-    print(f"Error: Could not find the dataset at {marvel_data_path}")
-    df = pd.DataFrame() # Create an empty DataFrame if file not found
+# Limits concurrent CPU-bound prediction requests; /api/status is never limited
+admission = AdmissionController(**admission_config_from_env(service.prediction_batcher.max_batch_size))
 
-# Initialize the power predictor model
-power_predictor = PowerPredictor()
+def admission_controlled(view):
+    """Run a view under admission control, answering 503 when shed."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            admission.acquire()
+        except AdmissionRejected as e:
+            response = jsonify({"error": e.reason})
+            response.status_code = 503
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+        try:
+            return view(*args, **kwargs)
+        finally:
+            admission.release()
+    return wrapper
 
-# Train the model if data is available
-if not df.empty:
-    try:
-        # Add a temporary Estimated_Power_Level column for training
-        # In a real app, this would come from actual data
-        df['Estimated_Power_Level'] = 'Medium'  # Default value
-        df.loc[df['Hero/Villain'].str.contains('Hero', na=False), 'Estimated_Power_Level'] = 'High'
-        df.loc[df['Hero/Villain'].str.contains('Villain', na=False), 'Estimated_Power_Level'] = 'Medium'
-        
-        # Train the model
-        metrics = power_predictor.train(df)
-        print(f"Power predictor model trained successfully. R² score: {metrics['r2']:.2f}")
-    except Exception as e:
-        print(f"Error training power predictor model: {e}")
+@app.errorhandler(ServiceError)
+def handle_service_error(e):
+    """Turn service errors into JSON error responses."""
+    return jsonify({"error": e.message}), e.status
 
 @app.route('/api/characters', methods=['GET'])
 def get_characters():
-    """API endpoint to get all character data."""
-    if df.empty:
-        return jsonify({"error": "Character data not loaded or file not found."}), 500
+    """API endpoint to get all character data.
     
-    # Convert DataFrame to a list of dictionaries (JSON serializable)
-    characters_list = df.to_dict(orient='records')
-    return jsonify(characters_list)
-
-# Create a directory for storing fetched data
-data_storage_dir = os.path.join(project_root, 'data', 'fetched_data')
-os.makedirs(data_storage_dir, exist_ok=True)
-
-# Function to store fetched data
-def store_fetched_data(data_source, data):
-    """Store fetched data with timestamp for future use"""
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{data_source}_{timestamp}.json"
-    filepath = os.path.join(data_storage_dir, filename)
-    
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=2)
-    
-    print(f"Stored fetched data from {data_source} at {filepath}")
-    return filepath
+    Supports JSON records (default), columnar JSON and MessagePack through the
+    Accept header or ?format=, and streams the body in chunks.
+    """
+    fmt = choose_format(request.args.get('format'), request.headers.get('Accept'))
+    frame = service.characters_frame()
+    return Response(serialization.iter_frame(frame, fmt), mimetype=serialization.MEDIA_TYPES[fmt])
+
+@app.route('/api/charts', methods=['GET'])
+def list_charts():
+    """API endpoint to list the charts that can be rendered."""
+    return jsonify(service.list_charts())
+
+@app.route('/api/charts/<chart_name>', methods=['GET'])
+def get_chart(chart_name):
+    """API endpoint to render (or serve a cached) chart image."""
+    image, mimetype = service.render_chart(chart_name, request.args.get('format', 'png'), request.args.to_dict())
+    return Response(image, mimetype=mimetype, headers={"Cache-Control": "public, max-age=3600"})
+
+@app.route('/api/charts/render', methods=['POST'])
+def render_charts():
+    """API endpoint to pre-render the whole chart set in parallel."""
+    data = request.get_json(silent=True) or {}
+    return jsonify(service.render_charts(data.get('charts'), data.get('format', 'png')))
+
+@app.route('/api/network/summary', methods=['GET'])
+def network_summary():
+    """API endpoint for headline statistics of the affiliation network."""
+    return jsonify(service.network_summary())
+
+@app.route('/api/network/centrality/<metric>', methods=['GET'])
+def network_centrality(metric):
+    """API endpoint for degree, betweenness or closeness rankings."""
+    return jsonify(service.network_centrality(
+        metric,
+        request.args.get('top_n', 10, type=int),
+        parse_bool(request.args.get('approximate'))
+    ))
+
+@app.route('/api/network/components', methods=['GET'])
+def network_components():
+    """API endpoint for the connected components of the network."""
+    return jsonify(service.network_components())
+
+@app.route('/api/network/communities', methods=['GET'])
+def network_communities():
+    """API endpoint for detected character communities."""
+    return jsonify(service.network_communities(request.args.get('method', 'louvain')))
+
+@app.route('/api/compare', methods=['GET'])
+def compare_characters():
+    """API endpoint to compare characters, e.g. /api/compare?names=Thor,Loki"""
+    return jsonify(service.compare(request.args.get('names')))
+
+@app.route('/api/search', methods=['GET'])
+def search_characters():
+    """API endpoint for typo-tolerant name search, e.g. /api/search?q=spidr"""
+    return jsonify(service.search(
+        request.args.get('q'),
+        request.args.get('limit', 10),
+        request.args.get('mode', 'auto'),
+    ))
+
+@app.route('/api/powers/search', methods=['GET'])
+def search_powers():
+    """API endpoint for BM25 powers search, e.g. /api/powers/search?q="energy manipulation"&role=Hero"""
+    return jsonify(service.search_powers(request.args))
+
+@app.route('/api/predictions/stats', methods=['GET'])
+def prediction_stats():
+    """API endpoint for aggregates over the compacted prediction history."""
+    return jsonify(service.prediction_stats(request.args))
 
 @app.route('/api/status', methods=['GET'])
 def api_status():
     """API endpoint to check backend connectivity"""
-    return jsonify({
-        "status": "online",
-        "timestamp": datetime.datetime.now().isoformat(),
-        "dataLoaded": not df.empty,
-        "characterCount": len(df) if not df.empty else 0
-    })
+    return jsonify(service.status())
+
+@app.route('/api/admission', methods=['GET'])
+def admission_stats():
+    """API endpoint exposing in-flight, queued and shed request counts."""
+    return jsonify(admission.stats())
+
+@app.route('/api/model', methods=['GET'])
+def model_status():
+    """API endpoint reporting readiness and the served and previous model versions."""
+    return jsonify(service.model_status())
+
+@app.route('/api/model/retrain', methods=['POST'])
+def retrain_model():
+    """Queue a background retrain of the power model (admin token required)."""
+    return jsonify(service.retrain_model(request.headers.get('Authorization'))), 202
+
+@app.route('/api/model/rollback', methods=['POST'])
+def rollback_model():
+    """Serve the previous power model again (admin token required)."""
+    return jsonify(service.rollback_model(request.headers.get('Authorization')))
+
+@app.route('/api/batching', methods=['GET'])
+def batching_stats():
+    """API endpoint exposing prediction batch sizes and queue waits."""
+    return jsonify(service.prediction_batching_stats())
 
 @app.route('/api/predict-power', methods=['POST'])
+@admission_controlled
 def predict_power():
     """Predict power level based on character attributes."""
+    data = request.get_json(silent=True)
+    result = service.predict_power(data)
+
+    # Store the prediction request and result
     try:
-        data = request.get_json()
-        
-        # Check if we have numerical attributes (new format)
-        if all(key in data for key in ['strength', 'speed', 'durability', 'intelligence', 'energy_projection', 'fighting_skills']):
-            # Calculate power level from numerical attributes
-            attributes = {
-                'strength': data.get('strength', 5),
-                'speed': data.get('speed', 5),
-                'durability': data.get('durability', 5),
-                'intelligence': data.get('intelligence', 5),
-                'energy_projection': data.get('energy_projection', 5),
-                'fighting_skills': data.get('fighting_skills', 5)
-            }
-            
-            # Calculate weighted average (intelligence and strength have higher weight)
-            weights = {
-                'strength': 1.2,
-                'speed': 1.0,
-                'durability': 1.1,
-                'intelligence': 1.3,
-                'energy_projection': 1.1,
-                'fighting_skills': 0.9
-            }
-            
-            weighted_sum = sum(attributes[attr] * weights[attr] for attr in attributes)
-            total_weight = sum(weights.values())
-            power_level = (weighted_sum / total_weight)
-            
-            # Ensure power level is within 1-10 range
-            power_level = max(1, min(10, power_level))
-            
-        else:
-            # Legacy format with categorical data
-            hero_villain = data.get('heroVillain', 'Hero')
-            estimated_power_level = data.get('estimatedPowerLevel', 'Medium')
-            
-            # Predict power level using the trained model
-            power_level = power_predictor.predict_power_level(hero_villain, estimated_power_level)
-        
-        # Store the prediction request and result
-        store_data = {
-            "request": data,
-            "result": {
-                "powerLevel": float(power_level),
-                "powerCategory": get_power_category(power_level)
-            },
-            "timestamp": datetime.datetime.now().isoformat()
-        }
-        store_fetched_data("power_prediction", store_data)
-        
-        return jsonify({
-            "powerLevel": float(power_level),
-            "powerCategory": get_power_category(power_level)
-        })
-    except Exception as e:
+        service.store_prediction(data, result)
+    except OSError as e:
         return jsonify({"error": f"Error predicting power level: {str(e)}"}), 500
 
-def get_power_category(power_level):
-    """Categorize power level into Low, Medium, or High."""
-    if power_level >= 8:
-        return "High"
-    elif power_level >= 5:
-        return "Medium"
-    else:
-        return "Low"
+    return jsonify(result)
 
 def find_available_port(start_port=8000, max_attempts=10):
     """Find an available port starting from start_port."""
@@ -169,12 +191,17 @@ def find_available_port(start_port=8000, max_attempts=10):
     return None
 
 if __name__ == '__main__':
-    default_port = 8000
-    port = find_available_port(default_port)
-    
+    parser = argparse.ArgumentParser(description='PowerVerse API server (Flask)')
+    parser.add_argument('--port', type=int, default=8000, help='First port to try')
+    parser.add_argument('--max-attempts', type=int, default=10, help='Number of consecutive ports to try')
+    parser.add_argument('--debug', action='store_true', help='Enable Flask debug mode')
+    args = parser.parse_args()
+
+    port = find_available_port(args.port, args.max_attempts)
+
     if port is None:
-        print(f"Error: Could not find an available port after trying {max_attempts} ports starting from {default_port}")
+        print(f"Error: Could not find an available port after trying {args.max_attempts} ports starting from {args.port}")
         sys.exit(1)
-    
+
     print(f"Starting PowerVerse API server on 0.0.0.0:{port}")
-    app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port, debug=args.debug)
@@ -0,0 +1,292 @@
+"""
+ASGI serving mode for the PowerVerse API.
+
+Exposes the same routes as the Flask app in ``src/api.py`` with async
+handlers. CPU-bound work (model calls, chart rendering, graph analytics) is
+offloaded to a bounded thread pool so slow clients never hold up the event
+loop, and prediction records are written after the response is sent.
+
+Run with:
+    uvicorn src.asgi:app --port 8000
+"""
+import asyncio
+import contextlib
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+# Add the project root to the Python path to import from src
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.service import ServiceError, choose_format, get_service, parse_bool
+from src.utils import serialization
+from src.utils.admission import AdmissionRejected, AsyncAdmissionController, admission_config_from_env
+
+# Upper bound on CPU-bound calls running at once, and on calls waiting for a slot
+MAX_WORKERS = int(os.environ.get('POWERVERSE_ASGI_WORKERS', os.cpu_count() or 4))
+MAX_PENDING = int(os.environ.get('POWERVERSE_ASGI_MAX_PENDING', MAX_WORKERS * 4))
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with the fast serializer."""
+
+    def render(self, content):
+        return serialization.dumps(content)
+
+
+class BoundedExecutor:
+    """
+    Thread pool wrapper that bounds the number of submitted-but-unfinished
+    calls, so a burst of requests applies backpressure to the event loop
+    instead of growing an unbounded executor queue.
+    """
+
+    def __init__(self, max_workers, max_pending):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._slots = None
+
+    async def run(self, fn, *args):
+        """Run ``fn(*args)`` in the pool and await its result."""
+        if self._executor is None:
+            # Created lazily so the semaphore binds to the running event loop
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='powerverse')
+            self._slots = asyncio.Semaphore(self.max_pending)
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            self._slots = None
+
+
+service = get_service()
+executor = BoundedExecutor(MAX_WORKERS, MAX_PENDING)
+
+# Limits concurrent CPU-bound prediction requests; /api/status is never limited
+admission = AsyncAdmissionController(**admission_config_from_env(service.prediction_batcher.max_batch_size))
+
+
+def error_response(e):
+    return FastJSONResponse({"error": e.message}, status_code=e.status)
+
+
+def shed_response(e):
+    return FastJSONResponse({"error": e.reason}, status_code=503, headers={"Retry-After": str(e.retry_after)})
+
+
+async def get_characters(request):
+    """API endpoint to get all character data, streamed in the negotiated format."""
+    try:
+        fmt = choose_format(request.query_params.get('format'), request.headers.get('accept'))
+        frame = service.characters_frame()
+    except ServiceError as e:
+        return error_response(e)
+    # Sync iterators are consumed in the thread pool, chunk by chunk
+    return StreamingResponse(serialization.iter_frame(frame, fmt), media_type=serialization.MEDIA_TYPES[fmt])
+
+
+async def list_charts(request):
+    """API endpoint to list the charts that can be rendered."""
+    return FastJSONResponse(service.list_charts())
+
+
+async def get_chart(request):
+    """API endpoint to render (or serve a cached) chart image."""
+    params = dict(request.query_params)
+    try:
+        image, mimetype = await executor.run(
+            service.render_chart, request.path_params['chart_name'], params.get('format', 'png'), params
+        )
+    except ServiceError as e:
+        return error_response(e)
+    return Response(image, media_type=mimetype, headers={"Cache-Control": "public, max-age=3600"})
+
+
+async def render_charts(request):
+    """API endpoint to pre-render the whole chart set in parallel."""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = {}
+    data = data if isinstance(data, dict) else {}
+    try:
+        return FastJSONResponse(await executor.run(service.render_charts, data.get('charts'), data.get('format', 'png')))
+    except ServiceError as e:
+        return error_response(e)
+
+
+async def network_summary(request):
+    """API endpoint for headline statistics of the affiliation network."""
+    return FastJSONResponse(await executor.run(service.network_summary))
+
+
+async def network_centrality(request):
+    """API endpoint for degree, betweenness or closeness rankings."""
+    try:
+        top_n = int(request.query_params.get('top_n', 10))
+    except ValueError:
+        top_n = 10
+    try:
+        return FastJSONResponse(await executor.run(
+            service.network_centrality,
+            request.path_params['metric'],
+            top_n,
+            parse_bool(request.query_params.get('approximate'))
+        ))
+    except ServiceError as e:
+        return error_response(e)
+
+
+async def network_components(request):
+    """API endpoint for the connected components of the network."""
+    return FastJSONResponse(await executor.run(service.network_components))
+
+
+async def network_communities(request):
+    """API endpoint for detected character communities."""
+    try:
+        return FastJSONResponse(await executor.run(
+            service.network_communities, request.query_params.get('method', 'louvain')
+        ))
+    except ServiceError as e:
+        return error_response(e)
+
+
+async def compare_characters(request):
+    """API endpoint to compare characters, e.g. /api/compare?names=Thor,Loki"""
+    try:
+        return FastJSONResponse(await executor.run(service.compare, request.query_params.get('names')))
+    except ServiceError as e:
+        return error_response(e)
+
+
+async def search_characters(request):
+    """API endpoint for typo-tolerant name search, e.g. /api/search?q=spidr"""
+    params = request.query_params
+    try:
+        return FastJSONResponse(await executor.run(
+            service.search, params.get('q'), params.get('limit', 10), params.get('mode', 'auto')
+        ))
+    except ServiceError as e:
+        return error_response(e)
+
+
+async def search_powers(request):
+    """API endpoint for BM25 powers search, e.g. /api/powers/search?q="energy manipulation"&role=Hero"""
+    try:
+        return FastJSONResponse(await executor.run(service.search_powers, dict(request.query_params)))
+    except ServiceError as e:
+        return error_response(e)
+
+
+async def prediction_stats(request):
+    """API endpoint for aggregates over the compacted prediction history."""
+    try:
+        return FastJSONResponse(await executor.run(service.prediction_stats, dict(request.query_params)))
+    except ServiceError as e:
+        return error_response(e)
+
+
+async def api_status(request):
+    """API endpoint to check backend connectivity"""
+    return FastJSONResponse(service.status())
+
+
+async def admission_stats(request):
+    """API endpoint exposing in-flight, queued and shed request counts."""
+    return FastJSONResponse(admission.stats())
+
+
+async def model_status(request):
+    """API endpoint reporting readiness and the served and previous model versions."""
+    return FastJSONResponse(service.model_status())
+
+
+async def retrain_model(request):
+    """Queue a background retrain of the power model (admin token required)."""
+    try:
+        return FastJSONResponse(service.retrain_model(request.headers.get('authorization')), status_code=202)
+    except ServiceError as e:
+        return error_response(e)
+
+
+async def rollback_model(request):
+    """Serve the previous power model again (admin token required)."""
+    try:
+        return FastJSONResponse(await executor.run(service.rollback_model, request.headers.get('authorization')))
+    except ServiceError as e:
+        return error_response(e)
+
+
+async def batching_stats(request):
+    """API endpoint exposing prediction batch sizes and queue waits."""
+    return FastJSONResponse(service.prediction_batching_stats())
+
+
+async def predict_power(request):
+    """Predict power level based on character attributes."""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    try:
+        async with admission.slot():
+            # Waits for its micro-batch without holding an executor thread
+            result = await service.predict_power_async(data)
+    except AdmissionRejected as e:
+        return shed_response(e)
+    except ServiceError as e:
+        return error_response(e)
+
+    # Store the prediction request and result after the response is sent
+    return FastJSONResponse(result, background=BackgroundTask(service.store_prediction, data, result))
+
+
+routes = [
+    Route('/api/characters', get_characters, methods=['GET']),
+    Route('/api/charts', list_charts, methods=['GET']),
+    Route('/api/charts/render', render_charts, methods=['POST']),
+    Route('/api/charts/{chart_name}', get_chart, methods=['GET']),
+    Route('/api/network/summary', network_summary, methods=['GET']),
+    Route('/api/network/centrality/{metric}', network_centrality, methods=['GET']),
+    Route('/api/network/components', network_components, methods=['GET']),
+    Route('/api/network/communities', network_communities, methods=['GET']),
+    Route('/api/compare', compare_characters, methods=['GET']),
+    Route('/api/search', search_characters, methods=['GET']),
+    Route('/api/powers/search', search_powers, methods=['GET']),
+    Route('/api/predictions/stats', prediction_stats, methods=['GET']),
+    Route('/api/status', api_status, methods=['GET']),
+    Route('/api/admission', admission_stats, methods=['GET']),
+    Route('/api/batching', batching_stats, methods=['GET']),
+    Route('/api/model', model_status, methods=['GET']),
+    Route('/api/model/retrain', retrain_model, methods=['POST']),
+    Route('/api/model/rollback', rollback_model, methods=['POST']),
+    Route('/api/predict-power', predict_power, methods=['POST']),
+]
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    executor.shutdown()
+
+
+app = Starlette(
+    routes=routes,
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan,
+)
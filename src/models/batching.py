@@ -0,0 +1,255 @@
+"""
+Dynamic micro-batching of concurrent model calls.
+
+Callers queue single items; a worker thread takes the first queued item,
+keeps collecting for at most ``max_wait_ms`` or until ``max_batch_size``
+items are queued, and answers the whole batch with one vectorized call of
+the batch function. Collection also stops once no new item has arrived for
+a quarter of the window, so a burst that is already complete (or a lone
+request) is not held back for the full window. Items that arrive while a
+batch runs form the next one, so under load batches grow without any extra
+waiting.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import numpy as np
+
+# Recent batches kept for the size and wait percentiles in ``stats``
+STATS_WINDOW = 1024
+
+# Fraction of the window without arrivals after which a batch is dispatched
+IDLE_FRACTION = 0.25
+
+# Longest a blocking ``submit`` waits for its batch, in seconds
+SUBMIT_TIMEOUT = 30.0
+
+
+def batching_config_from_env():
+    """
+    Read micro-batching settings from the environment.
+
+    POWERVERSE_BATCH_MAX_SIZE   items per model call (default: 64; 1 disables batching)
+    POWERVERSE_BATCH_WAIT_MS    longest a request waits for a batch to fill (default: 1)
+
+    Returns:
+    --------
+    dict
+        Keyword arguments for ``MicroBatcher``
+    """
+    return {
+        'max_batch_size': int(os.environ.get('POWERVERSE_BATCH_MAX_SIZE', 64)),
+        'max_wait_ms': float(os.environ.get('POWERVERSE_BATCH_WAIT_MS', 1.0)),
+    }
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-item calls into batches.
+
+    ``batch_fn`` receives a list of items and returns one result per item,
+    in order. If it raises, every item of the batch is retried on its own so
+    one bad item only fails its own request.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=64, max_wait_ms=1.0):
+        """
+        Initialize the batcher; its worker thread starts on first use.
+
+        Parameters:
+        -----------
+        batch_fn : callable
+            list of items -> sequence of results
+        max_batch_size : int, default=64
+            Items per call of ``batch_fn``
+        max_wait_ms : float, default=1.0
+            Longest time the first item of a batch waits for more items
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must not be negative.")
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._condition = threading.Condition()
+        self._queue = deque()  # (item, future, enqueued at)
+        self._worker = None
+
+        self.batches = 0
+        self.items = 0
+        self.failed_batches = 0
+        self._batch_sizes = deque(maxlen=STATS_WINDOW)
+        self._queue_waits = deque(maxlen=STATS_WINDOW)
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name='powerverse-batcher', daemon=True)
+            self._worker.start()
+
+    def submit_future(self, item):
+        """
+        Queue an item.
+
+        Returns:
+        --------
+        concurrent.futures.Future
+            Resolves to the item's result (or its exception)
+        """
+        future = Future()
+        with self._condition:
+            self._ensure_worker()
+            self._queue.append((item, future, time.perf_counter()))
+            self._condition.notify()
+        return future
+
+    def submit(self, item, timeout=SUBMIT_TIMEOUT):
+        """
+        Queue an item and block until its batch has run.
+
+        Parameters:
+        -----------
+        item : object
+            Item to pass to ``batch_fn``
+        timeout : float, optional
+            Seconds to wait for the result; None waits indefinitely
+
+        Returns:
+        --------
+        object
+            The item's result from ``batch_fn``
+
+        Raises:
+        -------
+        concurrent.futures.TimeoutError
+            If the batch has not run within ``timeout``
+        """
+        if self.max_batch_size == 1:
+            # Batching disabled: call directly in the caller's thread
+            return self._run_batch([item])[0]
+        future = self.submit_future(item)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    async def submit_async(self, item):
+        """
+        Queue an item and await its result without holding a thread.
+        """
+        return await asyncio.wrap_future(self.submit_future(item))
+
+    def _collect(self):
+        # Wait for a first item, then for more until the batch is full, the
+        # window closes or arrivals pause
+        with self._condition:
+            while not self._queue:
+                self._condition.wait()
+            deadline = time.perf_counter() + self.max_wait
+            idle = self.max_wait * IDLE_FRACTION
+            while len(self._queue) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                size = len(self._queue)
+                self._condition.wait(min(remaining, idle))
+                if len(self._queue) == size:
+                    break
+            count = min(len(self._queue), self.max_batch_size)
+            batch = [self._queue.popleft() for _ in range(count)]
+        # Mark the futures running so callers can no longer cancel them; drop
+        # those whose caller already gave up (disconnect or timeout)
+        return [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+
+    def _run_batch(self, items):
+        try:
+            results = list(self.batch_fn(items))
+            if len(results) != len(items):
+                raise ValueError(f"Batch function returned {len(results)} results for {len(items)} items.")
+            return results
+        except Exception:
+            if len(items) == 1:
+                raise
+            self.failed_batches += 1
+            # Isolate the failure: every item gets its own result or error
+            return [self._call_single(item) for item in items]
+
+    def _call_single(self, item):
+        try:
+            return self.batch_fn([item])[0]
+        except Exception as e:
+            return _Failure(e)
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if not batch:
+                continue
+            started = time.perf_counter()
+            items = [item for item, _, _ in batch]
+            try:
+                results = self._run_batch(items)
+            except Exception as e:
+                results = [_Failure(e)] * len(batch)
+
+            for (_, future, enqueued), result in zip(batch, results):
+                # One future failing to resolve must not stop the worker
+                # and strand the rest of the batch
+                try:
+                    if isinstance(result, _Failure):
+                        future.set_exception(result.error)
+                    else:
+                        future.set_result(result)
+                except Exception as e:
+                    print(f"Error resolving batched request: {e}")
+
+            with self._condition:
+                self.batches += 1
+                self.items += len(batch)
+                self._batch_sizes.append(len(batch))
+                self._queue_waits.extend(started - enqueued for _, _, enqueued in batch)
+
+    def stats(self):
+        """
+        Return the configuration and batch size / queue wait metrics.
+
+        Sizes and waits are over the most recent batches; waits are the
+        time from submission to the start of the model call, in ms.
+        """
+        with self._condition:
+            sizes = np.array(self._batch_sizes, dtype=np.float64)
+            waits = np.array(self._queue_waits, dtype=np.float64) * 1000
+            stats = {
+                'maxBatchSize': self.max_batch_size,
+                'maxWaitMs': self.max_wait * 1000,
+                'queued': len(self._queue),
+                'batches': self.batches,
+                'items': self.items,
+                'failedBatches': self.failed_batches,
+                'meanBatchSize': self.items / self.batches if self.batches else 0.0,
+            }
+        stats['batchSize'] = _percentiles(sizes)
+        stats['queueWaitMs'] = _percentiles(waits)
+        return stats
+
+
+class _Failure:
+    # Exception of one item, delivered to its future
+    def __init__(self, error):
+        self.error = error
+
+
+def _percentiles(values):
+    if len(values) == 0:
+        return {'p50': 0.0, 'p99': 0.0, 'max': 0.0}
+    return {
+        'p50': float(np.percentile(values, 50)),
+        'p99': float(np.percentile(values, 99)),
+        'max': float(values.max()),
+    }
@@ -0,0 +1,422 @@
+"""
+Array-based random forests for fast inference without scikit-learn.
+
+A fitted ``RandomForestRegressor`` or ``RandomForestClassifier`` is flattened
+into contiguous node arrays (feature, threshold, left/right child, leaf
+value) shared by all trees. Prediction walks every tree for every row at
+once, one tree level per step, so a batch costs ``max_depth`` vectorized
+gathers instead of per-tree Python calls. Compiled models are saved as a
+directory of ``.npy`` files and loaded with ``numpy.load(mmap_mode='r')``;
+this module only needs NumPy (and pandas for DataFrame encoding).
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+COMPILED_FORMAT_VERSION = 1
+
+_FOREST_ARRAYS = ('feature', 'threshold', 'left', 'right', 'value', 'roots', 'used_features')
+
+
+class CompiledForest:
+    """
+    Flattened random forest with a level-synchronous NumPy predictor.
+
+    Leaves point to themselves with an infinite threshold, so a (row, tree)
+    pair that reaches a leaf stays there; such pairs are dropped from the
+    working set while the remaining paths keep descending.
+    Inputs are compared as float32, exactly like scikit-learn's trees, and
+    per-tree outputs are summed in tree order, so predictions match the
+    source estimator.
+    """
+
+    def __init__(self, kind, feature, threshold, left, right, value, roots, used_features,
+                 max_depth, n_features_in, classes=None):
+        """
+        Initialize from node arrays; use ``from_sklearn`` or ``load`` instead.
+        """
+        if kind not in ('regressor', 'classifier'):
+            raise ValueError(f"Unknown forest kind '{kind}'.")
+        self.kind = kind
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.used_features = used_features
+        self.max_depth = int(max_depth)
+        self.n_features_in = int(n_features_in)
+        self.classes_ = None if classes is None else np.asarray(classes)
+
+    @classmethod
+    def from_sklearn(cls, estimator):
+        """
+        Compile a fitted scikit-learn random forest.
+
+        Parameters:
+        -----------
+        estimator : RandomForestRegressor or RandomForestClassifier
+            Fitted single-output forest
+
+        Returns:
+        --------
+        CompiledForest
+            Compiled forest
+        """
+        if not hasattr(estimator, 'estimators_'):
+            raise ValueError("The estimator must be fitted before it can be compiled.")
+        if getattr(estimator, 'n_outputs_', 1) != 1:
+            raise ValueError("Only single-output forests can be compiled.")
+
+        kind = 'classifier' if hasattr(estimator, 'classes_') else 'regressor'
+        features, thresholds, lefts, rights, values, roots, leaves = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for tree in estimator.estimators_:
+            t = tree.tree_
+            n_nodes = t.node_count
+            is_leaf = t.children_left == -1
+            node_ids = np.arange(offset, offset + n_nodes, dtype=np.int32)
+
+            features.append(np.where(is_leaf, 0, t.feature).astype(np.int32))
+            thresholds.append(np.where(is_leaf, np.inf, t.threshold))
+            lefts.append(np.where(is_leaf, node_ids, t.children_left + offset).astype(np.int32))
+            rights.append(np.where(is_leaf, node_ids, t.children_right + offset).astype(np.int32))
+
+            if kind == 'classifier':
+                # Same normalization as DecisionTreeClassifier.predict_proba
+                value = t.value[:, 0, :].astype(np.float64)
+                normalizer = value.sum(axis=1)[:, np.newaxis]
+                normalizer[normalizer == 0.0] = 1.0
+                values.append(value / normalizer)
+            else:
+                values.append(t.value[:, 0, :1].astype(np.float64))
+
+            roots.append(offset)
+            leaves.append(is_leaf)
+            max_depth = max(max_depth, t.max_depth)
+            offset += n_nodes
+
+        feature = np.concatenate(features)
+        is_leaf = np.concatenate(leaves)
+
+        # Only gather the columns the forest actually splits on
+        used_features = np.unique(feature[~is_leaf]).astype(np.int32)
+        remap = np.zeros(max(estimator.n_features_in_, 1), dtype=np.int32)
+        remap[used_features] = np.arange(len(used_features), dtype=np.int32)
+        feature = np.where(is_leaf, 0, remap[feature]).astype(np.int32)
+
+        return cls(
+            kind, feature, np.concatenate(thresholds), np.concatenate(lefts), np.concatenate(rights),
+            np.concatenate(values), np.asarray(roots, dtype=np.int32), used_features,
+            max_depth, estimator.n_features_in_,
+            estimator.classes_ if kind == 'classifier' else None
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def _prepare(self, X):
+        # Dense float32 matrix of the used columns (scikit-learn splits on float32)
+        if hasattr(X, 'tocsc'):
+            X = X.tocsc()[:, self.used_features].toarray()
+        else:
+            X = np.asarray(X)
+            if X.ndim == 1:
+                X = X.reshape(1, -1)
+            if X.shape[1] != self.n_features_in:
+                raise ValueError(f"X has {X.shape[1]} features, but the forest expects {self.n_features_in}.")
+            X = X[:, self.used_features]
+        X = np.asarray(X, dtype=np.float32)
+        if len(self.used_features) == 0:
+            # Every tree is a single leaf; keep one dummy column to index
+            X = np.zeros((X.shape[0], 1), dtype=np.float32)
+        return X
+
+    def apply(self, X):
+        """
+        Return the leaf index reached in every tree.
+
+        Parameters:
+        -----------
+        X : array-like or scipy.sparse matrix of shape (n_samples, n_features)
+            Input samples
+
+        Returns:
+        --------
+        numpy.ndarray of shape (n_samples, n_trees)
+            Global node index of each leaf
+        """
+        X = self._prepare(X)
+        n_samples, n_columns = X.shape
+        n_trees = self.n_trees
+
+        # One (row, tree) pair per slot; pairs that reach a leaf drop out of
+        # the active set so shallow paths stop costing work
+        nodes = np.tile(np.asarray(self.roots), n_samples)
+        row_offsets = np.repeat(np.arange(n_samples) * n_columns, n_trees)
+        flat_X = X.ravel()
+        active = np.arange(n_samples * n_trees)
+        for _ in range(self.max_depth):
+            current = nodes[active]
+            go_left = flat_X[row_offsets[active] + self.feature[current]] <= self.threshold[current]
+            following = np.where(go_left, self.left[current], self.right[current])
+            nodes[active] = following
+            active = active[self.left[following] != following]
+            if len(active) == 0:
+                break
+        return nodes.reshape(n_samples, n_trees)
+
+    def _mean_leaf_values(self, X):
+        # Sequential sum over trees (cumsum) reproduces scikit-learn's
+        # accumulation order, then divide by the tree count
+        leaf_values = self.value[self.apply(X)]
+        return np.cumsum(leaf_values, axis=1)[:, -1] / self.n_trees
+
+    def predict(self, X):
+        """
+        Predict regression targets or class labels.
+
+        Parameters:
+        -----------
+        X : array-like or scipy.sparse matrix of shape (n_samples, n_features)
+            Input samples
+
+        Returns:
+        --------
+        numpy.ndarray
+            Predictions
+        """
+        if self.kind == 'regressor':
+            return self._mean_leaf_values(X)[:, 0]
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def predict_proba(self, X):
+        """
+        Predict class probabilities (classifiers only).
+
+        Parameters:
+        -----------
+        X : array-like or scipy.sparse matrix of shape (n_samples, n_features)
+            Input samples
+
+        Returns:
+        --------
+        numpy.ndarray of shape (n_samples, n_classes)
+            Class probabilities
+        """
+        if self.kind != 'classifier':
+            raise ValueError("predict_proba is only available for classifiers.")
+        return self._mean_leaf_values(X)
+
+    def save(self, path):
+        """
+        Save the compiled forest as a directory of ``.npy`` files.
+
+        Parameters:
+        -----------
+        path : str
+            Directory to write
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in _FOREST_ARRAYS:
+            np.save(os.path.join(path, f'{name}.npy'), np.ascontiguousarray(getattr(self, name)))
+        meta = {
+            'format_version': COMPILED_FORMAT_VERSION,
+            'kind': self.kind,
+            'max_depth': self.max_depth,
+            'n_features_in': self.n_features_in,
+            'classes': None if self.classes_ is None else self.classes_.tolist(),
+        }
+        with open(os.path.join(path, 'forest.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+        return self
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load a compiled forest.
+
+        Parameters:
+        -----------
+        path : str
+            Directory written by ``save``
+        mmap : bool, default=True
+            Memory-map the node arrays so processes share them
+
+        Returns:
+        --------
+        CompiledForest
+            Loaded forest
+        """
+        with open(os.path.join(path, 'forest.json')) as f:
+            meta = json.load(f)
+        if meta.get('format_version') != COMPILED_FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled forest version: {meta.get('format_version')}")
+        arrays = {
+            name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None)
+            for name in _FOREST_ARRAYS
+        }
+        return cls(meta['kind'], max_depth=meta['max_depth'], n_features_in=meta['n_features_in'],
+                   classes=meta['classes'], **arrays)
+
+
+class CompiledPowerPredictor:
+    """
+    Inference-only counterpart of ``PowerPredictor``.
+
+    Holds the dummy-encoded feature names, the scaler statistics and a
+    ``CompiledForest``, and exposes the same ``predict`` and
+    ``predict_power_level`` methods without importing scikit-learn.
+    """
+
+    def __init__(self, forest, feature_names, scaler_mean, scaler_scale):
+        """
+        Initialize the predictor.
+
+        Parameters:
+        -----------
+        forest : CompiledForest
+            Compiled regression forest
+        feature_names : list of str
+            Dummy-encoded training columns
+        scaler_mean, scaler_scale : numpy.ndarray
+            StandardScaler ``mean_`` and ``scale_``
+        """
+        self.forest = forest
+        self.feature_names = list(feature_names)
+        self.scaler_mean = np.asarray(scaler_mean, dtype=np.float64)
+        self.scaler_scale = np.asarray(scaler_scale, dtype=np.float64)
+        self._feature_index = {name: i for i, name in enumerate(self.feature_names)}
+
+    def _predict_encoded(self, X):
+        # Same arithmetic as StandardScaler.transform
+        X = np.asarray(X, dtype=np.float64) - self.scaler_mean
+        X /= self.scaler_scale
+        return self.forest.predict(X)
+
+    def predict(self, df):
+        """
+        Predict power levels for characters.
+
+        Parameters:
+        -----------
+        df : pandas.DataFrame
+            DataFrame with 'Hero/Villain' and optionally 'Estimated_Power_Level'
+
+        Returns:
+        --------
+        numpy.ndarray
+            Predicted power levels (1-10 scale)
+        """
+        features = pd.get_dummies(df['Hero/Villain'], prefix='role')
+        if 'Estimated_Power_Level' in df.columns:
+            features = pd.concat([features, pd.get_dummies(df['Estimated_Power_Level'], prefix='power')], axis=1)
+        X = features.reindex(columns=self.feature_names, fill_value=0).to_numpy(dtype=np.float64)
+        return self._predict_encoded(X)
+
+    def predict_power_level(self, hero_villain, estimated_power_level):
+        """
+        Predict power level for a single character based on attributes.
+
+        Builds the one-hot row directly instead of going through pandas.
+
+        Parameters:
+        -----------
+        hero_villain : str
+            'Hero', 'Villain', or other role category
+        estimated_power_level : str
+            'High', 'Medium', or 'Low'
+
+        Returns:
+        --------
+        float
+            Predicted power level (1-10 scale)
+        """
+        return self.predict_power_levels([hero_villain], [estimated_power_level])[0]
+
+    def predict_power_levels(self, hero_villains, estimated_power_levels):
+        """
+        Predict power levels for many characters in one forest pass.
+
+        Parameters:
+        -----------
+        hero_villains : sequence of str
+            'Hero', 'Villain', or other role category per character
+        estimated_power_levels : sequence of str
+            'High', 'Medium', or 'Low' per character
+
+        Returns:
+        --------
+        numpy.ndarray
+            Predicted power levels (1-10 scale)
+        """
+        x = np.zeros((len(hero_villains), len(self.feature_names)), dtype=np.float64)
+        for row, (hero_villain, estimated_power_level) in enumerate(zip(hero_villains, estimated_power_levels)):
+            for name in (f'role_{hero_villain}', f'power_{estimated_power_level}'):
+                if name in self._feature_index:
+                    x[row, self._feature_index[name]] = 1.0
+        return self._predict_encoded(x)
+
+    def save(self, path):
+        """
+        Save the predictor as a directory of ``.npy`` files.
+        """
+        self.forest.save(path)
+        np.save(os.path.join(path, 'scaler_mean.npy'), self.scaler_mean)
+        np.save(os.path.join(path, 'scaler_scale.npy'), self.scaler_scale)
+        with open(os.path.join(path, 'features.json'), 'w') as f:
+            json.dump(self.feature_names, f)
+        print(f"Compiled model saved to {path}")
+        return self
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load a predictor written by ``save``.
+        """
+        with open(os.path.join(path, 'features.json')) as f:
+            feature_names = json.load(f)
+        return cls(
+            CompiledForest.load(path, mmap=mmap), feature_names,
+            np.load(os.path.join(path, 'scaler_mean.npy')),
+            np.load(os.path.join(path, 'scaler_scale.npy'))
+        )
+
+
+def check_parity(estimator, compiled, X, atol=1e-12):
+    """
+    Compare a compiled forest against the scikit-learn estimator it came from.
+
+    Parameters:
+    -----------
+    estimator : RandomForestRegressor or RandomForestClassifier
+        Source estimator
+    compiled : CompiledForest
+        Compiled forest
+    X : array-like or scipy.sparse matrix
+        Samples to compare on
+    atol : float, default=1e-12
+        Allowed absolute difference between outputs
+
+    Returns:
+    --------
+    dict
+        Maximum absolute difference and whether the predictions agree
+    """
+    if compiled.kind == 'classifier':
+        expected, actual = estimator.predict_proba(X), compiled.predict_proba(X)
+        labels_match = bool(np.array_equal(estimator.predict(X), compiled.predict(X)))
+    else:
+        expected, actual = estimator.predict(X), compiled.predict(X)
+        labels_match = True
+    max_diff = float(np.max(np.abs(expected - actual))) if len(expected) else 0.0
+    return {'max_abs_diff': max_diff, 'match': labels_match and max_diff <= atol}
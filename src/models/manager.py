@@ -0,0 +1,275 @@
+"""
+Background training and atomic hot-swapping of the served model.
+
+``ModelManager`` trains in a worker thread, so the server answers requests
+(and reports readiness) while the first model is still being fitted. Every
+trained model is validated before it replaces the served one; the swap is a
+single reference assignment, so a request sees either the old or the new
+model, never a half-trained one. The previously served model is kept for
+``rollback``. Training runs on start, on ``request_training`` and, with a
+``retrain_interval``, on a schedule; a failed run is recorded and the served
+model stays in place.
+"""
+import datetime
+import math
+import os
+import threading
+import time
+
+
+class ModelNotReady(Exception):
+    """
+    Raised when no validated model is available yet.
+    """
+
+
+def manager_config_from_env():
+    """
+    Read model training settings from the environment.
+
+    POWERVERSE_RETRAIN_INTERVAL   seconds between scheduled retrains (default: 0, off)
+    POWERVERSE_MIN_R2             lowest held-out R² a new model may have (default: 0)
+    POWERVERSE_ADMIN_TOKEN        bearer token for retrain and rollback (default: unset,
+                                  which disables both endpoints)
+
+    Returns:
+    --------
+    dict
+        Keyword arguments for the service's model settings
+    """
+    interval = float(os.environ.get('POWERVERSE_RETRAIN_INTERVAL', 0))
+    return {
+        'retrain_interval': interval if interval > 0 else None,
+        'min_r2': float(os.environ.get('POWERVERSE_MIN_R2', 0.0)),
+        'admin_token': os.environ.get('POWERVERSE_ADMIN_TOKEN') or None,
+    }
+
+
+class ModelVersion:
+    """
+    A validated model together with its version number and metrics.
+    """
+
+    def __init__(self, version, model, metrics, reason):
+        self.version = version
+        self.model = model
+        self.metrics = metrics
+        self.reason = reason
+        self.trained_at = datetime.datetime.now().isoformat()
+
+    def describe(self):
+        """Return the version, training time and scalar metrics."""
+        return {
+            'version': self.version,
+            'trainedAt': self.trained_at,
+            'reason': self.reason,
+            'metrics': {name: float(value) for name, value in self.metrics.items()
+                        if isinstance(value, (int, float)) and math.isfinite(value)},
+        }
+
+
+class ModelManager:
+    """
+    Trains models in a background thread and serves the latest validated
+    one.
+    """
+
+    def __init__(self, train_fn, validate_fn=None, on_swap=None, retrain_interval=None):
+        """
+        Initialize the manager; call ``start`` to begin training.
+
+        Parameters:
+        -----------
+        train_fn : callable
+            () -> (model, metrics dict); raises if training is impossible
+        validate_fn : callable, optional
+            (model, metrics) -> None; raises ValueError to reject a model
+        on_swap : callable, optional
+            Called with the new ``ModelVersion`` after every swap or rollback
+        retrain_interval : float, optional
+            Seconds between scheduled retrains after a run finishes
+        """
+        self.train_fn = train_fn
+        self.validate_fn = validate_fn
+        self.on_swap = on_swap
+        self.retrain_interval = retrain_interval
+
+        self.current = None
+        self.previous = None
+        self.state = 'idle'
+        self.last_error = None
+        self.trainings = 0
+        self.failures = 0
+        self.last_started = None
+        self.last_finished = None
+
+        self._next_version = 1
+        self._pending = None  # reason of the requested run, if any
+        self._condition = threading.Condition()
+        self._swap_lock = threading.Lock()
+        self._worker = None
+        self._stopped = False
+
+    def start(self, reason='startup'):
+        """
+        Start the worker thread and request a first training run.
+        """
+        with self._condition:
+            self._stopped = False
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='powerverse-trainer', daemon=True)
+                self._worker.start()
+        return self.request_training(reason)
+
+    def stop(self):
+        """
+        Stop the worker thread after the current run.
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        return self
+
+    def request_training(self, reason='request'):
+        """
+        Request a training run.
+
+        A request made while a run is in progress starts another run once it
+        finishes; further requests until then are merged into that one.
+
+        Returns:
+        --------
+        bool
+            True if a new run was queued, False if one was already queued
+        """
+        with self._condition:
+            queued = self._pending is None
+            if queued:
+                self._pending = reason
+                if self.state == 'idle':
+                    self.state = 'pending'
+                self._condition.notify_all()
+            return queued
+
+    def get(self):
+        """
+        Return the served model.
+
+        Raises:
+        -------
+        ModelNotReady
+            If no model has been validated yet
+        """
+        current = self.current
+        if current is None:
+            if self.last_error is not None and self.state == 'idle':
+                raise ModelNotReady(f"Model is not available: {self.last_error}")
+            raise ModelNotReady("Model is not ready yet; training is in progress.")
+        return current.model
+
+    @property
+    def ready(self):
+        return self.current is not None
+
+    def wait_ready(self, timeout=None):
+        """
+        Block until a model is served or a run failed without one.
+
+        Returns:
+        --------
+        bool
+            True if a model is being served
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self.current is None and self.state != 'idle':
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return self.current is not None
+
+    def rollback(self):
+        """
+        Serve the previous model again; the current one becomes the previous.
+
+        Raises:
+        -------
+        ValueError
+            If there is no previous model
+        """
+        with self._swap_lock:
+            if self.previous is None:
+                raise ValueError("No previous model to roll back to.")
+            self.current, self.previous = self.previous, self.current
+            current = self.current
+        print(f"Rolled back to model version {current.version}")
+        if self.on_swap is not None:
+            self.on_swap(current)
+        return current
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and self._pending is None:
+                    if self.retrain_interval and self.last_finished is not None:
+                        due = self.last_finished + self.retrain_interval - time.monotonic()
+                        if due <= 0:
+                            self._pending = 'schedule'
+                            break
+                        self._condition.wait(due)
+                    else:
+                        self._condition.wait()
+                if self._stopped:
+                    return
+                reason, self._pending = self._pending, None
+                self.state = 'training'
+                self.last_started = time.monotonic()
+
+            try:
+                self._train(reason)
+            finally:
+                with self._condition:
+                    self.state = 'pending' if self._pending is not None else 'idle'
+                    self.last_finished = time.monotonic()
+                    self._condition.notify_all()
+
+    def _train(self, reason):
+        self.trainings += 1
+        try:
+            model, metrics = self.train_fn()
+            if self.validate_fn is not None:
+                self.validate_fn(model, metrics)
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            kept = f"; still serving version {self.current.version}" if self.current is not None else ''
+            print(f"Error training model ({reason}): {e}{kept}")
+            return
+
+        with self._swap_lock:
+            version = ModelVersion(self._next_version, model, metrics, reason)
+            self._next_version += 1
+            self.previous, self.current = self.current, version
+        self.last_error = None
+        print(f"Serving model version {version.version} ({reason})")
+        if self.on_swap is not None:
+            self.on_swap(version)
+
+    def status(self):
+        """
+        Return readiness, the served and previous versions and training
+        counters.
+        """
+        current, previous = self.current, self.previous
+        return {
+            'ready': current is not None,
+            'state': self.state,
+            'version': current.version if current is not None else None,
+            'current': current.describe() if current is not None else None,
+            'previous': previous.describe() if previous is not None else None,
+            'trainings': self.trainings,
+            'failures': self.failures,
+            'lastError': self.last_error,
+            'retrainInterval': self.retrain_interval,
+        }
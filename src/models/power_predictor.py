@@ -7,13 +7,15 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.metrics import mean_squared_error, r2_score
 
+from src.models.compiled_forest import CompiledForest, CompiledPowerPredictor
+
 class PowerPredictor:
     """
     Model for predicting Marvel character power levels based on their attributes.
     Uses a Random Forest Regressor to estimate power levels on a scale of 1-10.
     """
     
-    def __init__(self, n_estimators=100, random_state=42):
+    def __init__(self, n_estimators=100, random_state=42, **model_params):
         """
         Initialize the power predictor model.
         
@@ -23,17 +25,22 @@ class PowerPredictor:
             Number of trees in the random forest
         random_state : int, default=42
             Random seed for reproducibility
+        **model_params
+            Further RandomForestRegressor settings (max_depth,
+            min_samples_leaf, max_features, ...), e.g. from
+            ``src.models.tuning``
         """
         self.model = RandomForestRegressor(
             n_estimators=n_estimators,
-            random_state=random_state
+            random_state=random_state,
+            **model_params
         )
         self.scaler = StandardScaler()
         self.feature_names = None
     
-    def preprocess_data(self, df):
+    def encode_features(self, df):
         """
-        Preprocess the data for power prediction.
+        One-hot encode the model inputs of a DataFrame.
         
         Parameters:
         -----------
@@ -42,8 +49,8 @@ class PowerPredictor:
             
         Returns:
         --------
-        tuple
-            (X, power_levels) - feature matrix and target values
+        pandas.DataFrame
+            Dummy-encoded features
         """
         # Extract features from the dataset
         # For now, we'll use a simple approach based on hero/villain status
@@ -55,9 +62,27 @@ class PowerPredictor:
         # Create dummy variables for estimated power level if it exists
         if 'Estimated_Power_Level' in df.columns:
             power_level_dummies = pd.get_dummies(df['Estimated_Power_Level'], prefix='power')
-            features = pd.concat([hero_villain_dummies, power_level_dummies], axis=1)
-        else:
-            features = hero_villain_dummies
+            return pd.concat([hero_villain_dummies, power_level_dummies], axis=1)
+        return hero_villain_dummies
+    
+    def preprocess_data(self, df, encoded=None):
+        """
+        Preprocess the data for power prediction.
+        
+        Parameters:
+        -----------
+        df : pandas.DataFrame
+            DataFrame containing character data
+        encoded : pandas.DataFrame, optional
+            Precomputed ``encode_features(df)``, e.g. from
+            ``FeatureTable.predictor_features``
+            
+        Returns:
+        --------
+        tuple
+            (X, power_levels) - feature matrix and target values
+        """
+        features = self.encode_features(df) if encoded is None else encoded
             
         # Store feature names for later use
         self.feature_names = features.columns.tolist()
@@ -103,7 +128,7 @@ class PowerPredictor:
         
         return features, power_levels
     
-    def train(self, df, test_size=0.3, random_state=42):
+    def train(self, df, test_size=0.3, random_state=42, encoded=None):
         """
         Train the power prediction model.
         
@@ -115,6 +140,8 @@ class PowerPredictor:
             Proportion of data to use for testing
         random_state : int, default=42
             Random seed for train-test split
+        encoded : pandas.DataFrame, optional
+            Precomputed ``encode_features(df)``
         
         Returns:
         --------
@@ -122,7 +149,7 @@ class PowerPredictor:
             Dictionary containing evaluation metrics
         """
         # Preprocess the data
-        X, y = self.preprocess_data(df)
+        X, y = self.preprocess_data(df, encoded)
         
         # Scale the features
         X_scaled = self.scaler.fit_transform(X)
@@ -167,8 +194,9 @@ class PowerPredictor:
         numpy.ndarray
             Predicted power levels (1-10 scale)
         """
-        # Preprocess the data
-        X, _ = self.preprocess_data(df)
+        # Encode the data with the training columns; categories missing from
+        # this frame (e.g. a single row) become all-zero dummy columns
+        X = self.encode_features(df).reindex(columns=self.feature_names, fill_value=0)
         
         # Scale the features
         X_scaled = self.scaler.transform(X)
@@ -192,14 +220,52 @@ class PowerPredictor:
         float
             Predicted power level (1-10 scale)
         """
+        return self.predict_power_levels([hero_villain], [estimated_power_level])[0]
+    
+    def predict_power_levels(self, hero_villains, estimated_power_levels):
+        """
+        Predict power levels for many characters in one model call.
+        
+        Parameters:
+        -----------
+        hero_villains : sequence of str
+            'Hero', 'Villain', or other role category per character
+        estimated_power_levels : sequence of str
+            'High', 'Medium', or 'Low' per character
+        
+        Returns:
+        --------
+        numpy.ndarray
+            Predicted power levels (1-10 scale)
+        """
         # Create a DataFrame with the character attributes
         df = pd.DataFrame({
-            'Hero/Villain': [hero_villain],
-            'Estimated_Power_Level': [estimated_power_level]
+            'Hero/Villain': list(hero_villains),
+            'Estimated_Power_Level': list(estimated_power_levels)
         })
         
         # Make prediction
-        return self.predict(df)[0]
+        return self.predict(df)
+    
+    def compile(self):
+        """
+        Export the trained model for fast, scikit-learn-free inference.
+        
+        Returns:
+        --------
+        CompiledPowerPredictor
+            Predictor with the same ``predict`` and ``predict_power_level``
+            methods, backed by flattened NumPy arrays
+        """
+        if self.feature_names is None:
+            raise ValueError("Model not trained. Please train the model first.")
+        
+        return CompiledPowerPredictor(
+            CompiledForest.from_sklearn(self.model),
+            self.feature_names,
+            self.scaler.mean_,
+            self.scaler.scale_
+        )
     
     def save_model(self, model_path):
         """
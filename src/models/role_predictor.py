@@ -5,13 +5,16 @@ from sklearn.metrics import classification_report, confusion_matrix
 import joblib
 import os
 
+from src.models.compiled_forest import CompiledForest
+from src.preprocessing.compact_tfidf import CompactTfidf, is_tfidf
+
 class RolePredictor:
     """
     Model for predicting Marvel character roles based on their powers.
     Uses TF-IDF vectorized powers to classify characters as Hero, Villain, or Antihero.
     """
     
-    def __init__(self, n_estimators=100, random_state=42):
+    def __init__(self, n_estimators=100, random_state=42, **model_params):
         """
         Initialize the role predictor model.
         
@@ -21,10 +24,15 @@ class RolePredictor:
             Number of trees in the random forest
         random_state : int, default=42
             Random seed for reproducibility
+        **model_params
+            Further RandomForestClassifier settings (max_depth,
+            min_samples_leaf, max_features, ...), e.g. from
+            ``src.models.tuning``
         """
         self.model = RandomForestClassifier(
             n_estimators=n_estimators,
-            random_state=random_state
+            random_state=random_state,
+            **model_params
         )
         self.classes_ = None
         self.tfidf_vectorizer = None
@@ -114,7 +122,7 @@ class RolePredictor:
         -----------
         powers_text : str
             Text description of character powers
-        tfidf_vectorizer : TfidfVectorizer
+        tfidf_vectorizer : TfidfVectorizer or CompactTfidf
             Fitted TF-IDF vectorizer for transforming text
         
         Returns:
@@ -134,6 +142,21 @@ class RolePredictor:
         
         return predicted_role, proba_dict
     
+    def compile(self):
+        """
+        Export the trained model for fast, scikit-learn-free inference.
+        
+        Returns:
+        --------
+        CompiledForest
+            Forest with ``predict`` and ``predict_proba`` methods accepting
+            the same TF-IDF matrices, backed by flattened NumPy arrays
+        """
+        if self.classes_ is None:
+            raise ValueError("Model not trained. Please train the model first.")
+        
+        return CompiledForest.from_sklearn(self.model)
+    
     def save_model(self, model_path, vectorizer=None):
         """
         Save the trained model and vectorizer to disk.
@@ -142,8 +165,9 @@ class RolePredictor:
         -----------
         model_path : str
             Path to save the model
-        vectorizer : TfidfVectorizer, optional
-            TF-IDF vectorizer to save alongside the model
+        vectorizer : TfidfVectorizer or CompactTfidf, optional
+            TF-IDF vectorizer to save alongside the model; a CompactTfidf
+            is saved as a memory-mappable ``tfidf`` directory
         """
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(model_path), exist_ok=True)
@@ -152,7 +176,10 @@ class RolePredictor:
         joblib.dump(self.model, model_path)
         
         # Save the vectorizer if provided
-        if vectorizer is not None:
+        if isinstance(vectorizer, CompactTfidf):
+            self.tfidf_vectorizer = vectorizer
+            vectorizer.save(os.path.join(os.path.dirname(model_path), 'tfidf'))
+        elif vectorizer is not None:
             self.tfidf_vectorizer = vectorizer
             vectorizer_path = os.path.join(
                 os.path.dirname(model_path),
@@ -172,7 +199,8 @@ class RolePredictor:
         model_path : str
             Path to the saved model
         vectorizer_path : str, optional
-            Path to the saved vectorizer
+            Path to the saved vectorizer (a joblib file or a CompactTfidf
+            directory)
         
         Returns:
         --------
@@ -187,7 +215,9 @@ class RolePredictor:
         predictor.classes_ = predictor.model.classes_
         
         # Load the vectorizer if path provided
-        if vectorizer_path is not None:
+        if vectorizer_path is not None and is_tfidf(vectorizer_path):
+            predictor.tfidf_vectorizer = CompactTfidf.load(vectorizer_path)
+        elif vectorizer_path is not None:
             predictor.tfidf_vectorizer = joblib.load(vectorizer_path)
         
         return predictor
\ No newline at end of file
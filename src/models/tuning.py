@@ -0,0 +1,409 @@
+"""
+Successive-halving hyperparameter search for the random forest predictors.
+
+The scaled feature matrix and the cross-validation splits are computed once
+and handed to every worker process through the pool initializer, so each
+candidate evaluation only pays for fitting and scoring. Candidates start on a
+small slice of every training fold; after each rung only the best
+``1/eta`` continue with ``eta`` times more rows. Every evaluated candidate is
+compiled (``src/models/compiled_forest.py``) to measure single-row latency
+and artifact size, and the report includes the Pareto front of score versus
+latency versus size over the candidates fitted on the full folds.
+
+Usage:
+    python -m src.models.tuning --task power --n-candidates 27 --n-jobs 4 --output tuning.json
+"""
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.metrics import accuracy_score, r2_score
+from sklearn.model_selection import KFold, StratifiedKFold
+
+from src.models.compiled_forest import CompiledForest
+from src.models.power_predictor import PowerPredictor
+from src.preprocessing.data_processor import MarvelDataProcessor
+
+# Values sampled for each random forest setting
+SEARCH_SPACE = {
+    'n_estimators': [10, 25, 50, 100, 200],
+    'max_depth': [None, 3, 5, 8, 12, 20],
+    'min_samples_leaf': [1, 2, 4, 8],
+    'max_features': ['sqrt', 'log2', 0.5, 1.0],
+}
+
+TASKS = ('power', 'role')
+
+# Single-row predictions timed per candidate
+LATENCY_REPEAT = 30
+
+# State shared with worker processes by _init_worker
+_WORKER = {}
+
+
+def prepare_power_data(df, random_state=42):
+    """
+    Build the scaled feature matrix and targets used by ``PowerPredictor``.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        Character data with 'Hero/Villain' and 'Estimated_Power_Level'
+    random_state : int, default=42
+        Seed for the synthetic power level targets
+
+    Returns:
+    --------
+    tuple
+        (X_scaled, y)
+    """
+    predictor = PowerPredictor()
+    # The targets are drawn with numpy's global generator
+    np.random.seed(random_state)
+    X, y = predictor.preprocess_data(df)
+    return predictor.scaler.fit_transform(X), y
+
+
+def prepare_role_data(df, min_df=2):
+    """
+    Build the TF-IDF powers matrix and role labels used by ``RolePredictor``.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        Character data with 'Powers' and 'Role'
+    min_df : int, default=2
+        Minimum document frequency for TF-IDF
+
+    Returns:
+    --------
+    tuple
+        (X_tfidf, y)
+    """
+    processor = MarvelDataProcessor(df=df).vectorize_powers(min_df=min_df)
+    return processor.get_tfidf_matrix(), df['Role'].astype(str).to_numpy()
+
+
+def make_folds(task, y, cv=5, random_state=42):
+    """
+    Compute shuffled cross-validation splits once for the whole search.
+
+    Role splits are stratified when every class has at least ``cv`` members.
+    Training indices are shuffled so any prefix is a random subsample.
+
+    Returns:
+    --------
+    list of tuple
+        (train_indices, validation_indices) per fold
+    """
+    if task == 'role' and pd.Series(y).value_counts().min() >= cv:
+        splitter = StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state)
+    else:
+        splitter = KFold(n_splits=cv, shuffle=True, random_state=random_state)
+
+    rng = np.random.default_rng(random_state)
+    return [(rng.permutation(train), validation) for train, validation in splitter.split(np.zeros(len(y)), y)]
+
+
+def sample_candidates(n_candidates, space=None, random_state=42):
+    """
+    Draw distinct random parameter combinations from the search space.
+
+    Parameters:
+    -----------
+    n_candidates : int
+        Number of combinations to draw (fewer if the space is smaller)
+    space : dict, optional
+        Parameter -> list of values (defaults to SEARCH_SPACE)
+    random_state : int, default=42
+        Random seed
+
+    Returns:
+    --------
+    list of dict
+        Parameter combinations
+    """
+    space = space or SEARCH_SPACE
+    rng = np.random.default_rng(random_state)
+    names = sorted(space)
+    total = math.prod(len(space[name]) for name in names)
+
+    candidates, seen = [], set()
+    while len(candidates) < min(n_candidates, total):
+        choice = tuple(int(rng.integers(len(space[name]))) for name in names)
+        if choice not in seen:
+            seen.add(choice)
+            candidates.append({name: space[name][i] for name, i in zip(names, choice)})
+    return candidates
+
+
+def pareto_front(records):
+    """
+    Return the records not dominated on (higher score, lower latency, smaller size).
+    """
+    def dominates(a, b):
+        better_or_equal = (a['score'] >= b['score'] and a['latencyMs'] <= b['latencyMs']
+                           and a['sizeBytes'] <= b['sizeBytes'])
+        strictly_better = (a['score'] > b['score'] or a['latencyMs'] < b['latencyMs']
+                           or a['sizeBytes'] < b['sizeBytes'])
+        return better_or_equal and strictly_better
+
+    front = [r for r in records if not any(dominates(other, r) for other in records if other is not r)]
+    return sorted(front, key=lambda r: -r['score'])
+
+
+def _init_worker(task, X, y, folds, random_state):
+    _WORKER.update(task=task, X=X, y=y, folds=folds, random_state=random_state)
+
+
+def _evaluate_candidate(params, n_samples):
+    # Fit on the first n_samples rows of every cached training fold
+    task, X, y = _WORKER['task'], _WORKER['X'], _WORKER['y']
+    estimator_class = RandomForestRegressor if task == 'power' else RandomForestClassifier
+    scorer = r2_score if task == 'power' else accuracy_score
+
+    fold_scores = []
+    model = None
+    for train, validation in _WORKER['folds']:
+        subset = train[:n_samples]
+        model = estimator_class(random_state=_WORKER['random_state'], n_jobs=1, **params)
+        model.fit(X[subset], y[subset])
+        fold_scores.append(float(scorer(y[validation], model.predict(X[validation]))))
+
+    # Latency and size of the serving artifact, from the last fold's model
+    compiled = CompiledForest.from_sklearn(model)
+    row = X[_WORKER['folds'][-1][1][:1]]
+    compiled.predict(row)
+    timings = []
+    for _ in range(LATENCY_REPEAT):
+        start = time.perf_counter()
+        compiled.predict(row)
+        timings.append(time.perf_counter() - start)
+
+    return {
+        'score': float(np.mean(fold_scores)),
+        'foldScores': fold_scores,
+        'latencyMs': float(np.median(timings) * 1000),
+        'sizeBytes': int(sum(getattr(compiled, name).nbytes for name in
+                             ('feature', 'threshold', 'left', 'right', 'value', 'roots', 'used_features'))),
+        'nNodes': compiled.n_nodes,
+    }
+
+
+class SuccessiveHalvingSearch:
+    """
+    Parallel successive-halving random search over forest hyperparameters.
+    """
+
+    def __init__(self, task, X, y, n_candidates=27, eta=3, cv=5, min_resources=None,
+                 max_latency_ms=None, n_jobs=None, space=None, random_state=42):
+        """
+        Initialize the search.
+
+        Parameters:
+        -----------
+        task : str
+            'power' (regression, scored by R²) or 'role' (classification,
+            scored by accuracy)
+        X : numpy.ndarray or scipy.sparse matrix
+            Prepared features (see prepare_power_data / prepare_role_data)
+        y : numpy.ndarray
+            Targets
+        n_candidates : int, default=27
+            Random candidates in the first rung
+        eta : int, default=3
+            Halving factor: 1/eta of the candidates survive each rung and the
+            training rows grow by eta
+        cv : int, default=5
+            Cross-validation folds
+        min_resources : int, optional
+            Training rows per fold in the first rung (default: enough for 10
+            rows, or two per class for 'role')
+        max_latency_ms : float, optional
+            Drop candidates whose compiled single-row latency exceeds this
+        n_jobs : int, optional
+            Worker processes (defaults to the CPU count)
+        space : dict, optional
+            Parameter -> list of values (defaults to SEARCH_SPACE)
+        random_state : int, default=42
+            Seed for candidate sampling, folds and the forests
+        """
+        if task not in TASKS:
+            raise ValueError(f"Unknown task '{task}'. Expected one of {TASKS}.")
+        if eta < 2:
+            raise ValueError("eta must be at least 2.")
+
+        self.task = task
+        self.X = X
+        self.y = np.asarray(y)
+        self.n_candidates = n_candidates
+        self.eta = eta
+        self.cv = cv
+        self.min_resources = min_resources
+        self.max_latency_ms = max_latency_ms
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.space = space
+        self.random_state = random_state
+
+    def _schedule(self, max_resources):
+        # Rows per fold for each rung, ending at the full training fold
+        min_resources = self.min_resources
+        if min_resources is None:
+            min_resources = 10 if self.task == 'power' else max(10, 2 * len(np.unique(self.y)))
+        min_resources = min(min_resources, max_resources)
+
+        n_rungs = min(
+            1 + int(math.floor(math.log(max(self.n_candidates, 1), self.eta))),
+            1 + int(math.floor(math.log(max_resources / min_resources, self.eta)))
+        )
+        return [int(round(max_resources / self.eta ** (n_rungs - 1 - rung))) for rung in range(n_rungs)]
+
+    def run(self):
+        """
+        Run the search.
+
+        Returns:
+        --------
+        dict
+            Every evaluation, the best candidate and the Pareto front of
+            score, latency and size. The best candidate and the front only
+            use evaluations on the full training folds: the final rung, plus
+            refits (rung 'refit') of candidates dropped earlier that were on
+            the front of their latest evaluations.
+        """
+        started = time.perf_counter()
+        folds = make_folds(self.task, self.y, self.cv, self.random_state)
+        schedule = self._schedule(min(len(train) for train, _ in folds))
+        candidates = list(enumerate(sample_candidates(self.n_candidates, self.space, self.random_state)))
+
+        init_args = (self.task, self.X, self.y, folds, self.random_state)
+        executor = None
+        if self.n_jobs > 1:
+            executor = ProcessPoolExecutor(max_workers=self.n_jobs, initializer=_init_worker, initargs=init_args)
+        else:
+            _init_worker(*init_args)
+
+        def evaluate(batch, n_samples, rung):
+            if executor is not None:
+                results = list(executor.map(_evaluate_candidate, [params for _, params in batch],
+                                            [n_samples] * len(batch)))
+            else:
+                results = [_evaluate_candidate(params, n_samples) for _, params in batch]
+            evaluated = []
+            for (candidate_id, params), result in zip(batch, results):
+                record = {'id': candidate_id, 'params': params, 'rung': rung, 'resource': n_samples}
+                record.update(result)
+                record['withinLatencySLO'] = (self.max_latency_ms is None
+                                              or record['latencyMs'] <= self.max_latency_ms)
+                evaluated.append(record)
+            return evaluated
+
+        max_resources = schedule[-1]
+        records = []
+        rungs = []
+        try:
+            for rung, n_samples in enumerate(schedule):
+                evaluated = evaluate(candidates, n_samples, rung)
+                records.extend(evaluated)
+
+                eligible = sorted((r for r in evaluated if r['withinLatencySLO']), key=lambda r: -r['score'])
+                keep = max(1, len(evaluated) // self.eta) if rung < len(schedule) - 1 else len(eligible)
+                survivors = eligible[:keep]
+                rungs.append({'rung': rung, 'resource': n_samples, 'candidates': len(evaluated),
+                              'survivors': len(survivors)})
+                print(f"Rung {rung}: {len(evaluated)} candidates on {n_samples} rows/fold, "
+                      f"best score {eligible[0]['score']:.4f}" if eligible else
+                      f"Rung {rung}: no candidate met the latency SLO")
+
+                if not survivors:
+                    break
+                candidates = [(r['id'], r['params']) for r in survivors]
+
+            # Candidates dropped early were fitted on a few rows, so their
+            # latency and size look far better than at full size. Refit those
+            # on the front of the latest evaluations on the full folds, and
+            # build the front only from full-size evaluations.
+            latest = {}
+            for record in records:
+                latest[record['id']] = record
+            refit = [(r['id'], r['params']) for r in pareto_front([r for r in latest.values()
+                                                                   if r['withinLatencySLO']])
+                     if r['resource'] < max_resources]
+            if refit:
+                print(f"Refitting {len(refit)} Pareto candidates on {max_resources} rows/fold")
+                records.extend(evaluate(refit, max_resources, 'refit'))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        final = [r for r in records if r['resource'] == max_resources and r['withinLatencySLO']]
+        front = pareto_front(final)
+
+        return {
+            'task': self.task,
+            'eta': self.eta,
+            'cv': self.cv,
+            'maxLatencyMs': self.max_latency_ms,
+            'rungs': rungs,
+            # Highest score on the front, so ties go to the cheaper model
+            'best': front[0] if front else None,
+            'paretoFront': front,
+            'evaluations': records,
+            'elapsedSeconds': time.perf_counter() - started,
+        }
+
+
+def main():
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser = argparse.ArgumentParser(description='Tune the random forest predictors with successive halving')
+    parser.add_argument('--task', choices=TASKS, default='power')
+    parser.add_argument('--data', default=os.path.join(project_root, 'data', 'marvel_characters_dataset.csv'))
+    parser.add_argument('--n-candidates', type=int, default=27)
+    parser.add_argument('--eta', type=int, default=3)
+    parser.add_argument('--cv', type=int, default=5)
+    parser.add_argument('--min-resources', type=int, help='Training rows per fold in the first rung')
+    parser.add_argument('--max-latency-ms', type=float, help='Single-row latency SLO for the compiled model')
+    parser.add_argument('--n-jobs', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--random-state', type=int, default=42)
+    parser.add_argument('--output', help='Write the full report as JSON to this path')
+    args = parser.parse_args()
+
+    processor = MarvelDataProcessor(data_path=args.data).fill_missing()
+    if args.task == 'power':
+        df = processor.get_processed_data()
+        if 'Hero/Villain' not in df.columns:
+            df['Hero/Villain'] = df['Role']
+        df = MarvelDataProcessor(df=df).estimate_power_levels().get_processed_data()
+        X, y = prepare_power_data(df, args.random_state)
+    else:
+        X, y = prepare_role_data(processor.get_processed_data())
+
+    report = SuccessiveHalvingSearch(
+        args.task, X, y, n_candidates=args.n_candidates, eta=args.eta, cv=args.cv,
+        min_resources=args.min_resources, max_latency_ms=args.max_latency_ms,
+        n_jobs=args.n_jobs, random_state=args.random_state
+    ).run()
+
+    if report['best'] is not None:
+        best = report['best']
+        print(f"Best: {best['params']} score={best['score']:.4f} latency={best['latencyMs']:.3f}ms "
+              f"size={best['sizeBytes'] / 1e3:.0f}KB")
+    print("Pareto front (score, latency, size):")
+    for record in report['paretoFront']:
+        print(f"  {record['score']:.4f}  {record['latencyMs']:.3f}ms  {record['sizeBytes'] / 1e3:7.0f}KB  "
+              f"rung {record['rung']}  {record['params']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
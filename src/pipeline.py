@@ -0,0 +1,463 @@
+"""
+Cached, content-addressed runner for the character analysis pipeline.
+
+The workflow of ``notebooks/marvel_analysis.ipynb`` is declared as a DAG of
+stages::
+
+    load -> clean -> power_levels -+-> tfidf -> role_model -+-> export
+                                   +-> network -------------+
+
+Every stage output is stored under ``<cache>/<stage>/<key>/`` where the key
+hashes the stage's code (its function and the modules it declares), its
+parameters and the content digests of its inputs (the source file, or
+every file of a snapshot directory, for ``load``; the upstream outputs
+otherwise). A stage only runs when its key has no stored output, so editing
+one stage's code or parameters re-runs that stage and, only if its output
+actually changed, the stages downstream of it.
+Stages whose inputs are ready run concurrently in worker processes
+(``--n-jobs``), e.g. the network next to TF-IDF and model training.
+
+Usage:
+    python -m src.pipeline "data/Marvels - 2 (1).csv" --output data/pipeline_output
+    python -m src.pipeline data.csv --set tfidf.min_df=2 --set role_model.n_estimators=200 --n-jobs 2
+    python -m src.pipeline data.csv --target network --force clean
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import joblib
+
+# Allow running as a script from the project root
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.models import role_predictor
+from src.models.role_predictor import RolePredictor
+from src.preprocessing import compact_tfidf, data_processor, dedup, parallel, snapshot
+from src.preprocessing.data_processor import MarvelDataProcessor
+from src.utils.cache import cache_key
+from src.visualization import network_analytics, network_visualizer
+from src.visualization.network_visualizer import MarvelNetworkVisualizer
+
+DEFAULT_DATA_PATH = os.path.join(project_root, 'data', 'Marvels - 2 (1).csv')
+DEFAULT_CACHE_DIR = os.path.join(project_root, 'data', 'pipeline_cache')
+DEFAULT_OUTPUT_DIR = os.path.join(project_root, 'data', 'pipeline_output')
+
+OUTPUT_FILE = 'output.joblib'
+META_FILE = 'stage.json'
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def path_digest(path):
+    """
+    SHA-256 of a file's contents, or of every file in a directory (e.g. a
+    dataset snapshot) together with its relative path.
+    """
+    if not os.path.isdir(path):
+        return file_digest(path)
+    digest = hashlib.sha256()
+    for root, dirs, names in os.walk(path):
+        dirs.sort()
+        for name in sorted(names):
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, path).replace(os.sep, '/').encode('utf-8'))
+            digest.update(file_digest(file_path).encode('ascii'))
+    return digest.hexdigest()
+
+
+class Stage:
+    """
+    One step of the pipeline.
+
+    ``func`` receives the outputs of ``deps`` as positional arguments, in
+    order, and ``params`` as keyword arguments, and returns the stage output.
+    """
+
+    def __init__(self, name, func, deps=(), params=None, code=(), files=(), cache=True):
+        """
+        Declare a stage.
+
+        Parameters:
+        -----------
+        name : str
+            Stage name
+        func : callable
+            Module-level function computing the output
+        deps : tuple of str
+            Stages whose outputs ``func`` receives
+        params : dict, optional
+            Keyword arguments of ``func``; part of the cache key
+        code : tuple of modules
+            Modules whose source is part of the cache key, in addition to
+            ``func`` itself
+        files : tuple of str
+            Names of ``params`` holding input file or directory paths,
+            whose contents are part of the cache key
+        cache : bool, default=True
+            Store the output; uncached stages (exports) run every time
+        """
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.params = dict(params or {})
+        self.code = tuple(code)
+        self.files = tuple(files)
+        self.cache = cache
+
+    def code_hash(self):
+        """Hash of the stage function and the declared modules' source."""
+        digest = hashlib.sha256(inspect.getsource(self.func).encode('utf-8'))
+        for module in self.code:
+            digest.update(inspect.getsource(module).encode('utf-8'))
+        return digest.hexdigest()
+
+    def key(self, input_digests):
+        """
+        Cache key of the stage for the given input digests.
+
+        Parameters:
+        -----------
+        input_digests : list of str
+            Output digests of ``deps``, in order
+
+        Returns:
+        --------
+        str
+            Key covering code, parameters and inputs
+        """
+        files = {name: path_digest(self.params[name]) for name in self.files}
+        return cache_key(self.name, self.code_hash(), self.params, files, list(input_digests))[:32]
+
+
+# Stage functions; module-level so worker processes can unpickle them
+
+def load_stage(data_path):
+    return MarvelDataProcessor(data_path=data_path).get_processed_data()
+
+
+def clean_stage(df, near_duplicates=False):
+    processor = MarvelDataProcessor(df=df).fill_missing()
+    return processor.clean_data(near_duplicates=near_duplicates).get_processed_data()
+
+
+def power_levels_stage(df):
+    return MarvelDataProcessor(df=df).estimate_power_levels().get_processed_data()
+
+
+def tfidf_stage(df, min_df=2, max_df=1.0, max_features=None):
+    return MarvelDataProcessor(df=df).vectorize_powers(min_df=min_df, max_df=max_df,
+                                                       max_features=max_features).tfidf
+
+
+def role_model_stage(df, tfidf, n_estimators=100, test_size=0.3, random_state=42):
+    predictor = RolePredictor(n_estimators=n_estimators, random_state=random_state)
+    metrics = predictor.train(tfidf.matrix, df['Role'].astype(str).to_numpy(), test_size=test_size,
+                              random_state=random_state)
+    return {'predictor': predictor, 'metrics': metrics}
+
+
+def network_stage(df):
+    return MarvelNetworkVisualizer(df).create_affiliation_network(compute_layout=False)
+
+
+def export_stage(df, tfidf, role_model, network, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    MarvelDataProcessor(df=df).save_processed_data(os.path.join(output_dir, 'processed_characters.csv'))
+    network.export_network_data(os.path.join(output_dir, 'network_data.json'))
+    role_model['predictor'].save_model(os.path.join(output_dir, 'models', 'role_predictor.joblib'), tfidf)
+
+    metrics = role_model['metrics']
+    summary = {
+        'characters': len(df),
+        'terms': tfidf.n_features,
+        'role_accuracy': metrics['classification_report']['accuracy'],
+        'role_cv_mean': float(metrics['cv_mean']),
+        'role_cv_std': float(metrics['cv_std']),
+        'network_nodes': network.graph.number_of_nodes(),
+        'network_edges': network.graph.number_of_edges(),
+    }
+    with open(os.path.join(output_dir, 'summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def default_stages(data_path=DEFAULT_DATA_PATH, output_dir=DEFAULT_OUTPUT_DIR):
+    """
+    The analysis notebook's workflow as pipeline stages.
+
+    Parameters:
+    -----------
+    data_path : str
+        Character CSV file (or snapshot directory)
+    output_dir : str
+        Directory the export stage writes to
+
+    Returns:
+    --------
+    list of Stage
+        Stages in dependency order
+    """
+    return [
+        Stage('load', load_stage, params={'data_path': data_path}, code=(data_processor, snapshot),
+              files=('data_path',)),
+        Stage('clean', clean_stage, deps=('load',), params={'near_duplicates': False},
+              code=(data_processor, dedup, parallel)),
+        Stage('power_levels', power_levels_stage, deps=('clean',), code=(data_processor, parallel)),
+        Stage('tfidf', tfidf_stage, deps=('power_levels',),
+              params={'min_df': 2, 'max_df': 1.0, 'max_features': None},
+              code=(data_processor, parallel, compact_tfidf)),
+        Stage('role_model', role_model_stage, deps=('power_levels', 'tfidf'),
+              params={'n_estimators': 100, 'test_size': 0.3, 'random_state': 42}, code=(role_predictor,)),
+        Stage('network', network_stage, deps=('power_levels',), code=(network_visualizer, network_analytics)),
+        Stage('export', export_stage, deps=('power_levels', 'tfidf', 'role_model', 'network'),
+              params={'output_dir': output_dir}, cache=False),
+    ]
+
+
+def _write_output(output, path, meta):
+    # Write next to the final path, then move it into place
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    joblib.dump(output, os.path.join(tmp_path, OUTPUT_FILE))
+    meta = dict(meta, digest=file_digest(os.path.join(tmp_path, OUTPUT_FILE)))
+    with open(os.path.join(tmp_path, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2, default=str)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return meta
+
+
+def _execute(func, params, input_paths, path, meta):
+    # Worker entry point: inputs are read from the cache, the output written
+    # to it, so only paths and metadata cross the process boundary
+    inputs = [joblib.load(os.path.join(input_path, OUTPUT_FILE)) for input_path in input_paths]
+    start = time.perf_counter()
+    output = func(*inputs, **params)
+    meta = dict(meta, seconds=time.perf_counter() - start)
+    return _write_output(output, path, meta)
+
+
+class Pipeline:
+    """
+    Runs a DAG of stages, re-running only those whose key has no stored
+    output.
+    """
+
+    def __init__(self, stages, cache_dir=DEFAULT_CACHE_DIR, n_jobs=1):
+        """
+        Initialize the runner.
+
+        Parameters:
+        -----------
+        stages : list of Stage
+            Stages; every dependency must be declared before its dependents
+        cache_dir : str
+            Directory holding the stage outputs
+        n_jobs : int, default=1
+            Worker processes for stages that are ready at the same time;
+            1 runs every stage in this process
+        """
+        self.stages = {}
+        for stage in stages:
+            missing = [dep for dep in stage.deps if dep not in self.stages]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on undeclared stages: {', '.join(missing)}")
+            self.stages[stage.name] = stage
+        self.cache_dir = cache_dir
+        self.n_jobs = n_jobs
+        self.report = []
+
+    def set_param(self, stage, name, value):
+        """
+        Override a stage parameter.
+        """
+        if stage not in self.stages:
+            raise ValueError(f"Unknown stage: {stage}")
+        self.stages[stage].params[name] = value
+        return self
+
+    def path(self, stage, key):
+        return os.path.join(self.cache_dir, stage, key)
+
+    def _required(self, targets):
+        # Targets and everything upstream of them
+        required = set()
+        pending = list(targets or self.stages)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage: {name}")
+            if name not in required:
+                required.add(name)
+                pending.extend(self.stages[name].deps)
+        return required
+
+    def run(self, targets=None, force=()):
+        """
+        Run the stages needed for ``targets``.
+
+        Parameters:
+        -----------
+        targets : list of str, optional
+            Stages to bring up to date (default: all)
+        force : iterable of str
+            Stages to re-run even if their output is stored
+
+        Returns:
+        --------
+        dict
+            Stage name -> metadata (key, output digest, whether it ran and
+            how long it took)
+        """
+        required = self._required(targets)
+        order = [name for name in self.stages if name in required]
+        force = set(force)
+        done = {}
+        self.report = []
+
+        executor = ProcessPoolExecutor(max_workers=self.n_jobs) if self.n_jobs > 1 else None
+        running = {}
+        try:
+            while len(done) < len(order):
+                for name in order:
+                    stage = self.stages[name]
+                    if name in done or name in running.values() or not all(dep in done for dep in stage.deps):
+                        continue
+                    key = stage.key([done[dep]['digest'] for dep in stage.deps])
+                    path = self.path(name, key)
+                    meta = {'stage': name, 'key': key, 'params': stage.params}
+                    input_paths = [done[dep]['path'] for dep in stage.deps]
+
+                    if not stage.cache:
+                        # Uncached stages (exports) run in this process
+                        inputs = [joblib.load(os.path.join(input_path, OUTPUT_FILE)) for input_path in input_paths]
+                        start = time.perf_counter()
+                        stage.func(*inputs, **stage.params)
+                        done[name] = self._record(dict(meta, ran=True, digest=None, path=None,
+                                                       seconds=time.perf_counter() - start))
+                        continue
+
+                    if name not in force and os.path.isfile(os.path.join(path, META_FILE)):
+                        with open(os.path.join(path, META_FILE)) as f:
+                            cached = json.load(f)
+                        done[name] = self._record(dict(cached, ran=False, path=path))
+                    elif executor is None:
+                        print(f"Running {name}...")
+                        meta = _execute(stage.func, stage.params, input_paths, path, meta)
+                        done[name] = self._record(dict(meta, ran=True, path=path))
+                    else:
+                        print(f"Running {name}...")
+                        future = executor.submit(_execute, stage.func, stage.params, input_paths, path, meta)
+                        running[future] = name
+
+                if running:
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        name = running.pop(future)
+                        meta = future.result()
+                        done[name] = self._record(dict(meta, ran=True, path=self.path(name, meta['key'])))
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+        return done
+
+    def _record(self, meta):
+        self.report.append(meta)
+        status = f"ran in {meta['seconds']:.2f}s" if meta['ran'] else 'cached'
+        print(f"  {meta['stage']:<14} {status}")
+        return meta
+
+    def load_output(self, meta):
+        """
+        Load a stage output from the metadata returned by ``run``.
+        """
+        return joblib.load(os.path.join(meta['path'], OUTPUT_FILE))
+
+    def prune(self, keep):
+        """
+        Remove the stored outputs of the stages in ``keep`` other than the
+        ones listed there.
+
+        Parameters:
+        -----------
+        keep : dict
+            Metadata returned by ``run``; its stored outputs are kept, and
+            stages it does not cover are left alone
+        """
+        keep_paths = {os.path.abspath(meta['path']) for meta in keep.values() if meta.get('path')}
+        for name in keep:
+            stage_dir = os.path.join(self.cache_dir, name)
+            if not os.path.isdir(stage_dir):
+                continue
+            for key in os.listdir(stage_dir):
+                path = os.path.abspath(os.path.join(stage_dir, key))
+                if path not in keep_paths:
+                    shutil.rmtree(path, ignore_errors=True)
+        return self
+
+
+def parse_assignment(text):
+    """
+    Parse a ``stage.param=value`` override; the value is read as JSON when
+    possible (numbers, true/false, null), otherwise kept as a string.
+    """
+    target, sep, raw = text.partition('=')
+    stage, dot, name = target.partition('.')
+    if not sep or not dot or not stage or not name:
+        raise ValueError(f"Expected stage.param=value, got: {text}")
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        value = raw
+    return stage, name, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the character analysis pipeline, reusing cached stages')
+    parser.add_argument('data', nargs='?', default=DEFAULT_DATA_PATH, help='Character CSV file or snapshot')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_DIR, help='Directory for the exported results')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Directory for cached stage outputs')
+    parser.add_argument('--set', action='append', default=[], metavar='STAGE.PARAM=VALUE',
+                        help='Override a stage parameter (repeatable)')
+    parser.add_argument('--target', action='append', help='Only bring these stages up to date (repeatable)')
+    parser.add_argument('--force', action='append', default=[], help='Re-run a stage even if cached (repeatable)')
+    parser.add_argument('--n-jobs', type=int, default=1, help='Worker processes for independent stages')
+    parser.add_argument('--prune', action='store_true', help='Remove cached outputs not used by this run')
+    args = parser.parse_args()
+
+    pipeline = Pipeline(default_stages(args.data, args.output), cache_dir=args.cache_dir, n_jobs=args.n_jobs)
+    try:
+        for assignment in args.set:
+            pipeline.set_param(*parse_assignment(assignment))
+    except ValueError as e:
+        parser.error(str(e))
+
+    start = time.perf_counter()
+    results = pipeline.run(targets=args.target, force=args.force)
+    ran = [name for name, meta in results.items() if meta['ran']]
+    print(f"Pipeline finished in {time.perf_counter() - start:.2f}s; "
+          f"ran {len(ran)} of {len(results)} stages ({', '.join(ran) or 'none'})")
+    if args.prune:
+        pipeline.prune(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+"""
+Compact, persistable TF-IDF model of the Powers column.
+
+``CompactTfidf`` keeps only what is needed to use and extend the TF-IDF
+representation: the CSR matrix as float32 values with int32 column indices,
+the vocabulary as one UTF-8 buffer with offsets (sorted, like
+``TfidfVectorizer.get_feature_names_out``) and the float32 IDF weights.
+The fitted ``TfidfVectorizer`` with its vocabulary dict is dropped after
+fitting.
+
+``save`` writes the arrays as ``.npy`` files that ``load`` memory-maps, so a
+process can use the matrix without re-vectorizing the dataset, and
+``transform`` vectorizes new text exactly like the original vectorizer.
+"""
+import json
+import os
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfTransformer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+TFIDF_FORMAT_VERSION = 1
+
+_TFIDF_ARRAYS = ('data', 'indices', 'indptr', 'idf', 'term_offsets')
+
+
+def _index_dtype(nnz):
+    # scipy upcasts both index arrays to int64 if either is, so indptr
+    # stays int32 unless the matrix really needs 64-bit offsets
+    return np.int32 if nnz < np.iinfo(np.int32).max else np.int64
+
+
+class CompactTfidf:
+    """
+    TF-IDF matrix and vocabulary in float32/int32 arrays.
+
+    Exposes ``transform``, ``build_analyzer`` and ``get_feature_names_out``
+    so it can stand in for a fitted ``TfidfVectorizer``.
+    """
+
+    def __init__(self, data, indices, indptr, shape, idf, term_bytes, term_offsets, params=None):
+        """
+        Wrap the arrays of a fitted model; use ``fit`` or ``load``.
+        """
+        self.data = data
+        self.indices = indices
+        self.indptr = indptr
+        self.shape = tuple(shape)
+        self.idf = idf
+        self.term_bytes = term_bytes
+        self.term_offsets = term_offsets
+        self.params = dict(params or {})
+        self._vocabulary = None
+        self._analyzer = None
+
+    @classmethod
+    def fit(cls, texts, stop_words='english', min_df=1, max_df=1.0, max_features=None):
+        """
+        Fit the TF-IDF model on a collection of texts.
+
+        Parameters:
+        -----------
+        texts : iterable of str
+            Documents (missing values should already be filled)
+        stop_words : str or list, default='english'
+            Stop words passed to the tokenizer
+        min_df : int or float, default=1
+            Ignore terms in fewer documents (count or proportion)
+        max_df : int or float, default=1.0
+            Ignore terms in more documents (count or proportion)
+        max_features : int, optional
+            Keep only the most frequent terms
+
+        Returns:
+        --------
+        CompactTfidf
+            Fitted model holding the matrix of ``texts``
+        """
+        vectorizer = TfidfVectorizer(stop_words=stop_words, min_df=min_df, max_df=max_df,
+                                     max_features=max_features, dtype=np.float32)
+        matrix = vectorizer.fit_transform(texts)
+        params = {'stop_words': stop_words, 'min_df': min_df, 'max_df': max_df, 'max_features': max_features}
+        return cls.from_vectorizer(vectorizer, matrix, params)
+
+    @classmethod
+    def from_vectorizer(cls, vectorizer, matrix, params=None):
+        """
+        Build from a fitted ``TfidfVectorizer`` and the matrix it produced.
+        """
+        matrix = sparse.csr_matrix(matrix)
+        matrix.sort_indices()
+        encoded = [term.encode('utf-8') for term in vectorizer.get_feature_names_out()]
+        term_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(term) for term in encoded], out=term_offsets[1:])
+        if params is None:
+            params = {'stop_words': vectorizer.stop_words, 'min_df': vectorizer.min_df,
+                      'max_df': vectorizer.max_df, 'max_features': vectorizer.max_features}
+        return cls(
+            data=matrix.data.astype(np.float32),
+            indices=matrix.indices.astype(np.int32),
+            indptr=matrix.indptr.astype(_index_dtype(matrix.nnz)),
+            shape=matrix.shape,
+            idf=vectorizer.idf_.astype(np.float32),
+            term_bytes=b''.join(encoded),
+            term_offsets=term_offsets,
+            params=params,
+        )
+
+    @classmethod
+    def from_counts(cls, counts, terms, params):
+        """
+        Build from a term-count matrix, weighting it as ``TfidfVectorizer``
+        would.
+
+        Parameters:
+        -----------
+        counts : scipy.sparse.csr_matrix
+            float32 term counts with columns in the order of ``terms``
+        terms : sequence of str
+            Sorted vocabulary
+        params : dict
+            Vectorizer parameters the counts were pruned with
+
+        Returns:
+        --------
+        CompactTfidf
+            Fitted model holding the TF-IDF matrix of ``counts``
+        """
+        transformer = TfidfTransformer().fit(counts)
+        matrix = sparse.csr_matrix(transformer.transform(counts, copy=False))
+        matrix.sort_indices()
+        encoded = [term.encode('utf-8') for term in terms]
+        term_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(term) for term in encoded], out=term_offsets[1:])
+        return cls(
+            data=matrix.data.astype(np.float32),
+            indices=matrix.indices.astype(np.int32),
+            indptr=matrix.indptr.astype(_index_dtype(matrix.nnz)),
+            shape=matrix.shape,
+            idf=transformer.idf_.astype(np.float32),
+            term_bytes=b''.join(encoded),
+            term_offsets=term_offsets,
+            params=params,
+        )
+
+    @property
+    def matrix(self):
+        """The TF-IDF matrix as a ``scipy.sparse.csr_matrix`` sharing the arrays."""
+        return sparse.csr_matrix((self.data, self.indices, self.indptr), shape=self.shape, copy=False)
+
+    @property
+    def n_features(self):
+        return len(self.idf)
+
+    def get_feature_names_out(self):
+        """Vocabulary terms in column order."""
+        data = bytes(self.term_bytes)
+        offsets = self.term_offsets
+        return np.array([data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(self.n_features)],
+                        dtype=object)
+
+    @property
+    def vocabulary_(self):
+        """Mapping of term to column, built on first use."""
+        if self._vocabulary is None:
+            self._vocabulary = {term: column for column, term in enumerate(self.get_feature_names_out())}
+        return self._vocabulary
+
+    def build_analyzer(self):
+        """Tokenizer equivalent to the one used when fitting."""
+        if self._analyzer is None:
+            self._analyzer = TfidfVectorizer(stop_words=self.params.get('stop_words')).build_analyzer()
+        return self._analyzer
+
+    def transform(self, texts):
+        """
+        Vectorize texts with the fitted vocabulary and IDF weights.
+
+        Parameters:
+        -----------
+        texts : iterable of str
+            Documents to vectorize
+
+        Returns:
+        --------
+        scipy.sparse.csr_matrix
+            L2-normalized float32 TF-IDF rows
+        """
+        analyzer = self.build_analyzer()
+        vocabulary = self.vocabulary_
+        indptr = [0]
+        indices = []
+        counts = []
+        for text in texts:
+            columns = Counter(vocabulary[token] for token in analyzer(text) if token in vocabulary)
+            indices.extend(columns.keys())
+            counts.extend(columns.values())
+            indptr.append(len(indices))
+        indices = np.array(indices, dtype=np.int32)
+        data = np.array(counts, dtype=np.float32) * self.idf[indices]
+        matrix = sparse.csr_matrix((data, indices, np.array(indptr, dtype=_index_dtype(len(indices)))),
+                                   shape=(len(indptr) - 1, self.n_features))
+        matrix.sort_indices()
+        return normalize(matrix, copy=False)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the matrix, IDF and vocabulary arrays."""
+        return int(sum(np.asarray(getattr(self, name)).nbytes for name in _TFIDF_ARRAYS) + len(self.term_bytes))
+
+    def save(self, path):
+        """
+        Save the model as a directory of ``.npy`` files.
+
+        Parameters:
+        -----------
+        path : str
+            Directory to write
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in _TFIDF_ARRAYS:
+            np.save(os.path.join(path, f'{name}.npy'), np.ascontiguousarray(getattr(self, name)))
+        with open(os.path.join(path, 'terms.bin'), 'wb') as f:
+            f.write(bytes(self.term_bytes))
+        meta = {
+            'format_version': TFIDF_FORMAT_VERSION,
+            'shape': list(self.shape),
+            'params': self.params,
+        }
+        with open(os.path.join(path, 'tfidf.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+        return self
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load a model written by ``save``.
+
+        Parameters:
+        -----------
+        path : str
+            Directory written by ``save``
+        mmap : bool, default=True
+            Memory-map the arrays so processes share them
+
+        Returns:
+        --------
+        CompactTfidf
+            Loaded model
+        """
+        with open(os.path.join(path, 'tfidf.json')) as f:
+            meta = json.load(f)
+        if meta.get('format_version') != TFIDF_FORMAT_VERSION:
+            raise ValueError(f"Unsupported TF-IDF format version: {meta.get('format_version')}")
+        arrays = {
+            name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None)
+            for name in _TFIDF_ARRAYS
+        }
+        terms_path = os.path.join(path, 'terms.bin')
+        if mmap and os.path.getsize(terms_path):
+            term_bytes = np.memmap(terms_path, dtype=np.uint8, mode='r')
+        else:
+            with open(terms_path, 'rb') as f:
+                term_bytes = f.read()
+        return cls(shape=meta['shape'], term_bytes=term_bytes, params=meta['params'], **arrays)
+
+
+def is_tfidf(path):
+    """
+    Return True if ``path`` is a directory written by ``CompactTfidf.save``.
+    """
+    return os.path.isfile(os.path.join(path, 'tfidf.json'))
@@ -2,6 +2,52 @@ import pandas as pd
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 import re
+import os
+
+from src.preprocessing.compact_tfidf import CompactTfidf
+from src.preprocessing.dedup import NearDuplicateDetector, collapse_duplicates
+from src.preprocessing.parallel import fit_tfidf, map_text, resolve_n_jobs
+from src.preprocessing.snapshot import is_snapshot, open_snapshot, source_signature, write_snapshot
+
+# Stop word list shared by every consumer of the powers tokenization
+POWERS_STOP_WORDS = 'english'
+
+def build_powers_analyzer():
+    """
+    Build the tokenizer used to vectorize the Powers column.
+    
+    Returns:
+    --------
+    callable
+        Function mapping a powers string to a list of normalized terms
+    """
+    return TfidfVectorizer(stop_words=POWERS_STOP_WORDS).build_analyzer()
+
+# Power keywords for each estimated level
+HIGH_POWER_KEYWORDS = ['cosmic', 'reality', 'god', 'manipulation', 'telekinesis', 'magic', 'energy projection']
+MEDIUM_POWER_KEYWORDS = ['superhuman strength', 'regeneration', 'flight', 'enhanced', 'super', 'control']
+
+def estimate_power_level(powers_text):
+    """
+    Estimate a power level ('High', 'Medium' or 'Low') from a powers string.
+    """
+    if pd.isna(powers_text):
+        return 'Low'
+    
+    powers_lower = powers_text.lower()
+    
+    # Check for high power keywords
+    for keyword in HIGH_POWER_KEYWORDS:
+        if keyword in powers_lower:
+            return 'High'
+    
+    # Check for medium power keywords
+    for keyword in MEDIUM_POWER_KEYWORDS:
+        if keyword in powers_lower:
+            return 'Medium'
+    
+    # Default to low
+    return 'Low'
 
 class MarvelDataProcessor:
     """
@@ -9,24 +55,35 @@ class MarvelDataProcessor:
     Handles data cleaning, feature extraction, and preparation for analysis.
     """
     
-    def __init__(self, data_path=None, df=None):
+    def __init__(self, data_path=None, df=None, n_jobs=1):
         """
         Initialize the data processor.
         
         Parameters:
         -----------
         data_path : str, optional
-            Path to the CSV file containing Marvel character data
+            Path to the CSV file (or snapshot directory) containing Marvel
+            character data
         df : pandas.DataFrame, optional
             DataFrame containing Marvel character data
+        n_jobs : int, default=1
+            Worker processes for the row-wise stages (``clean_data``,
+            ``estimate_power_levels``, ``vectorize_powers``); -1 or None
+            uses every CPU. Results are identical to serial mode.
         """
+        self.n_jobs = resolve_n_jobs(n_jobs)
+        
         if df is not None:
             self.df = df.copy()
+        elif data_path is not None and is_snapshot(data_path):
+            self.df = open_snapshot(data_path).to_dataframe(categorical='auto')
         elif data_path is not None:
             self.df = pd.read_csv(data_path)
         else:
             self.df = None
         
+        self.duplicate_clusters = None
+        self.tfidf = None
         self.tfidf_vectorizer = None
         self.powers_tfidf = None
         self.feature_names = None
@@ -43,18 +100,81 @@ class MarvelDataProcessor:
         self.df = pd.read_csv(data_path)
         return self
     
-    def clean_data(self):
+    def load_snapshot(self, snapshot_path):
+        """
+        Load data from a snapshot written by ``save_snapshot``.
+        
+        The snapshot is memory-mapped, so opening it does not parse the CSV.
+        Columns with few distinct values load as ``pandas.Categorical`` over
+        their dictionary codes; the rest (names, ...) are decoded into
+        strings, so the DataFrame is still materialized in full.
+        
+        Parameters:
+        -----------
+        snapshot_path : str
+            Path to the snapshot directory
+        """
+        self.df = open_snapshot(snapshot_path).to_dataframe(categorical='auto')
+        return self
+    
+    def fill_missing(self, value=''):
+        """
+        Replace missing values in every column.
+        
+        Parameters:
+        -----------
+        value : object, default=''
+            Replacement for missing values
+        """
+        if self.df is None:
+            raise ValueError("No data loaded. Please load data first.")
+        
+        # Categorical columns (snapshot loads) only accept known categories
+        for name, column in self.df.items():
+            if (isinstance(column.dtype, pd.CategoricalDtype) and value not in column.cat.categories
+                    and column.isna().any()):
+                self.df[name] = column.cat.add_categories([value])
+        self.df = self.df.fillna(value)
+        
+        return self
+    
+    def label_power_levels_from_alignment(self):
+        """
+        Derive 'Estimated_Power_Level' from the 'Hero/Villain' column:
+        heroes are 'High', villains and everyone else 'Medium'.
+        """
+        if self.df is None:
+            raise ValueError("No data loaded. Please load data first.")
+        
+        # In a real app, this would come from actual data
+        alignment = self.df['Hero/Villain'].astype(str)
+        self.df['Estimated_Power_Level'] = 'Medium'  # Default value
+        self.df.loc[alignment.str.contains('Hero', na=False), 'Estimated_Power_Level'] = 'High'
+        self.df.loc[alignment.str.contains('Villain', na=False), 'Estimated_Power_Level'] = 'Medium'
+        
+        return self
+    
+    def clean_data(self, near_duplicates=None, collapse=True):
         """
         Clean the Marvel character data.
         - Standardize character names
         - Handle duplicates
         - Standardize role categories
+        
+        Parameters:
+        -----------
+        near_duplicates : NearDuplicateDetector or bool, optional
+            Also find near-duplicate characters ("Spiderman", "Spider Man
+            (Peter Parker)"); True uses a default detector. The clusters are
+            kept in ``duplicate_clusters`` for review.
+        collapse : bool, default=True
+            Collapse each near-duplicate cluster into its first row
         """
         if self.df is None:
             raise ValueError("No data loaded. Please load data first.")
         
         # Convert character names to title case for consistency
-        self.df['Character'] = self.df['Character'].str.title()
+        self.df['Character'] = self._title_case(self.df['Character'])
         
         # Check for and remove duplicates
         duplicates = self.df[self.df.duplicated('Character')]
@@ -62,19 +182,60 @@ class MarvelDataProcessor:
             print(f"Removed {len(duplicates)} duplicate characters.")
             self.df = self.df.drop_duplicates('Character')
         
+        if near_duplicates:
+            self.find_near_duplicates(None if near_duplicates is True else near_duplicates)
+            clusters = self.duplicate_clusters
+            if collapse and len(clusters) > 0:
+                print(f"Collapsed {len(clusters)} near-duplicate characters into {clusters['cluster'].nunique()}.")
+                self.df = collapse_duplicates(self.df, clusters)
+        
         # Standardize role categories
-        self.df['Role'] = self.df['Role'].str.title()
+        self.df['Role'] = self._title_case(self.df['Role'])
         
         return self
     
-    def vectorize_powers(self, min_df=2):
+    def find_near_duplicates(self, detector=None):
+        """
+        Find clusters of near-duplicate characters without changing the data.
+        
+        Parameters:
+        -----------
+        detector : NearDuplicateDetector, optional
+            Detector to use (default thresholds otherwise)
+            
+        Returns:
+        --------
+        pandas.DataFrame
+            Cluster members for review, see ``NearDuplicateDetector.find``
+        """
+        if self.df is None:
+            raise ValueError("No data loaded. Please load data first.")
+        
+        detector = detector or NearDuplicateDetector(analyzer=self.get_powers_analyzer())
+        self.duplicate_clusters = detector.find(self.df)
+        return self.duplicate_clusters
+    
+    def _title_case(self, column):
+        if self.n_jobs > 1:
+            return map_text(column, str.title, self.n_jobs)
+        return column.str.title()
+    
+    def vectorize_powers(self, min_df=2, max_df=1.0, max_features=None):
         """
         Vectorize character powers using TF-IDF.
         
+        The matrix is kept as float32 values with int32 indices in a
+        ``CompactTfidf``, which also stands in for the fitted vectorizer
+        (``tfidf_vectorizer``) and can be saved with ``save_tfidf``.
+        
         Parameters:
         -----------
-        min_df : int, default=2
+        min_df : int or float, default=2
             Minimum document frequency for TF-IDF
+        max_df : int or float, default=1.0
+            Maximum document frequency for TF-IDF
+        max_features : int, optional
+            Keep only the most frequent terms
         """
         if self.df is None:
             raise ValueError("No data loaded. Please load data first.")
@@ -82,13 +243,66 @@ class MarvelDataProcessor:
         # Fill NaN values in Powers column
         powers = self.df['Powers'].fillna('')
         
-        # Create and fit TF-IDF vectorizer
-        self.tfidf_vectorizer = TfidfVectorizer(stop_words='english', min_df=min_df)
-        self.powers_tfidf = self.tfidf_vectorizer.fit_transform(powers)
-        self.feature_names = self.tfidf_vectorizer.get_feature_names_out()
+        # Fit TF-IDF and keep only the compact arrays; in parallel mode the
+        # document frequencies are merged across partitions
+        if self.n_jobs > 1:
+            self.tfidf = fit_tfidf(powers, self.n_jobs, stop_words=POWERS_STOP_WORDS, min_df=min_df,
+                                   max_df=max_df, max_features=max_features)
+        else:
+            self.tfidf = CompactTfidf.fit(powers, stop_words=POWERS_STOP_WORDS, min_df=min_df,
+                                          max_df=max_df, max_features=max_features)
+        return self._use_tfidf(self.tfidf)
+    
+    def _use_tfidf(self, tfidf):
+        self.tfidf = tfidf
+        self.tfidf_vectorizer = tfidf
+        self.powers_tfidf = tfidf.matrix
+        self.feature_names = tfidf.get_feature_names_out()
+        return self
+    
+    def save_tfidf(self, output_path):
+        """
+        Save the TF-IDF matrix and vocabulary as memory-mappable arrays.
+        
+        Parameters:
+        -----------
+        output_path : str
+            Directory to write
+        """
+        if self.tfidf is None:
+            raise ValueError("Powers not vectorized. Please call vectorize_powers first.")
+        
+        self.tfidf.save(output_path)
+        print(f"TF-IDF matrix with {self.tfidf.shape[0]} rows saved to {output_path}")
         
         return self
     
+    def load_tfidf(self, tfidf_path):
+        """
+        Load a TF-IDF matrix written by ``save_tfidf`` instead of
+        re-vectorizing the Powers column.
+        
+        Parameters:
+        -----------
+        tfidf_path : str
+            Directory written by ``save_tfidf``
+        """
+        tfidf = CompactTfidf.load(tfidf_path)
+        if self.df is not None and tfidf.shape[0] != len(self.df):
+            raise ValueError(f"TF-IDF matrix has {tfidf.shape[0]} rows but the data has {len(self.df)}.")
+        return self._use_tfidf(tfidf)
+    
+    def get_powers_analyzer(self):
+        """
+        Return the tokenizer used for the Powers column.
+        
+        Uses the fitted vectorizer when available so callers tokenize
+        exactly like ``vectorize_powers`` did.
+        """
+        if self.tfidf_vectorizer is not None:
+            return self.tfidf_vectorizer.build_analyzer()
+        return build_powers_analyzer()
+    
     def estimate_power_levels(self):
         """
         Estimate character power levels based on their powers.
@@ -97,30 +311,11 @@ class MarvelDataProcessor:
         if self.df is None:
             raise ValueError("No data loaded. Please load data first.")
         
-        # Define power keywords for each level
-        high_power_keywords = ['cosmic', 'reality', 'god', 'manipulation', 'telekinesis', 'magic', 'energy projection']
-        medium_power_keywords = ['superhuman strength', 'regeneration', 'flight', 'enhanced', 'super', 'control']
-        
-        def estimate_level(powers_text):
-            if pd.isna(powers_text):
-                return 'Low'
-                
-            powers_lower = powers_text.lower()
-            
-            # Check for high power keywords
-            for keyword in high_power_keywords:
-                if keyword in powers_lower:
-                    return 'High'
-            
-            # Check for medium power keywords
-            for keyword in medium_power_keywords:
-                if keyword in powers_lower:
-                    return 'Medium'
-            
-            # Default to low
-            return 'Low'
-        
-        self.df['Estimated_Power_Level'] = self.df['Powers'].apply(estimate_level)
+        if self.n_jobs > 1:
+            self.df['Estimated_Power_Level'] = map_text(self.df['Powers'], estimate_power_level, self.n_jobs,
+                                                        na_value='Low')
+        else:
+            self.df['Estimated_Power_Level'] = self.df['Powers'].apply(estimate_power_level)
         
         return self
     
@@ -157,4 +352,28 @@ class MarvelDataProcessor:
         self.df.to_csv(output_path, index=False)
         print(f"Processed data saved to {output_path}")
         
+        return self
+    
+    def save_snapshot(self, output_path, source_path=None):
+        """
+        Save the processed dataframe as a memory-mappable snapshot.
+        
+        Parameters:
+        -----------
+        output_path : str
+            Snapshot directory to create or replace
+        source_path : str, optional
+            File the data was read from; recorded so stale snapshots can be
+            detected
+        """
+        if self.df is None:
+            raise ValueError("No data loaded. Please load data first.")
+        
+        metadata = {}
+        if source_path is not None:
+            metadata['source'] = os.path.basename(source_path)
+            metadata['source_signature'] = source_signature(source_path)
+        write_snapshot(self.df, output_path, metadata)
+        print(f"Snapshot with {len(self.df)} rows saved to {output_path}")
+        
         return self
\ No newline at end of file
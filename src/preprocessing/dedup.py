@@ -0,0 +1,417 @@
+"""
+Near-duplicate character detection with MinHash LSH.
+
+``clean_data`` only drops rows whose title-cased names are identical, so
+"Spider-Man", "Spiderman" and "Spider Man (Peter Parker)" all survive.
+``NearDuplicateDetector`` finds such rows without comparing every pair:
+
+- Each name is reduced to its letters and digits ("spiderman", dropping any
+  parenthetical) and shingled into character trigrams; the powers are
+  shingled into their analyzer terms.
+- Both shingle sets get a MinHash signature: per hash function, the minimum
+  of ``(a * x + b) mod p`` over the shingle codes. The fraction of equal
+  signature entries estimates the Jaccard similarity of two sets.
+- The name signatures are cut into bands; rows that agree on a whole band
+  land in the same bucket and become candidate pairs. The band layout is
+  chosen so pairs around the threshold are likely to collide, which keeps
+  the work close to linear in the number of rows.
+- A candidate pair is a duplicate when ``name_weight * name similarity +
+  (1 - name_weight) * powers similarity`` reaches ``threshold`` and the
+  numbers in the names agree ("Spider-Man" is not "Spider-Man 2099").
+  Duplicate pairs are joined into clusters whose first row is the canonical
+  one; members that do not themselves match the canonical row (reached only
+  through a chain of matches) are left out of the cluster.
+
+Usage:
+    python -m src.preprocessing.dedup data/marvel_characters_dataset.csv --output clusters.csv
+    python -m src.preprocessing.dedup data.csv --threshold 0.8 --collapse data_deduplicated.csv
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+
+# Mersenne prime 2**31 - 1: a * x + b stays below 2**62 in uint64
+MERSENNE_PRIME = (1 << 31) - 1
+
+SHINGLE_SIZE = 3
+
+PARENTHETICAL = re.compile(r'\([^)]*\)')
+NON_ALNUM = re.compile(r'[\W_]+')
+NON_DIGITS = re.compile(r'\D+')
+
+# Candidate pairs verified per batch
+PAIR_BATCH = 1 << 20
+
+
+def normalize_name(name):
+    """Letters and digits of a lower-cased name, without parentheticals."""
+    if not isinstance(name, str):
+        return ''
+    return NON_ALNUM.sub('', PARENTHETICAL.sub('', name.lower()))
+
+
+def _trapezoid(y, x):
+    # Trapezoidal integral; np.trapezoid is NumPy >= 2.0 only and np.trapz
+    # is gone from later releases
+    return float(np.sum((y[1:] + y[:-1]) * np.diff(x)) / 2)
+
+
+def lsh_params(threshold, num_perm, false_positive_weight=0.5):
+    """
+    Pick ``(bands, rows)`` with ``bands * rows <= num_perm`` minimizing the
+    weighted probability mass of false positives below ``threshold`` and
+    false negatives above it.
+    """
+    below = np.linspace(0, threshold, 201)
+    above = np.linspace(threshold, 1, 201)
+    best, best_cost = (1, num_perm), np.inf
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            false_positive = _trapezoid(1 - (1 - below ** rows) ** bands, below)
+            false_negative = _trapezoid((1 - above ** rows) ** bands, above)
+            cost = false_positive_weight * false_positive + (1 - false_positive_weight) * false_negative
+            if cost < best_cost:
+                best, best_cost = (bands, rows), cost
+    return best
+
+
+def _sorted_unique(values):
+    values = np.sort(values)
+    if len(values):
+        values = values[np.concatenate(([True], values[1:] != values[:-1]))]
+    return values
+
+
+def name_shingles(names):
+    """
+    Character trigram codes of names normalized with ``normalize_name``.
+
+    Returns:
+    --------
+    (numpy.ndarray, numpy.ndarray)
+        int64 shingle codes (three 21-bit code points each) and CSR-style
+        row offsets; names shorter than a trigram are one shingle
+    """
+    lengths = np.fromiter((len(name) for name in names), dtype=np.int64, count=len(names))
+    points = np.frombuffer(''.join(names).encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+    starts = np.concatenate(([0], np.cumsum(lengths)))
+
+    # One shingle per position that starts a full trigram, or per short name
+    counts = np.where(lengths >= SHINGLE_SIZE, lengths - SHINGLE_SIZE + 1, (lengths > 0).astype(np.int64))
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    positions = np.arange(offsets[-1], dtype=np.int64) - np.repeat(offsets[:-1] - starts[:-1], counts)
+    padded = np.concatenate((points, np.zeros(SHINGLE_SIZE, dtype=np.int64)))
+    row_lengths = np.repeat(lengths, counts)
+    codes = np.zeros(len(positions), dtype=np.int64)
+    for k in range(SHINGLE_SIZE):
+        # Short names only use their own characters
+        part = np.where(k < row_lengths, padded[positions + k], 0)
+        codes = (codes << 21) | part
+    return codes, offsets
+
+
+def powers_shingles(powers, analyzer):
+    """Analyzer term codes of each powers string, with CSR-style row offsets."""
+    texts = [text if isinstance(text, str) else '' for text in powers]
+    try:
+        matrix = CountVectorizer(analyzer=analyzer, binary=True).fit_transform(texts).tocsr()
+    except ValueError:
+        # Only stop words (or nothing) in every row
+        return np.zeros(0, dtype=np.int64), np.zeros(len(texts) + 1, dtype=np.int64)
+    return matrix.indices.astype(np.int64), matrix.indptr.astype(np.int64)
+
+
+class NearDuplicateDetector:
+    """
+    MinHash LSH detector of near-duplicate characters.
+    """
+
+    def __init__(self, threshold=0.7, name_weight=0.7, num_perm=64, bands=None, max_bucket_size=100,
+                 seed=42, analyzer=None):
+        """
+        Initialize the detector.
+
+        Parameters:
+        -----------
+        threshold : float, default=0.7
+            Minimum combined similarity of a duplicate pair
+        name_weight : float, default=0.7
+            Weight of the name similarity; the powers get the rest. With
+            the defaults, identical normalized names are duplicates even
+            when the powers differ.
+        num_perm : int, default=64
+            Hash functions per signature
+        bands : int, optional
+            LSH bands over the name signature (default: chosen from the
+            name similarity ``threshold`` requires)
+        max_bucket_size : int, default=100
+            Buckets larger than this contribute a chain of pairs through
+            their first row instead of every pair
+        seed : int, default=42
+            Seed of the hash functions
+        analyzer : callable, optional
+            Powers tokenizer (default: the TF-IDF tokenizer)
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1].")
+        if not 0 < name_weight <= 1:
+            raise ValueError("name_weight must be in (0, 1].")
+        if bands is not None and not 1 <= bands <= num_perm:
+            raise ValueError("bands must be between 1 and num_perm.")
+
+        self.threshold = threshold
+        self.name_weight = name_weight
+        self.num_perm = num_perm
+        self.max_bucket_size = max_bucket_size
+        self.seed = seed
+        self.analyzer = analyzer or TfidfVectorizer(stop_words='english').build_analyzer()
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+        if bands is None:
+            bands, rows = lsh_params(self.name_threshold, num_perm)
+        else:
+            rows = num_perm // bands
+        self.bands = bands
+        self.rows_per_band = rows
+
+    @property
+    def name_threshold(self):
+        """Lowest name similarity a pair can have and still reach ``threshold``."""
+        return float(np.clip((self.threshold - (1 - self.name_weight)) / self.name_weight, 0.05, 1.0))
+
+    def signatures(self, codes, offsets):
+        """
+        MinHash signatures of shingle sets.
+
+        Parameters:
+        -----------
+        codes : numpy.ndarray
+            int64 shingle codes of all rows
+        offsets : numpy.ndarray
+            Row ``i`` owns ``codes[offsets[i]:offsets[i + 1]]``
+
+        Returns:
+        --------
+        numpy.ndarray
+            uint32 array of shape (rows, num_perm); rows without shingles
+            hold ``MERSENNE_PRIME`` everywhere
+        """
+        n_rows = len(offsets) - 1
+        signature = np.full((n_rows, self.num_perm), MERSENNE_PRIME, dtype=np.uint32)
+        filled = np.diff(offsets) > 0
+        if not filled.any():
+            return signature
+        values = (codes % MERSENNE_PRIME).astype(np.uint64)
+        starts = offsets[:-1][filled]
+        for k in range(self.num_perm):
+            hashed = (self._a[k] * values + self._b[k]) % MERSENNE_PRIME
+            signature[filled, k] = np.minimum.reduceat(hashed, starts)
+        return signature
+
+    def candidate_pairs(self, signature, valid):
+        """
+        Pairs of rows sharing at least one LSH band bucket.
+
+        Parameters:
+        -----------
+        signature : numpy.ndarray
+            Name signatures
+        valid : numpy.ndarray of bool
+            Rows that may take part (rows without shingles never do)
+
+        Returns:
+        --------
+        (numpy.ndarray, numpy.ndarray)
+            Row positions ``i < j`` of each distinct pair
+        """
+        rows = np.flatnonzero(valid)
+        n_rows = len(signature)
+        mixers = np.random.default_rng(self.seed + 1).integers(1, 2 ** 62, size=self.rows_per_band,
+                                                               dtype=np.int64).astype(np.uint64) | np.uint64(1)
+        keys = []
+        for band in range(self.bands):
+            block = signature[rows, band * self.rows_per_band:(band + 1) * self.rows_per_band].astype(np.uint64)
+            # Band values folded into one 64-bit bucket key
+            key = (block * mixers).sum(axis=1, dtype=np.uint64)
+            order = np.argsort(key, kind='stable')
+            key = key[order]
+            run_starts = np.flatnonzero(np.concatenate(([True], key[1:] != key[:-1])))
+            run_lengths = np.diff(np.concatenate((run_starts, [len(key)])))
+            keys.append(self._bucket_pairs(rows[order], run_starts, run_lengths, n_rows))
+
+        pairs = _sorted_unique(np.concatenate(keys)) if keys else np.zeros(0, dtype=np.int64)
+        return pairs // n_rows, pairs % n_rows
+
+    def _bucket_pairs(self, members, run_starts, run_lengths, n_rows):
+        # Encoded pairs lo * n_rows + hi of every bucket with two or more rows
+        encoded = []
+        for length in np.unique(run_lengths[run_lengths > 1]):
+            starts = run_starts[run_lengths == length]
+            if length <= self.max_bucket_size:
+                first, second = np.triu_indices(length, 1)
+            else:
+                # Every row paired with the first and with its neighbour
+                first = np.concatenate((np.zeros(length - 1, dtype=np.int64), np.arange(1, length - 1)))
+                second = np.concatenate((np.arange(1, length), np.arange(2, length)))
+            left = members[(starts[:, None] + first).ravel()]
+            right = members[(starts[:, None] + second).ravel()]
+            encoded.append(np.minimum(left, right) * n_rows + np.maximum(left, right))
+        return np.concatenate(encoded) if encoded else np.zeros(0, dtype=np.int64)
+
+    def similarity(self, names, powers, first, second):
+        """
+        Combined similarity estimate of row pairs.
+
+        Rows without powers on either side are compared on the name alone.
+        """
+        name_sim = np.empty(len(first), dtype=np.float64)
+        powers_sim = np.empty(len(first), dtype=np.float64)
+        for start in range(0, len(first), PAIR_BATCH):
+            i, j = first[start:start + PAIR_BATCH], second[start:start + PAIR_BATCH]
+            name_sim[start:start + PAIR_BATCH] = (names[i] == names[j]).mean(axis=1)
+            powers_sim[start:start + PAIR_BATCH] = (powers[i] == powers[j]).mean(axis=1)
+        no_powers = (powers[first, 0] == MERSENNE_PRIME) | (powers[second, 0] == MERSENNE_PRIME)
+        return np.where(no_powers, name_sim, self.name_weight * name_sim + (1 - self.name_weight) * powers_sim)
+
+    def find(self, df):
+        """
+        Find clusters of near-duplicate characters.
+
+        Parameters:
+        -----------
+        df : pandas.DataFrame
+            Data with 'Character' and (optionally) 'Powers' columns
+
+        Returns:
+        --------
+        pandas.DataFrame
+            One row per member of a cluster with two or more rows, ordered
+            by cluster: 'cluster', 'row' (position in ``df``), 'index'
+            (label in ``df``), 'Character', 'canonical' (the cluster's first
+            row, kept when collapsing) and 'similarity' to the canonical row
+        """
+        columns = ['cluster', 'row', 'index', 'Character', 'canonical', 'similarity']
+        n_rows = len(df)
+        normalized = [normalize_name(name) for name in df['Character'].to_numpy()]
+        numbers, _ = pd.factorize(np.array([NON_DIGITS.sub('', name) for name in normalized], dtype=object))
+        names = self.signatures(*name_shingles(normalized))
+        powers_column = df['Powers'].to_numpy() if 'Powers' in df.columns else np.full(n_rows, '', dtype=object)
+        powers = self.signatures(*powers_shingles(powers_column, self.analyzer))
+
+        first, second = self.candidate_pairs(names, names[:, 0] != MERSENNE_PRIME)
+        same_numbers = numbers[first] == numbers[second]
+        first, second = first[same_numbers], second[same_numbers]
+        matched = self.similarity(names, powers, first, second) >= self.threshold
+        first, second = first[matched], second[matched]
+        if len(first) == 0:
+            return pd.DataFrame(columns=columns)
+
+        graph = sparse.coo_matrix((np.ones(len(first), dtype=np.int8), (first, second)), shape=(n_rows, n_rows))
+        _, labels = connected_components(graph, directed=False)
+
+        # The first row of each component is its canonical row; keep the
+        # members that match it directly
+        sizes = np.bincount(labels)
+        members = np.flatnonzero(sizes[labels] > 1)
+        canonical_row = np.full(len(sizes), n_rows, dtype=np.int64)
+        np.minimum.at(canonical_row, labels[members], members)
+        canonical = canonical_row[labels[members]]
+        similarity = self.similarity(names, powers, canonical, members)
+        keep = (similarity >= self.threshold) & (numbers[canonical] == numbers[members])
+        members, canonical, similarity = members[keep], canonical[keep], similarity[keep]
+
+        # Drop canonical rows left without members, number clusters in row order
+        sizes = np.bincount(canonical, minlength=n_rows)
+        keep = sizes[canonical] > 1
+        members, canonical, similarity = members[keep], canonical[keep], similarity[keep]
+        if len(members) == 0:
+            return pd.DataFrame(columns=columns)
+        heads = np.unique(canonical)
+        clusters = pd.DataFrame({
+            'cluster': np.searchsorted(heads, canonical),
+            'row': members,
+            'index': df.index.to_numpy()[members],
+            'Character': df['Character'].to_numpy()[members],
+            'canonical': members == canonical,
+            'similarity': similarity,
+        }, columns=columns)
+        return clusters.sort_values(['cluster', 'row'], kind='stable').reset_index(drop=True)
+
+
+def collapse_duplicates(df, clusters):
+    """
+    Collapse each cluster into its canonical row.
+
+    Missing values of the canonical row are filled from the other members,
+    in row order; every other member is dropped.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        Data the clusters were found in
+    clusters : pandas.DataFrame
+        Output of ``NearDuplicateDetector.find``
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Data with one row per cluster, keeping the canonical rows' index
+    """
+    if len(clusters) == 0:
+        return df.copy()
+    group = np.arange(len(df), dtype=np.int64)
+    canonical = clusters.loc[clusters['canonical'], ['cluster', 'row']].set_index('cluster')['row']
+    group[clusters['row'].to_numpy()] = canonical.loc[clusters['cluster']].to_numpy()
+
+    collapsed = df.reset_index(drop=True).groupby(group, sort=False).first()
+    collapsed.index = df.index[collapsed.index.to_numpy()]
+    return collapsed
+
+
+def main():
+    # Allow running as a script from the project root
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if project_root not in sys.path:
+        sys.path.append(project_root)
+
+    parser = argparse.ArgumentParser(description='Find near-duplicate characters with MinHash LSH')
+    parser.add_argument('csv', help='Source CSV file')
+    parser.add_argument('--threshold', type=float, default=0.7)
+    parser.add_argument('--name-weight', type=float, default=0.7)
+    parser.add_argument('--num-perm', type=int, default=64)
+    parser.add_argument('--bands', type=int)
+    parser.add_argument('--output', help='Write the clusters for review to this CSV')
+    parser.add_argument('--collapse', help='Write the data with every cluster collapsed to this CSV')
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv)
+    detector = NearDuplicateDetector(threshold=args.threshold, name_weight=args.name_weight,
+                                     num_perm=args.num_perm, bands=args.bands)
+    start = time.perf_counter()
+    clusters = detector.find(df)
+    print(f"Found {clusters['cluster'].nunique()} clusters covering {len(clusters)} of {len(df)} rows "
+          f"in {time.perf_counter() - start:.1f}s ({detector.bands} bands of {detector.rows_per_band})")
+
+    if args.output:
+        clusters.to_csv(args.output, index=False)
+        print(f"Clusters saved to {args.output}")
+    else:
+        print(clusters.head(20).to_string(index=False))
+    if args.collapse:
+        collapse_duplicates(df, clusters).to_csv(args.collapse, index=False)
+        print(f"Collapsed data saved to {args.collapse}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+import re
+from itertools import combinations
+
+import numpy as np
+
+from src.preprocessing.data_processor import MarvelDataProcessor
+
+POWER_TIERS = ['Low', 'Medium', 'High']
+
+
+def normalize_name(name):
+    """
+    Normalize a character name for lookups (case and whitespace insensitive).
+    """
+    return ' '.join(str(name).split()).lower()
+
+
+def split_affiliations(affiliation):
+    """
+    Split an Affiliation cell into its individual affiliations.
+    """
+    if not isinstance(affiliation, str):
+        return set()
+    return {part.strip() for part in re.split(r'[,/;]', affiliation) if part.strip()}
+
+
+class CharacterFeatureMatrix:
+    """
+    Per-character feature vectors precomputed at load time.
+
+    Holds the power tier, one-hot role, TF-IDF powers vector, network degree
+    and predicted power level of every character so that comparing k
+    characters only touches those k rows.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty feature matrix; use ``build`` to populate it.
+        """
+        self.names = []
+        self.index = {}  # normalized name -> row
+        self.roles = []
+        self.role_onehot = None
+        self.power_tiers = None
+        self.powers_tfidf = None
+        self.degrees = None
+        self.predicted_power = None
+        self.affiliations = []
+
+    @classmethod
+    def build(cls, df, degrees=None, power_predictor=None, min_df=1, tfidf=None, features=None):
+        """
+        Build the feature matrix from a character DataFrame.
+
+        Parameters:
+        -----------
+        df : pandas.DataFrame
+            DataFrame containing Marvel character data
+        degrees : dict, optional
+            Mapping of character name to network degree
+        power_predictor : PowerPredictor, optional
+            Trained model used to precompute predicted power levels
+        min_df : int, default=1
+            Minimum document frequency for the TF-IDF vocabulary
+        tfidf : CompactTfidf, optional
+            Previously saved TF-IDF matrix of ``df``'s powers, used instead
+            of re-vectorizing
+        features : FeatureTable, optional
+            Materialized features of ``df`` (``src/preprocessing/feature_store.py``);
+            its power tiers, roles, TF-IDF and degrees are used instead of
+            deriving them again
+
+        Returns:
+        --------
+        CharacterFeatureMatrix
+            Populated feature matrix
+        """
+        matrix = cls()
+        df = df.reset_index(drop=True)
+        if features is not None and len(features) == len(df) and features.tfidf is not None:
+            return matrix._from_features(df, features, power_predictor)
+
+        processor = MarvelDataProcessor(df=df)
+        processor.estimate_power_levels()
+        if tfidf is not None and tfidf.shape[0] == len(df):
+            processor._use_tfidf(tfidf)
+        else:
+            processor.vectorize_powers(min_df=min_df)
+
+        matrix.names = df['Character'].tolist()
+        for row, name in enumerate(matrix.names):
+            matrix.index.setdefault(normalize_name(name), row)
+
+        # Power tier as an ordinal code (Low=0, Medium=1, High=2)
+        tiers = processor.get_processed_data()['Estimated_Power_Level']
+        matrix.power_tiers = tiers.map({tier: code for code, tier in enumerate(POWER_TIERS)}).to_numpy(dtype=np.int8)
+
+        # One-hot role
+        roles = df['Role'].fillna('').astype(str)
+        matrix.roles = sorted(roles.unique())
+        role_codes = roles.map({role: code for code, role in enumerate(matrix.roles)}).to_numpy()
+        matrix.role_onehot = np.zeros((len(df), len(matrix.roles)), dtype=np.int8)
+        matrix.role_onehot[np.arange(len(df)), role_codes] = 1
+
+        # L2-normalized TF-IDF rows, so cosine similarity is a dot product
+        matrix.powers_tfidf = processor.get_tfidf_matrix().tocsr()
+
+        matrix.degrees = np.array([(degrees or {}).get(name, 0) for name in matrix.names], dtype=np.int64)
+        matrix.affiliations = [split_affiliations(aff) for aff in df['Affiliation']]
+
+        if power_predictor is not None and 'Hero/Villain' in df.columns:
+            matrix.predicted_power = np.asarray(power_predictor.predict(df), dtype=float)
+
+        return matrix
+
+    def _from_features(self, df, features, power_predictor):
+        self.names = df['Character'].tolist()
+        for row, name in enumerate(self.names):
+            self.index.setdefault(normalize_name(name), row)
+
+        self.power_tiers = np.asarray(features.power_tier, dtype=np.int8)
+        self.roles = features.categories['role']
+        self.role_onehot = features.onehot('role')
+        self.powers_tfidf = features.tfidf.matrix
+        self.degrees = np.asarray(features.degree, dtype=np.int64)
+        self.affiliations = [split_affiliations(aff) for aff in df['Affiliation']]
+
+        if power_predictor is not None and 'Hero/Villain' in df.columns:
+            self.predicted_power = np.asarray(power_predictor.predict(df), dtype=float)
+
+        return self
+
+    def __len__(self):
+        return len(self.names)
+
+    def lookup(self, name):
+        """
+        Return the row of a character, or None if unknown.
+        """
+        return self.index.get(normalize_name(name))
+
+    def compare(self, names):
+        """
+        Compare a set of characters.
+
+        Parameters:
+        -----------
+        names : list of str
+            Character names (case insensitive)
+
+        Returns:
+        --------
+        dict
+            Per-character features, pairwise similarities and shared
+            affiliations
+
+        Raises:
+        -------
+        KeyError
+            If any name is not a known character
+        """
+        rows = []
+        missing = []
+        for name in names:
+            row = self.lookup(name)
+            if row is None:
+                missing.append(name)
+            else:
+                rows.append(row)
+        if missing:
+            raise KeyError(f"Unknown characters: {', '.join(missing)}")
+
+        # Only the k requested rows are touched
+        tfidf = self.powers_tfidf[rows]
+        powers_similarity = (tfidf @ tfidf.T).toarray()
+        tiers = self.power_tiers[rows].astype(float)
+
+        characters = []
+        for row in rows:
+            characters.append({
+                'name': self.names[row],
+                'role': self.roles[int(np.argmax(self.role_onehot[row]))],
+                'powerTier': POWER_TIERS[self.power_tiers[row]],
+                'degree': int(self.degrees[row]),
+                'predictedPowerLevel': None if self.predicted_power is None else float(self.predicted_power[row]),
+                'affiliations': sorted(self.affiliations[row]),
+            })
+
+        pairs = []
+        for i, j in combinations(range(len(rows)), 2):
+            same_role = int(self.role_onehot[rows[i]] @ self.role_onehot[rows[j]])
+            tier_similarity = 1.0 - abs(tiers[i] - tiers[j]) / (len(POWER_TIERS) - 1)
+            pairs.append({
+                'a': self.names[rows[i]],
+                'b': self.names[rows[j]],
+                'powersSimilarity': float(powers_similarity[i, j]),
+                'sameRole': bool(same_role),
+                'tierSimilarity': float(tier_similarity),
+                'similarity': float((powers_similarity[i, j] + same_role + tier_similarity) / 3),
+                'sharedAffiliations': sorted(self.affiliations[rows[i]] & self.affiliations[rows[j]]),
+            })
+
+        shared = set.intersection(*(self.affiliations[row] for row in rows)) if rows else set()
+
+        return {
+            'characters': characters,
+            'pairs': pairs,
+            'sharedAffiliations': sorted(shared),
+        }
@@ -0,0 +1,349 @@
+"""
+Derived per-character features, materialized once per dataset version.
+
+Several consumers derive the same facts from the character data: the power
+tier (from the powers text, and from the hero/villain alignment the power
+predictor trains on), one-hot role codes, the powers TF-IDF matrix and the
+affiliation network degree. ``FeatureTable`` computes them once, as compact
+arrays, and ``FeatureStore`` persists each table on disk under the content
+hash of the columns it is derived from. Any change to those columns gives a
+new key, so a stale table is never served; older versions are pruned.
+
+Layout of a stored table (``<root>/<key>/``)::
+
+    features.json           key, row count, categories, format version
+    <column>.npy            one array per feature column (memory-mapped)
+    tfidf/                  the powers TF-IDF (``CompactTfidf.save``)
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from src.preprocessing.compact_tfidf import CompactTfidf, is_tfidf
+from src.preprocessing.data_processor import MarvelDataProcessor
+from src.preprocessing.feature_matrix import POWER_TIERS
+from src.utils.cache import cache_key, dataset_fingerprint
+
+FEATURE_STORE_VERSION = 1
+
+# Columns the features are derived from; they alone determine the key
+SOURCE_COLUMNS = ('Character', 'Role', 'Hero/Villain', 'Affiliation', 'Powers')
+
+# Categorical columns stored as codes into a sorted category list
+CATEGORICAL_COLUMNS = {'role': 'Role', 'alignment': 'Hero/Villain'}
+
+_FEATURE_ARRAYS = ('power_tier', 'alignment_tier', 'role_codes', 'alignment_codes', 'degree')
+
+TFIDF_SUBDIR = 'tfidf'
+
+
+def feature_key(df, min_df=1):
+    """
+    Content key of the features of ``df``.
+
+    Covers the source columns (names, dtypes and values), the TF-IDF
+    settings and the format version, so the key changes whenever any input
+    of the derivation does.
+    """
+    columns = [column for column in SOURCE_COLUMNS if column in df.columns]
+    return cache_key(FEATURE_STORE_VERSION, min_df, dataset_fingerprint(df[columns]))[:32]
+
+
+def _tier_codes(labels):
+    return labels.map({tier: code for code, tier in enumerate(POWER_TIERS)}).fillna(-1).to_numpy(dtype=np.int8)
+
+
+def _category_codes(column):
+    codes, categories = pd.factorize(column, sort=True)
+    return codes.astype(np.int32), [str(category) for category in categories]
+
+
+class FeatureTable:
+    """
+    Derived features of one dataset version, one row per character.
+
+    Attributes hold int arrays aligned with the rows of the source data:
+    ``power_tier`` (from the powers text) and ``alignment_tier`` (from
+    'Hero/Villain') as ordinal codes into ``POWER_TIERS``, ``role_codes`` and
+    ``alignment_codes`` as codes into ``categories`` (-1 when missing) and
+    the affiliation network ``degree``. ``tfidf`` is the powers TF-IDF,
+    whose ``indptr`` gives each character's row offsets.
+    """
+
+    def __init__(self, key, arrays, categories, tfidf):
+        """
+        Wrap materialized arrays; use ``materialize`` or ``load``.
+        """
+        self.key = key
+        for name in _FEATURE_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.categories = categories
+        self.tfidf = tfidf
+
+    def __len__(self):
+        return len(self.power_tier)
+
+    @property
+    def tfidf_offsets(self):
+        """Start and end of each character's row in the TF-IDF arrays."""
+        return self.tfidf.indptr
+
+    @classmethod
+    def materialize(cls, df, min_df=1, tfidf=None):
+        """
+        Compute the features of a character DataFrame.
+
+        Parameters:
+        -----------
+        df : pandas.DataFrame
+            DataFrame containing Marvel character data
+        min_df : int, default=1
+            Minimum document frequency for the TF-IDF vocabulary
+        tfidf : CompactTfidf, optional
+            Already fitted TF-IDF of ``df``'s powers (e.g. from a snapshot)
+
+        Returns:
+        --------
+        FeatureTable
+            Features of every row of ``df``
+        """
+        n_rows = len(df)
+        source = df[[column for column in SOURCE_COLUMNS if column in df.columns]].reset_index(drop=True)
+        processor = MarvelDataProcessor(df=source)
+        arrays = {}
+
+        # Power tier from the powers text, as estimate_power_levels labels it
+        if 'Powers' in source.columns:
+            processor.estimate_power_levels()
+            arrays['power_tier'] = _tier_codes(processor.get_processed_data()['Estimated_Power_Level'])
+        else:
+            arrays['power_tier'] = np.zeros(n_rows, dtype=np.int8)
+
+        # Power tier from the alignment, the label the power predictor uses
+        if 'Hero/Villain' in source.columns:
+            processor.label_power_levels_from_alignment()
+            arrays['alignment_tier'] = _tier_codes(processor.get_processed_data()['Estimated_Power_Level'])
+        else:
+            arrays['alignment_tier'] = np.full(n_rows, -1, dtype=np.int8)
+
+        categories = {}
+        for name, column in CATEGORICAL_COLUMNS.items():
+            if column in source.columns:
+                arrays[f'{name}_codes'], categories[name] = _category_codes(source[column])
+            else:
+                arrays[f'{name}_codes'], categories[name] = np.full(n_rows, -1, dtype=np.int32), []
+
+        # Affiliation network degree: every other character of the affiliation
+        if 'Affiliation' in source.columns and 'Character' in source.columns:
+            affiliation = source['Affiliation']
+            sizes = affiliation.map(source.groupby('Affiliation')['Character'].nunique()).fillna(1)
+            arrays['degree'] = (sizes.to_numpy(dtype=np.int64) - 1)
+        else:
+            arrays['degree'] = np.zeros(n_rows, dtype=np.int64)
+
+        if tfidf is None or tfidf.shape[0] != n_rows:
+            tfidf = processor.vectorize_powers(min_df=min_df).tfidf if 'Powers' in source.columns else None
+
+        return cls(feature_key(df, min_df), arrays, categories, tfidf)
+
+    def tier_labels(self, name='power_tier'):
+        """
+        Power tiers as labels.
+
+        Parameters:
+        -----------
+        name : str, default='power_tier'
+            'power_tier' or 'alignment_tier'
+
+        Returns:
+        --------
+        numpy.ndarray
+            'Low', 'Medium' or 'High' per row (None where undefined)
+        """
+        codes = getattr(self, name)
+        labels = np.array(POWER_TIERS + [None], dtype=object)
+        return labels[np.where(codes < 0, len(POWER_TIERS), codes)]
+
+    def onehot(self, name='role'):
+        """
+        One-hot matrix of a categorical column.
+
+        Parameters:
+        -----------
+        name : str, default='role'
+            'role' or 'alignment'
+
+        Returns:
+        --------
+        numpy.ndarray
+            int8 array of shape (rows, categories); missing values are all
+            zero
+        """
+        codes = getattr(self, f'{name}_codes')
+        onehot = np.zeros((len(codes), len(self.categories[name])), dtype=np.int8)
+        present = codes >= 0
+        onehot[np.flatnonzero(present), codes[present]] = 1
+        return onehot
+
+    def predictor_features(self):
+        """
+        The one-hot inputs of ``PowerPredictor.encode_features``.
+
+        Returns:
+        --------
+        pandas.DataFrame or None
+            'role_*' columns from 'Hero/Villain' and 'power_*' columns from
+            the alignment tier, as ``pd.get_dummies`` names and orders them;
+            None without a 'Hero/Villain' column
+        """
+        if not self.categories['alignment']:
+            return None
+        columns = {f'role_{category}': self.alignment_codes == code
+                   for code, category in enumerate(self.categories['alignment'])}
+        present = sorted({POWER_TIERS[code] for code in np.unique(self.alignment_tier) if code >= 0})
+        for tier in present:
+            columns[f'power_{tier}'] = self.alignment_tier == POWER_TIERS.index(tier)
+        return pd.DataFrame(columns)
+
+    def save(self, path):
+        """
+        Save the table as a directory of ``.npy`` files.
+
+        Parameters:
+        -----------
+        path : str
+            Directory to write
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in _FEATURE_ARRAYS:
+            np.save(os.path.join(path, f'{name}.npy'), np.ascontiguousarray(getattr(self, name)))
+        if self.tfidf is not None:
+            self.tfidf.save(os.path.join(path, TFIDF_SUBDIR))
+        meta = {
+            'format_version': FEATURE_STORE_VERSION,
+            'key': self.key,
+            'rows': len(self),
+            'categories': self.categories,
+        }
+        # Written last: a directory without it is an incomplete table
+        with open(os.path.join(path, 'features.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+        return self
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load a table written by ``save``.
+
+        Parameters:
+        -----------
+        path : str
+            Directory written by ``save``
+        mmap : bool, default=True
+            Memory-map the arrays so processes share them
+
+        Returns:
+        --------
+        FeatureTable
+            Loaded table
+        """
+        with open(os.path.join(path, 'features.json')) as f:
+            meta = json.load(f)
+        if meta.get('format_version') != FEATURE_STORE_VERSION:
+            raise ValueError(f"Unsupported feature table format version: {meta.get('format_version')}")
+        arrays = {
+            name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None)
+            for name in _FEATURE_ARRAYS
+        }
+        tfidf_path = os.path.join(path, TFIDF_SUBDIR)
+        tfidf = CompactTfidf.load(tfidf_path, mmap=mmap) if is_tfidf(tfidf_path) else None
+        return cls(meta['key'], arrays, meta['categories'], tfidf)
+
+
+class FeatureStore:
+    """
+    On-disk store of ``FeatureTable``s keyed by the content of their source.
+
+    ``get`` serves the table of a DataFrame from memory or disk and only
+    materializes it when its inputs changed.
+    """
+
+    def __init__(self, root, min_df=1, keep_versions=2):
+        """
+        Initialize the store.
+
+        Parameters:
+        -----------
+        root : str
+            Directory holding one subdirectory per dataset version
+        min_df : int, default=1
+            Minimum document frequency for the TF-IDF vocabulary
+        keep_versions : int, default=2
+            Stored versions kept; older ones are removed after each write
+        """
+        self.root = root
+        self.min_df = min_df
+        self.keep_versions = keep_versions
+        self._table = None
+
+    def path(self, key):
+        return os.path.join(self.root, key)
+
+    def get(self, df, tfidf=None):
+        """
+        Return the features of ``df``, materializing them if needed.
+
+        Parameters:
+        -----------
+        df : pandas.DataFrame
+            DataFrame containing Marvel character data
+        tfidf : CompactTfidf, optional
+            Already fitted TF-IDF of ``df``'s powers, used on a miss
+
+        Returns:
+        --------
+        FeatureTable
+            Features aligned with the rows of ``df``
+        """
+        key = feature_key(df, self.min_df)
+        if self._table is not None and self._table.key == key:
+            return self._table
+
+        path = self.path(key)
+        table = None
+        if os.path.isfile(os.path.join(path, 'features.json')):
+            try:
+                table = FeatureTable.load(path)
+                print(f"Loaded features for {len(table)} characters from {path}")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Error loading features from {path}: {e}; materializing instead")
+        if table is None or len(table) != len(df):
+            table = FeatureTable.materialize(df, min_df=self.min_df, tfidf=tfidf)
+            # Write next to the final path, then move it into place
+            tmp_path = f'{path}.tmp-{os.getpid()}'
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            table.save(tmp_path)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp_path, path)
+            table = FeatureTable.load(path)
+            print(f"Materialized features for {len(table)} characters to {path}")
+            self.prune()
+
+        self._table = table
+        return table
+
+    def prune(self):
+        """
+        Remove all but the ``keep_versions`` most recently written versions.
+        """
+        if not os.path.isdir(self.root):
+            return self
+        versions = [os.path.join(self.root, name) for name in os.listdir(self.root)
+                    if os.path.isfile(os.path.join(self.root, name, 'features.json'))]
+        versions.sort(key=os.path.getmtime, reverse=True)
+        for path in versions[self.keep_versions:]:
+            shutil.rmtree(path, ignore_errors=True)
+        return self
@@ -0,0 +1,449 @@
+"""
+Typo-tolerant character name search.
+
+The index covers the ``Character`` and ``Real Name`` columns. Every name is
+normalized (lower case, collapsed whitespace) and split into *terms*: the
+full name plus each of its words, so "spider" finds "Spider-Man" and "parker"
+finds "Peter Parker".
+
+- Prefix matches come from a sorted array of terms (binary search).
+- Substring matches intersect the posting lists of the query's byte
+  trigrams, rarest first, and verify the few surviving candidates.
+- Fuzzy matches use the q-gram count filter: a term within edit distance k
+  of the query shares at least ``len(grams) - 3k`` of its padded trigrams,
+  so only terms reaching that count (and of compatible length) get a
+  Levenshtein check, vectorized across the candidates.
+
+The trigram postings are built with numpy over one concatenated byte
+buffer, so building the index for millions of names takes seconds and a
+query only touches the posting lists of its own trigrams.
+"""
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+NAME_FIELDS = ('Character', 'Real Name')
+
+# Characters that separate words inside a name ("Spider-Man", "T'Challa")
+SEPARATOR_CHARS = frozenset("-'.,/&()\"_:;!?")
+WORD_SEPARATORS = str.maketrans({char: ' ' for char in SEPARATOR_CHARS})
+
+# Boundary markers for the fuzzy trigrams; never part of a normalized name
+START, END = '\x02', '\x03'
+
+MATCH_TYPES = ('exact', 'prefix', 'word', 'substring', 'fuzzy')
+
+# Base score per match type; Real Name matches rank just below Character ones
+MATCH_SCORES = {'exact': 100, 'prefix': 80, 'word': 70, 'substring': 50, 'fuzzy': 40}
+MATCH_SCORE_ARRAY = np.array([MATCH_SCORES[match_type] for match_type in MATCH_TYPES], dtype=np.int64)
+REAL_NAME_PENALTY = 5
+
+# Upper bound on terms verified per query, keeps very common queries bounded
+MAX_CANDIDATES = 1000
+# Fuzzy candidates get a Levenshtein check each
+MAX_FUZZY_CANDIDATES = 1000
+
+
+def normalize_query(text):
+    """Lower-case a name or query and collapse its whitespace."""
+    return ' '.join(str(text).split()).lower()
+
+
+def default_max_edits(query):
+    """Edit budget for fuzzy matching: 0 below 4 characters, then 1, then 2."""
+    if len(query) < 4:
+        return 0
+    return 1 if len(query) < 8 else 2
+
+
+def levenshtein_distances(query, candidates):
+    """
+    Levenshtein distances from the query to each candidate string.
+
+    The dynamic programme runs over the query characters and is vectorized
+    across candidates; insertions within a row are resolved with a running
+    minimum, ``d[j] = j + min(d[k] - k for k <= j)``.
+    """
+    if not candidates:
+        return np.empty(0, dtype=np.int64)
+    codes = np.array(candidates, dtype=str)
+    width = codes.dtype.itemsize // 4
+    codes = codes.view(np.uint32).reshape(len(candidates), width) if width else np.zeros((len(candidates), 0), np.uint32)
+    lengths = np.fromiter(map(len, candidates), dtype=np.int64, count=len(candidates))
+    steps = np.arange(width + 1, dtype=np.int64)
+
+    previous = np.broadcast_to(steps, (len(candidates), width + 1))
+    current = np.empty((len(candidates), width + 1), dtype=np.int64)
+    for i, char in enumerate(query, 1):
+        current[:, 0] = i
+        np.minimum(previous[:, :-1] + (codes != ord(char)), previous[:, 1:] + 1, out=current[:, 1:])
+        previous = np.minimum.accumulate(current - steps, axis=1) + steps
+    return previous[np.arange(len(candidates)), lengths]
+
+
+def name_terms(value):
+    """The normalized name followed by its words (none for a blank name)."""
+    key = normalize_query(value)
+    if not key:
+        return []
+    # translate() is comparatively slow, most names have no separators
+    words = key.split(' ') if SEPARATOR_CHARS.isdisjoint(key) else key.translate(WORD_SEPARATORS).split()
+    return [key] if words == [key] else [key] + words
+
+
+def _sorted_unique(values):
+    """Sorted distinct values of an int64 array (a plain sort beats hashing here)."""
+    values = np.sort(values)
+    if len(values):
+        values = values[np.concatenate(([True], values[1:] != values[:-1]))]
+    return values
+
+
+def _contains_sorted(haystack, needles):
+    """Boolean mask of the needles present in a sorted array (binary search)."""
+    if len(haystack) == 0:
+        return np.zeros(len(needles), dtype=bool)
+    positions = np.minimum(np.searchsorted(haystack, needles), len(haystack) - 1)
+    return haystack[positions] == needles
+
+
+def _trigram_codes(data):
+    """Trigram codes (24-bit ints) of a byte string, in order."""
+    buf = np.frombuffer(data, dtype=np.uint8).astype(np.int64)
+    if len(buf) < 3:
+        return np.empty(0, dtype=np.int64)
+    return (buf[:-2] << 16) | (buf[1:-1] << 8) | buf[2:]
+
+
+class NameIndex:
+    """
+    Trigram inverted index over character and real names.
+
+    Use ``NameIndex.build(df)`` and ``index.search(query)``. Building a new
+    index and swapping the reference is how the service updates it on reload.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.real_names = []
+        self.name_lengths = np.empty(0, dtype=np.int64)
+        # Unique terms; ``order`` sorts them for prefix search
+        self.terms = np.empty(0, dtype=object)
+        self.sorted_terms = np.empty(0, dtype=object)
+        self.order = np.empty(0, dtype=np.int64)
+        self.term_lengths = np.empty(0, dtype=np.int64)
+        # First term id of each length (terms are numbered by length)
+        self.length_starts = np.zeros(1, dtype=np.int64)
+        self.term_is_full = np.empty(0, dtype=bool)
+        # term -> (row * 2 + field) postings, CSR layout
+        self.term_offsets = np.zeros(1, dtype=np.int64)
+        self.term_postings = np.empty(0, dtype=np.int64)
+        # trigram -> term postings, CSR layout keyed by the sorted codes
+        self.gram_codes = np.empty(0, dtype=np.int64)
+        self.gram_offsets = np.zeros(1, dtype=np.int64)
+        self.gram_terms = np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def build(cls, df):
+        """
+        Build the index from a DataFrame.
+
+        Parameters:
+        -----------
+        df : pandas.DataFrame
+            Dataset with a ``Character`` and optionally a ``Real Name`` column
+
+        Returns:
+        --------
+        NameIndex
+            Populated index
+        """
+        index = cls()
+        n_rows = len(df)
+        index.names = df['Character'].fillna('').astype(str).tolist() if 'Character' in df.columns else [''] * n_rows
+        index.real_names = (df['Real Name'].fillna('').astype(str).tolist()
+                            if 'Real Name' in df.columns else [''] * n_rows)
+        index.name_lengths = np.fromiter(map(len, index.names), dtype=np.int64, count=n_rows)
+
+        # (term, row * 2 + field) pairs: the full name and each of its
+        # words. Names repeat (real names especially), so each distinct value
+        # is split once and the pairs are expanded with numpy
+        flat_terms = []
+        term_codes = []
+        all_postings = []
+        first_terms = []
+        for field, values in enumerate((index.names, index.real_names)):
+            value_codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+            unique_terms = [name_terms(value) for value in uniques]
+            counts = np.fromiter(map(len, unique_terms), dtype=np.int64, count=len(unique_terms))
+            offsets = len(flat_terms) + np.cumsum(counts) - counts
+            flat_terms.extend(chain.from_iterable(unique_terms))
+            first_terms.append(offsets[counts > 0])
+
+            row_counts = counts[value_codes]
+            starts = np.repeat(offsets[value_codes] - np.cumsum(row_counts) + row_counts, row_counts)
+            term_codes.append(starts + np.arange(row_counts.sum()))
+            all_postings.append(np.repeat(np.arange(n_rows, dtype=np.int64) * 2 + field, row_counts))
+
+        flat_ids, uniques = pd.factorize(pd.Series(flat_terms, dtype=object))
+        terms = np.asarray(uniques, dtype=object)
+        lengths = np.fromiter(map(len, terms), dtype=np.int64, count=len(terms))
+        # Number the terms by length, so a length window is an id range
+        by_length = np.argsort(lengths, kind='stable')
+        renumber = np.empty_like(by_length)
+        renumber[by_length] = np.arange(len(by_length))
+        flat_ids = renumber[flat_ids]
+
+        n_terms = len(terms)
+        codes = flat_ids[np.concatenate(term_codes)]
+        all_postings = np.concatenate(all_postings)
+        index.terms = terms[by_length]
+        index.term_lengths = lengths[by_length]
+        index.length_starts = np.searchsorted(index.term_lengths, np.arange(index.term_lengths[-1] + 2 if n_terms else 1))
+        index.term_is_full = np.zeros(n_terms, dtype=bool)
+        index.term_is_full[flat_ids[np.concatenate(first_terms)]] = True
+        # sorted() on a list is much faster than argsort on an object array
+        term_list = index.terms.tolist()
+        index.order = np.array(sorted(range(n_terms), key=term_list.__getitem__), dtype=np.int64)
+        index.sorted_terms = index.terms[index.order]
+
+        # Term postings sorted by (term, posting) so duplicates collapse
+        pairs = _sorted_unique(codes.astype(np.int64) * (2 * n_rows + 2) + all_postings)
+        pair_terms = pairs // (2 * n_rows + 2)
+        index.term_postings = pairs % (2 * n_rows + 2)
+        index.term_offsets = np.searchsorted(pair_terms, np.arange(n_terms + 1)).astype(np.int64)
+
+        index._build_trigrams()
+        return index
+
+    def _build_trigrams(self):
+        """Boundary-padded byte trigram postings of every term."""
+        n_terms = len(self.terms)
+        if n_terms == 0:
+            return
+        encoded = [(START + term + END).encode('utf-8') for term in self.terms]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=n_terms)
+        codes = _trigram_codes(b''.join(encoded))
+        owner = np.repeat(np.arange(n_terms, dtype=np.int64), lengths)
+        # Keep trigrams that do not straddle two terms
+        valid = owner[:-2] == owner[2:]
+        pairs = _sorted_unique((codes[valid] << 32) | owner[:-2][valid])
+        gram_of_pair = pairs >> 32
+        self.gram_terms = pairs & 0xFFFFFFFF
+        starts = np.flatnonzero(np.concatenate(([True], gram_of_pair[1:] != gram_of_pair[:-1])))
+        self.gram_codes = gram_of_pair[starts]
+        self.gram_offsets = np.append(starts, len(pairs)).astype(np.int64)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _gram_postings(self, code):
+        position = np.searchsorted(self.gram_codes, code)
+        if position == len(self.gram_codes) or self.gram_codes[position] != code:
+            return None
+        return self.gram_terms[self.gram_offsets[position]:self.gram_offsets[position + 1]]
+
+    def _prefix_terms(self, query):
+        """Term ids starting with the query, shortest first."""
+        lo = np.searchsorted(self.sorted_terms, query, side='left')
+        hi = np.searchsorted(self.sorted_terms, query + '\U0010ffff', side='left')
+        ids = self.order[lo:hi]
+        if len(ids) > MAX_CANDIDATES:
+            shortest = np.argpartition(self.term_lengths[ids], MAX_CANDIDATES)[:MAX_CANDIDATES]
+            ids = ids[shortest]
+        return ids
+
+    def _substring_terms(self, query):
+        """Term ids containing the query (at least 3 bytes long)."""
+        codes = np.unique(_trigram_codes(query.encode('utf-8')))
+        postings = []
+        for code in codes:
+            terms = self._gram_postings(code)
+            if terms is None:
+                return np.empty(0, dtype=np.int64)
+            postings.append(terms)
+        postings.sort(key=len)
+        candidates = postings[0]
+        for terms in postings[1:]:
+            if len(candidates) == 0:
+                break
+            candidates = candidates[_contains_sorted(terms, candidates)]
+        if len(candidates) > MAX_CANDIDATES:
+            shortest = np.argpartition(self.term_lengths[candidates], MAX_CANDIDATES)[:MAX_CANDIDATES]
+            candidates = candidates[shortest]
+        # Trigram hits do not guarantee adjacency, so verify
+        return [term for term in candidates.tolist() if query in self.terms[term]]
+
+    def _fuzzy_terms(self, query, max_edits):
+        """(term ids, distances) of the terms within ``max_edits`` of the query."""
+        none = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+        padded = (START + query + END).encode('utf-8')
+        codes = np.unique(_trigram_codes(padded))
+        # Each edit destroys at most (2 + widest character) byte trigrams
+        width = max(len(char.encode('utf-8')) for char in query)
+        threshold = len(codes) - (2 + width) * max_edits
+        if threshold < 1:
+            return none
+
+        # Only terms of compatible length can be within budget; terms are
+        # numbered by length, so that is one id range per posting list
+        lo = self.length_starts[min(max(len(query) - max_edits, 0), len(self.length_starts) - 1)]
+        hi = self.length_starts[min(len(query) + max_edits + 1, len(self.length_starts) - 1)]
+        postings = []
+        for terms in map(self._gram_postings, codes):
+            if terms is not None:
+                postings.append(terms[np.searchsorted(terms, lo):np.searchsorted(terms, hi)])
+        postings.sort(key=len)
+        if len(postings) < threshold:
+            return none
+        # A term sharing ``threshold`` trigrams appears in at least one of the
+        # ``len - threshold + 1`` shortest lists; the long ones (common
+        # trigrams) are only probed with binary search
+        split = len(postings) - threshold + 1
+        hits = np.sort(np.concatenate(postings[:split]))
+        starts = np.flatnonzero(np.concatenate(([True], hits[1:] != hits[:-1])))
+        terms, counts = hits[starts], np.diff(np.append(starts, len(hits)))
+        remaining = len(postings) - split
+        for posting in postings[split:]:
+            # Drop candidates that can no longer reach the threshold
+            keep = counts + remaining >= threshold
+            terms, counts = terms[keep], counts[keep]
+            counts = counts + _contains_sorted(posting, terms)
+            remaining -= 1
+        keep = counts >= threshold
+        terms, counts = terms[keep], counts[keep]
+        if len(terms) > MAX_FUZZY_CANDIDATES:
+            # Most shared trigrams first: the likeliest to be within budget
+            terms = terms[np.argsort(-counts, kind='stable')[:MAX_FUZZY_CANDIDATES]]
+
+        distances = levenshtein_distances(query, self.terms[terms].tolist())
+        within = distances <= max_edits
+        return terms[within], distances[within]
+
+    def _expand(self, terms):
+        """Concatenated (row * 2 + field) postings of the terms and their owner positions."""
+        starts, stops = self.term_offsets[terms], self.term_offsets[terms + 1]
+        sizes = stops - starts
+        positions = np.repeat(starts - np.cumsum(sizes) + sizes, sizes) + np.arange(sizes.sum())
+        owners = np.repeat(np.arange(len(terms)), sizes)
+        return self.term_postings[positions], owners
+
+    def search(self, query, limit=10, mode='auto', max_edits=None):
+        """
+        Search character and real names.
+
+        Parameters:
+        -----------
+        query : str
+            Search text (case insensitive)
+        limit : int, default=10
+            Maximum number of results
+        mode : str, default='auto'
+            'prefix', 'substring', 'fuzzy' or 'auto' (all three, ranked;
+            fuzzy matches are skipped once a full name matches exactly)
+        max_edits : int, optional
+            Edit distance budget for fuzzy matches (default depends on the
+            query length, see ``default_max_edits``)
+
+        Returns:
+        --------
+        list of dict
+            Results with row, name, realName, field, matchType, distance and
+            score, best first
+        """
+        if mode not in ('auto', 'prefix', 'substring', 'fuzzy'):
+            raise ValueError(f"Unknown search mode '{mode}'. Use auto, prefix, substring or fuzzy.")
+        query = normalize_query(query)
+        if not query or len(self.terms) == 0:
+            return []
+        if max_edits is None:
+            max_edits = default_max_edits(query)
+
+        # Parallel arrays of (term id, match type code, edit distance)
+        found = []
+        exact, prefix, word, substring, fuzzy = range(len(MATCH_TYPES))
+
+        if mode in ('auto', 'prefix'):
+            terms = self._prefix_terms(query)
+            types = np.where(self.term_lengths[terms] == len(query), exact, prefix)
+            found.append((terms, np.where(self.term_is_full[terms], types, word), np.zeros(len(terms), dtype=np.int64)))
+
+        # Later stages score strictly lower, so once enough rows matched
+        # they cannot reach the top ``limit`` and are skipped
+        def enough():
+            if mode != 'auto' or not found:
+                return False
+            terms = np.concatenate([terms for terms, _, _ in found])
+            sizes = self.term_offsets[terms + 1] - self.term_offsets[terms]
+            # A term lists each row at most twice (once per field)
+            if len(sizes) and sizes.max() >= 2 * limit:
+                return True
+            return len(np.unique(self._expand(terms)[0] // 2)) >= limit
+
+        if mode in ('auto', 'substring') and len(query.encode('utf-8')) >= 3 and not enough():
+            terms = np.asarray(self._substring_terms(query), dtype=np.int64)
+            types = np.where((self.term_lengths[terms] == len(query)) & self.term_is_full[terms], exact, substring)
+            found.append((terms, types, np.zeros(len(terms), dtype=np.int64)))
+
+        # A full-name exact match makes typo neighbours noise, and the
+        # Levenshtein pass is by far the most expensive stage, so skip it
+        def exact_match():
+            return mode == 'auto' and any((types == exact).any() for _, types, _ in found)
+
+        if mode in ('auto', 'fuzzy') and max_edits > 0 and not enough() and not exact_match():
+            terms, distances = self._fuzzy_terms(query, max_edits)
+            types = np.where(distances > 0, fuzzy, np.where(self.term_is_full[terms], exact, word))
+            found.append((terms, types, distances))
+
+        if not found or not sum(len(terms) for terms, _, _ in found):
+            return []
+        terms = np.concatenate([terms for terms, _, _ in found])
+        types = np.concatenate([types for _, types, _ in found])
+        distances = np.concatenate([distances for _, _, distances in found])
+        bases = MATCH_SCORE_ARRAY[types] - 10 * distances
+
+        # Expand terms to their (row, field) postings; a common word can
+        # occur in many rows, so this stays vectorized
+        postings, owners = self._expand(terms)
+        rows, fields = postings // 2, postings % 2
+        scores = bases[owners] - REAL_NAME_PENALTY * fields
+
+        # Higher score first, then shorter name, then dataset order. A row
+        # can match through several terms, so over-select before dropping
+        # the duplicates
+        keys = ((scores << 40) - (np.minimum(self.name_lengths[rows], (1 << 20) - 1) << 20)
+                - np.minimum(rows, (1 << 20) - 1))
+        top = min(len(keys), limit * 8)
+        while True:
+            if top < len(keys):
+                candidates = np.argpartition(-keys, top - 1)[:top]
+            else:
+                candidates = np.arange(len(keys))
+            candidates = candidates[np.argsort(-keys[candidates], kind='stable')]
+            _, first = np.unique(rows[candidates], return_index=True)
+            picked = candidates[np.sort(first)][:limit]
+            if len(picked) == limit or top >= len(keys):
+                break
+            top = min(len(keys), top * 4)
+
+        results = []
+        for i in picked.tolist():
+            row = int(rows[i])
+            results.append({
+                'row': row,
+                'name': self.names[row],
+                'realName': self.real_names[row],
+                'field': NAME_FIELDS[fields[i]],
+                'matchType': MATCH_TYPES[types[owners[i]]],
+                'distance': int(distances[owners[i]]),
+                'score': int(scores[i]),
+            })
+        return results
+
+    def resolve(self, name):
+        """
+        Return the best matching character name, or None if nothing is close.
+        """
+        results = self.search(name, limit=1)
+        return results[0]['name'] if results else None
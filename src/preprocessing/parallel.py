@@ -0,0 +1,267 @@
+"""
+Process-pool execution of the row-wise ``MarvelDataProcessor`` stages.
+
+The rows are split into contiguous partitions, one task per worker. A text
+column is copied once into a ``multiprocessing.shared_memory`` block as
+UTF-8 with the values separated by NUL bytes; workers attach to the block in
+their initializer and each task only receives the byte range of its
+partition, so no partition is pickled on the way in. Results come back as
+one encoded buffer or array per partition.
+
+``map_text`` applies a str -> str function (title-casing, the power level
+estimate). ``fit_tfidf`` counts terms per partition, merges the vocabularies
+and document frequencies and prunes and weights the merged counts exactly
+like ``TfidfVectorizer``, so the matrix equals the serial one.
+"""
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from numbers import Integral
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from src.preprocessing.compact_tfidf import CompactTfidf
+
+SEPARATOR = '\x00'
+
+_WORKER = {}
+
+
+def resolve_n_jobs(n_jobs):
+    """Number of worker processes for ``n_jobs`` (None or -1 means one per CPU)."""
+    if n_jobs is None or n_jobs == -1:
+        return os.cpu_count() or 1
+    if n_jobs < 1:
+        raise ValueError("n_jobs must be a positive integer, -1 or None.")
+    return int(n_jobs)
+
+
+def partition_bounds(n_rows, n_partitions):
+    """Row ranges splitting ``n_rows`` into at most ``n_partitions`` even parts."""
+    n_partitions = max(1, min(n_partitions, n_rows))
+    edges = np.linspace(0, n_rows, n_partitions + 1).astype(np.int64)
+    return list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+
+def _has_separator(values):
+    joined = SEPARATOR.join(values)
+    return joined.count(SEPARATOR) != max(len(values) - 1, 0)
+
+
+def _text_values(values):
+    # Missing and non-string values become '' plus a flag
+    values = np.asarray(values, dtype=object)
+    missing = np.array([not isinstance(value, str) for value in values], dtype=bool)
+    if missing.any():
+        values = values.copy()
+        values[missing] = ''
+    return values, missing
+
+
+class SharedTextColumn:
+    """
+    A text column in shared memory, encoded per partition.
+
+    Use as a context manager; the block is unlinked on exit.
+    """
+
+    def __init__(self, values, bounds):
+        """
+        Encode ``values`` (strings without NUL characters) into a new block.
+
+        Parameters:
+        -----------
+        values : numpy.ndarray of str
+            Column values
+        bounds : list of (int, int)
+            Row ranges of the partitions
+        """
+        chunks = []
+        for start, stop in bounds:
+            joined = SEPARATOR.join(values[start:stop])
+            if joined.count(SEPARATOR) != stop - start - 1:
+                raise ValueError("Values containing NUL characters cannot be shared.")
+            chunks.append(joined.encode('utf-8'))
+
+        self.ranges = []
+        offset = 0
+        for (start, stop), chunk in zip(bounds, chunks):
+            self.ranges.append((offset, offset + len(chunk), stop - start))
+            offset += len(chunk)
+        self.nbytes = offset
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for (begin, end, _), chunk in zip(self.ranges, chunks):
+            self.shm.buf[begin:end] = chunk
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _init_worker(shm_name):
+    _WORKER['shm'] = shared_memory.SharedMemory(name=shm_name)
+
+
+def _read_partition(begin, end, n_rows):
+    if n_rows == 0:
+        return []
+    return bytes(_WORKER['shm'].buf[begin:end]).decode('utf-8').split(SEPARATOR)
+
+
+def _map_partition(begin, end, n_rows, func):
+    return SEPARATOR.join(func(value) for value in _read_partition(begin, end, n_rows)).encode('utf-8')
+
+
+def _count_partition(begin, end, n_rows, stop_words):
+    # Term counts of one partition, with the partition's vocabulary sorted
+    # so the columns stay sorted when mapped to the merged vocabulary
+    analyzer = TfidfVectorizer(stop_words=stop_words).build_analyzer()
+
+    vocabulary = {}
+    indices = []
+    counts = []
+    indptr = [0]
+    for text in _read_partition(begin, end, n_rows):
+        counter = Counter(vocabulary.setdefault(term, len(vocabulary)) for term in analyzer(text))
+        indices.extend(counter.keys())
+        counts.extend(counter.values())
+        indptr.append(len(indices))
+
+    terms = np.array(list(vocabulary), dtype=object)
+    order = np.argsort(terms, kind='stable')
+    remap = np.empty(len(terms), dtype=np.int32)
+    remap[order] = np.arange(len(terms), dtype=np.int32)
+    matrix = sparse.csr_matrix((np.array(counts, dtype=np.int32), remap[np.array(indices, dtype=np.int32)],
+                                np.array(indptr, dtype=np.int64)), shape=(n_rows, len(terms)))
+    matrix.sort_indices()
+    return terms[order].tolist(), matrix
+
+
+def _run_partitions(values, n_jobs, task, *args):
+    # Run task(begin, end, n_rows, *args) for every partition of ``values``
+    bounds = partition_bounds(len(values), n_jobs)
+    with SharedTextColumn(values, bounds) as column:
+        with ProcessPoolExecutor(max_workers=len(bounds), initializer=_init_worker,
+                                 initargs=(column.name,)) as executor:
+            futures = [executor.submit(task, begin, end, n_rows, *args) for begin, end, n_rows in column.ranges]
+            return [future.result() for future in futures]
+
+
+def map_text(series, func, n_jobs, na_value=np.nan):
+    """
+    Apply ``func`` to every string of a column in a process pool.
+
+    Parameters:
+    -----------
+    series : pandas.Series
+        Text column
+    func : callable
+        Picklable str -> str function (a module-level function or e.g.
+        ``str.title``)
+    n_jobs : int
+        Worker processes
+    na_value : object, default=numpy.nan
+        Result for missing (or non-string) values, which ``func`` never sees
+
+    Returns:
+    --------
+    pandas.Series
+        Results with the index and, for string columns, the dtype of
+        ``series``
+    """
+    values, missing = _text_values(series.to_numpy())
+    if len(values) == 0 or _has_separator(values):
+        results = [func(value) for value in values]
+    else:
+        parts = _run_partitions(values, n_jobs, _map_partition, func)
+        results = [value for part in parts for value in part.decode('utf-8').split(SEPARATOR)]
+
+    results = np.array(results, dtype=object)
+    results[missing] = na_value
+    dtype = series.dtype if pd.api.types.is_string_dtype(series.dtype) else None
+    return pd.Series(results.tolist(), index=series.index, dtype=dtype, name=series.name)
+
+
+def fit_tfidf(texts, n_jobs, stop_words='english', min_df=1, max_df=1.0, max_features=None):
+    """
+    Fit the TF-IDF model of ``CompactTfidf.fit`` with the counting spread
+    over a process pool.
+
+    Each worker tokenizes its partition and returns sparse term counts over
+    its own sorted vocabulary. The vocabularies are merged, document
+    frequencies summed across partitions and the terms pruned with the same
+    ``min_df``/``max_df``/``max_features`` rules as ``CountVectorizer``,
+    then the merged counts are weighted by ``TfidfTransformer``, so the
+    result equals the serial fit.
+
+    Parameters:
+    -----------
+    texts : pandas.Series or sequence of str
+        Documents (missing values should already be filled)
+    n_jobs : int
+        Worker processes
+    stop_words, min_df, max_df, max_features
+        As for ``CompactTfidf.fit``
+
+    Returns:
+    --------
+    CompactTfidf
+        Fitted model holding the matrix of ``texts``
+    """
+    values, missing = _text_values(np.asarray(texts, dtype=object))
+    if missing.any():
+        raise ValueError("Fill missing values before vectorizing.")
+    if len(values) == 0 or _has_separator(values):
+        return CompactTfidf.fit(values, stop_words=stop_words, min_df=min_df, max_df=max_df,
+                                max_features=max_features)
+    parts = _run_partitions(values, n_jobs, _count_partition, stop_words)
+
+    # Merge the per-partition vocabularies into one sorted vocabulary
+    terms = np.unique(np.array([term for part_terms, _ in parts for term in part_terms], dtype=object))
+    if len(terms) == 0:
+        raise ValueError("empty vocabulary; perhaps the documents only contain stop words")
+    blocks = []
+    for part_terms, matrix in parts:
+        columns = np.searchsorted(terms, np.array(part_terms, dtype=object)).astype(np.int32)
+        blocks.append(sparse.csr_matrix((matrix.data, columns[matrix.indices], matrix.indptr),
+                                        shape=(matrix.shape[0], len(terms))))
+    counts = sparse.vstack(blocks, format='csr', dtype=np.float32)
+
+    # Document frequencies summed over the partitions
+    dfs = np.zeros(len(terms), dtype=np.int64)
+    for block in blocks:
+        dfs += np.bincount(block.indices, minlength=len(terms))
+
+    n_doc = len(values)
+    max_doc_count = max_df if isinstance(max_df, Integral) else max_df * n_doc
+    min_doc_count = min_df if isinstance(min_df, Integral) else min_df * n_doc
+    if max_doc_count < min_doc_count:
+        raise ValueError("max_df corresponds to < documents than min_df")
+    mask = (dfs <= max_doc_count) & (dfs >= min_doc_count)
+    if max_features is not None and mask.sum() > max_features:
+        # Same selection (and tie order) as CountVectorizer._limit_features
+        tfs = np.asarray(counts.sum(axis=0)).ravel()
+        keep = (-tfs[mask]).argsort()[:max_features]
+        limited = np.zeros(len(terms), dtype=bool)
+        limited[np.where(mask)[0][keep]] = True
+        mask = limited
+    kept = np.where(mask)[0]
+    if len(kept) == 0:
+        raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+
+    params = {'stop_words': stop_words, 'min_df': min_df, 'max_df': max_df, 'max_features': max_features}
+    return CompactTfidf.from_counts(counts[:, kept], terms[kept].tolist(), params)
@@ -0,0 +1,197 @@
+from collections import Counter, defaultdict
+
+import pandas as pd
+
+from src.preprocessing.data_processor import build_powers_analyzer
+
+
+class PowerTermCounter:
+    """
+    Incrementally maintained power-term frequency tables.
+
+    Each character's Powers text is tokenized once, with the same analyzer as
+    ``MarvelDataProcessor.vectorize_powers``, and its term counts are added to
+    global, per-role, per-affiliation and per-(role, affiliation) tables.
+    Adding, updating or removing a character only touches that character's
+    terms, so filtered word clouds never rescan the text corpus.
+
+    Entries are keyed by the character name unless an explicit ``key`` is
+    given; ``from_dataframe`` keys rows by their index, so rows sharing a
+    character name are all counted.
+    """
+
+    def __init__(self, analyzer=None):
+        """
+        Initialize an empty counter.
+
+        Parameters:
+        -----------
+        analyzer : callable, optional
+            Tokenizer mapping a powers string to a list of terms
+            (defaults to ``build_powers_analyzer()``)
+        """
+        self.analyzer = analyzer or build_powers_analyzer()
+        self.totals = Counter()
+        self.by_role = defaultdict(Counter)
+        self.by_affiliation = defaultdict(Counter)
+        self.by_role_affiliation = defaultdict(Counter)
+        self._characters = {}  # key -> (term counts, role, affiliation)
+
+    @classmethod
+    def from_dataframe(cls, df, analyzer=None):
+        """
+        Build a counter from a character DataFrame.
+
+        Parameters:
+        -----------
+        df : pandas.DataFrame
+            DataFrame with 'Character' and 'Powers' columns and optionally
+            'Role' and 'Affiliation'
+        analyzer : callable, optional
+            Tokenizer mapping a powers string to a list of terms
+
+        Returns:
+        --------
+        PowerTermCounter
+            Populated counter, keyed by row index (by position if the index
+            has duplicates)
+        """
+        counter = cls(analyzer)
+        roles = df['Role'] if 'Role' in df.columns else [None] * len(df)
+        affiliations = df['Affiliation'] if 'Affiliation' in df.columns else [None] * len(df)
+        keys = df.index if df.index.is_unique else range(len(df))
+        for key, name, powers, role, affiliation in zip(keys, df['Character'], df['Powers'], roles, affiliations):
+            counter.add_character(name, powers, role, affiliation, key=key)
+        return counter
+
+    def __len__(self):
+        return len(self._characters)
+
+    def __contains__(self, key):
+        return key in self._characters
+
+    def _tables_for(self, role, affiliation):
+        tables = [self.totals]
+        if role is not None:
+            tables.append(self.by_role[role])
+        if affiliation is not None:
+            tables.append(self.by_affiliation[affiliation])
+        if role is not None and affiliation is not None:
+            tables.append(self.by_role_affiliation[(role, affiliation)])
+        return tables
+
+    def add_character(self, name, powers, role=None, affiliation=None, key=None):
+        """
+        Add a character's power terms to the frequency tables.
+
+        Adding a key that is already counted replaces its previous entry.
+
+        Parameters:
+        -----------
+        name : str
+            Character name
+        powers : str
+            Powers description
+        role : str, optional
+            Character role
+        affiliation : str, optional
+            Character affiliation
+        key : hashable, optional
+            Key of the entry (defaults to ``name``)
+        """
+        key = name if key is None else key
+        if key in self._characters:
+            self.remove_character(key)
+
+        role = None if pd.isna(role) else role
+        affiliation = None if pd.isna(affiliation) else affiliation
+        terms = Counter(self.analyzer(powers) if isinstance(powers, str) else [])
+
+        for table in self._tables_for(role, affiliation):
+            table.update(terms)
+        self._characters[key] = (terms, role, affiliation)
+
+        return self
+
+    def remove_character(self, key):
+        """
+        Remove a character's power terms from the frequency tables.
+
+        Parameters:
+        -----------
+        key : hashable
+            Key the character was added with (its name by default)
+        """
+        if key not in self._characters:
+            raise ValueError(f"Character '{key}' is not counted.")
+
+        terms, role, affiliation = self._characters.pop(key)
+        for table in self._tables_for(role, affiliation):
+            for term, count in terms.items():
+                remaining = table[term] - count
+                if remaining > 0:
+                    table[term] = remaining
+                else:
+                    del table[term]
+
+        # Drop filter tables that became empty so they don't accumulate
+        if role is not None and not self.by_role[role]:
+            del self.by_role[role]
+        if affiliation is not None and not self.by_affiliation[affiliation]:
+            del self.by_affiliation[affiliation]
+        if (role, affiliation) in self.by_role_affiliation and not self.by_role_affiliation[(role, affiliation)]:
+            del self.by_role_affiliation[(role, affiliation)]
+
+        return self
+
+    def update_character(self, name, powers, role=None, affiliation=None, key=None):
+        """
+        Replace a character's powers, role or affiliation.
+        """
+        return self.add_character(name, powers, role, affiliation, key=key)
+
+    def frequencies(self, role=None, affiliation=None, top_n=None):
+        """
+        Return term frequencies, optionally filtered by role and/or affiliation.
+
+        Parameters:
+        -----------
+        role : str, optional
+            Only count characters with this role
+        affiliation : str, optional
+            Only count characters with this affiliation
+        top_n : int, optional
+            Keep only the most frequent terms
+
+        Returns:
+        --------
+        dict
+            Mapping of term to frequency, suitable for
+            ``WordCloud.generate_from_frequencies``
+        """
+        if role is not None and affiliation is not None:
+            table = self.by_role_affiliation.get((role, affiliation), Counter())
+        elif role is not None:
+            table = self.by_role.get(role, Counter())
+        elif affiliation is not None:
+            table = self.by_affiliation.get(affiliation, Counter())
+        else:
+            table = self.totals
+
+        if top_n is not None:
+            return dict(table.most_common(top_n))
+        return dict(table)
+
+    def tables(self):
+        """
+        Return a picklable snapshot of the aggregate frequency tables.
+
+        Per-character term counts and the analyzer are left out, so the
+        snapshot is cheap to ship to worker processes.
+        """
+        return {
+            'totals': dict(self.totals),
+            'by_role': {role: dict(table) for role, table in self.by_role.items()},
+            'by_affiliation': {aff: dict(table) for aff, table in self.by_affiliation.items()},
+            'by_role_affiliation': {key: dict(table) for key, table in self.by_role_affiliation.items()},
+        }
@@ -0,0 +1,451 @@
+"""
+Full-text search over the Powers column.
+
+Powers are tokenized with the analyzer shared with
+``MarvelDataProcessor.vectorize_powers`` and stored in an inverted index
+whose postings are compressed: for every term, document ids are
+delta-encoded and, like the term frequencies and the in-document positions,
+written as variable-length integers. Postings only ever grow at the end, so
+adding a character appends to the lists of its terms; removed characters
+are tombstoned and dropped by ``compact()``.
+
+Queries are ranked with BM25 and support
+
+- plain terms, combined with ``operator='or'`` (default) or ``'and'``,
+- quoted phrases (``"energy projection"``), which are always required,
+- exclusions (``-telepathy``, ``-"mind control"``),
+- role and affiliation filters.
+
+A query word that the analyzer splits into several tokens
+("genius-level") is matched as a phrase.
+"""
+import math
+import re
+
+import numpy as np
+
+from src.preprocessing.data_processor import build_powers_analyzer
+from src.preprocessing.feature_matrix import split_affiliations
+
+# BM25 parameters (the usual Lucene defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+QUERY_PATTERN = re.compile(r'(-?)"([^"]*)"|(-?)(\S+)')
+
+# Rebuild the postings once this share of documents is tombstoned
+COMPACT_RATIO = 0.5
+
+
+def encode_varint(value, out):
+    """Append a non-negative integer to a bytearray as a varint."""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varints(data):
+    """Decode a buffer of concatenated varints into an int64 array."""
+    buf = np.frombuffer(bytes(data), dtype=np.uint8)
+    if len(buf) == 0:
+        return np.empty(0, dtype=np.int64)
+    ends = np.flatnonzero(buf < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    group = np.repeat(np.arange(len(ends)), ends - starts + 1)
+    shifts = (np.arange(len(buf)) - starts[group]) * 7
+    return np.add.reduceat((buf & 0x7F).astype(np.int64) << shifts, starts)
+
+
+def _contains_sorted(haystack, needles):
+    """Boolean mask of the needles present in a sorted array."""
+    if len(haystack) == 0:
+        return np.zeros(len(needles), dtype=bool)
+    positions = np.minimum(np.searchsorted(haystack, needles), len(haystack) - 1)
+    return haystack[positions] == needles
+
+
+class _Postings:
+    """Compressed postings of one term."""
+
+    __slots__ = ('docs', 'freqs', 'positions', 'last_doc', 'count')
+
+    def __init__(self):
+        self.docs = bytearray()
+        self.freqs = bytearray()
+        self.positions = bytearray()
+        self.last_doc = -1
+        self.count = 0
+
+    def append(self, doc, positions):
+        # First doc is stored as doc + 1 so every delta is positive
+        encode_varint(doc - self.last_doc, self.docs)
+        encode_varint(len(positions), self.freqs)
+        previous = 0
+        for position in positions:
+            encode_varint(position - previous, self.positions)
+            previous = position
+        self.last_doc = doc
+        self.count += 1
+
+    def decode(self, with_positions=False):
+        """
+        Return (doc ids, term frequencies) and, if requested, the positions
+        with the doc id of each position.
+        """
+        docs = np.cumsum(decode_varints(self.docs)) - 1
+        freqs = decode_varints(self.freqs)
+        if not with_positions:
+            return docs, freqs
+        deltas = decode_varints(self.positions)
+        totals = np.cumsum(deltas)
+        # Positions restart at every document
+        firsts = np.cumsum(freqs) - freqs
+        bases = totals[firsts] - deltas[firsts]
+        return docs, freqs, totals - np.repeat(bases, freqs), np.repeat(docs, freqs)
+
+    @property
+    def nbytes(self):
+        return len(self.docs) + len(self.freqs) + len(self.positions)
+
+
+def parse_query(query, analyzer):
+    """
+    Split a query into plain terms, required phrases and exclusions.
+
+    Returns:
+    --------
+    tuple
+        (terms, phrases, excluded) where terms is a list of tokens and
+        phrases / excluded are lists of token lists
+    """
+    terms, phrases, excluded = [], [], []
+    for match in QUERY_PATTERN.finditer(query or ''):
+        negate_phrase, phrase, negate_word, word = match.groups()
+        tokens = analyzer(phrase if phrase is not None else word)
+        if not tokens:
+            continue
+        if negate_phrase or negate_word:
+            excluded.append(tokens)
+        elif phrase is not None or len(tokens) > 1:
+            phrases.append(tokens)
+        else:
+            terms.append(tokens[0])
+    return terms, phrases, excluded
+
+
+class PowersSearchIndex:
+    """
+    Incrementally built BM25 index over character powers.
+
+    Documents are keyed by the character name unless an explicit ``key`` is
+    given; ``from_dataframe`` keys rows by their index, so rows sharing a
+    character name are all indexed.
+    """
+
+    def __init__(self, analyzer=None):
+        """
+        Initialize an empty index.
+
+        Parameters:
+        -----------
+        analyzer : callable, optional
+            Tokenizer mapping a powers string to a list of terms
+            (defaults to ``build_powers_analyzer()``)
+        """
+        self.analyzer = analyzer or build_powers_analyzer()
+        self.postings = {}
+        self.doc_freq = {}  # live documents per term, for the IDF
+        self.doc_ids = {}  # key -> doc id
+        self.keys = []
+        self.names = []
+        self.powers = []
+        self.roles = []
+        self.affiliations = []
+        self.doc_terms = []  # distinct terms per doc, to undo doc_freq
+        self.by_role = {}
+        self.by_affiliation = {}
+        self.lengths = np.zeros(0, dtype=np.int32)
+        self.live = np.zeros(0, dtype=bool)
+        self.total_length = 0
+        self.n_live = 0
+
+    @classmethod
+    def from_dataframe(cls, df, analyzer=None):
+        """
+        Build an index from a character DataFrame.
+
+        Parameters:
+        -----------
+        df : pandas.DataFrame
+            DataFrame with 'Character' and 'Powers' columns and optionally
+            'Role' and 'Affiliation'
+        analyzer : callable, optional
+            Tokenizer mapping a powers string to a list of terms
+
+        Returns:
+        --------
+        PowersSearchIndex
+            Populated index, keyed by row index (by position if the index
+            has duplicates)
+        """
+        index = cls(analyzer)
+        roles = df['Role'] if 'Role' in df.columns else [None] * len(df)
+        affiliations = df['Affiliation'] if 'Affiliation' in df.columns else [None] * len(df)
+        keys = df.index if df.index.is_unique else range(len(df))
+        for key, name, powers, role, affiliation in zip(keys, df['Character'], df['Powers'], roles, affiliations):
+            index.add_character(name, powers, role, affiliation, key=key)
+        return index
+
+    def __len__(self):
+        return self.n_live
+
+    def __contains__(self, key):
+        return key in self.doc_ids
+
+    def _grow(self, size):
+        if size > len(self.lengths):
+            used = len(self.lengths)
+            capacity = max(size, 2 * used, 1024)
+            # np.resize repeats the data, so clear the new tail
+            self.lengths = np.resize(self.lengths, capacity)
+            self.live = np.resize(self.live, capacity)
+            self.lengths[used:] = 0
+            self.live[used:] = False
+
+    def add_character(self, name, powers, role=None, affiliation=None, key=None):
+        """
+        Index a character's powers.
+
+        Adding a key that is already indexed replaces its previous entry.
+
+        Parameters:
+        -----------
+        name : str
+            Character name
+        powers : str
+            Powers description
+        role : str, optional
+            Character role
+        affiliation : str, optional
+            Character affiliation
+        key : hashable, optional
+            Key of the document (defaults to ``name``)
+        """
+        key = name if key is None else key
+        if key in self.doc_ids:
+            self.remove_character(key)
+
+        powers = powers if isinstance(powers, str) else ''
+        role = role if isinstance(role, str) and role else None
+        affiliation = affiliation if isinstance(affiliation, str) and affiliation else None
+        tokens = self.analyzer(powers)
+
+        doc = len(self.names)
+        self._grow(doc + 1)
+        positions = {}
+        for position, token in enumerate(tokens):
+            positions.setdefault(token, []).append(position)
+        for term, term_positions in positions.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = _Postings()
+            postings.append(doc, term_positions)
+            self.doc_freq[term] = self.doc_freq.get(term, 0) + 1
+
+        self.doc_ids[key] = doc
+        self.keys.append(key)
+        self.names.append(name)
+        self.powers.append(powers)
+        self.roles.append(role)
+        self.affiliations.append(affiliation)
+        self.doc_terms.append(tuple(positions))
+        if role is not None:
+            self.by_role.setdefault(role.lower(), []).append(doc)
+        for part in split_affiliations(affiliation):
+            self.by_affiliation.setdefault(part.lower(), []).append(doc)
+        self.lengths[doc] = len(tokens)
+        self.live[doc] = True
+        self.total_length += len(tokens)
+        self.n_live += 1
+
+        return self
+
+    def remove_character(self, key):
+        """
+        Remove a character from the index.
+
+        The document is tombstoned; its postings are dropped by the next
+        ``compact()``, which runs automatically once half the documents
+        are removed.
+
+        Parameters:
+        -----------
+        key : hashable
+            Key the character was added with (its name by default)
+        """
+        if key not in self.doc_ids:
+            raise ValueError(f"Character '{key}' is not indexed.")
+
+        doc = self.doc_ids.pop(key)
+        for term in self.doc_terms[doc]:
+            self.doc_freq[term] -= 1
+        self.live[doc] = False
+        self.total_length -= int(self.lengths[doc])
+        self.n_live -= 1
+
+        if len(self.names) - self.n_live > COMPACT_RATIO * len(self.names):
+            self.compact()
+        return self
+
+    def update_character(self, name, powers, role=None, affiliation=None, key=None):
+        """
+        Replace a character's powers, role or affiliation.
+        """
+        return self.add_character(name, powers, role, affiliation, key=key)
+
+    def compact(self):
+        """
+        Rebuild the postings without tombstoned documents.
+        """
+        live_docs = [doc for doc in range(len(self.names)) if self.live[doc]]
+        rebuilt = PowersSearchIndex(self.analyzer)
+        for doc in live_docs:
+            rebuilt.add_character(self.names[doc], self.powers[doc], self.roles[doc], self.affiliations[doc],
+                                  key=self.keys[doc])
+        self.__dict__.update(rebuilt.__dict__)
+        return self
+
+    def _filter_docs(self, role, affiliation):
+        """Sorted doc ids allowed by the filters, or None when unfiltered."""
+        allowed = None
+        if role:
+            allowed = np.array(self.by_role.get(role.lower(), []), dtype=np.int64)
+        if affiliation:
+            docs = np.array(self.by_affiliation.get(affiliation.strip().lower(), []), dtype=np.int64)
+            allowed = docs if allowed is None else np.intersect1d(allowed, docs, assume_unique=True)
+        return allowed
+
+    def _term_docs(self, term):
+        postings = self.postings.get(term)
+        if postings is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return postings.decode()
+
+    def _phrase_docs(self, tokens):
+        """Doc ids containing the tokens consecutively, and the phrase counts."""
+        keys = None
+        for offset, token in enumerate(tokens):
+            postings = self.postings.get(token)
+            if postings is None:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+            _, _, positions, owners = postings.decode(with_positions=True)
+            # (doc, start of the phrase) pairs, shifted so they line up
+            valid = positions >= offset
+            starts = owners[valid] * (1 << 32) + (positions[valid] - offset)
+            # Postings are in (doc, position) order, so both sides are sorted
+            keys = starts if keys is None else keys[_contains_sorted(starts, keys)]
+            if len(keys) == 0:
+                break
+        docs = keys >> 32
+        firsts = np.flatnonzero(np.concatenate(([True], docs[1:] != docs[:-1])))
+        return docs[firsts], np.diff(np.append(firsts, len(docs)))
+
+    def _bm25(self, term, docs, freqs):
+        """BM25 contribution of a term for the given docs and frequencies."""
+        df = self.doc_freq.get(term, 0)
+        idf = math.log(1 + (self.n_live - df + 0.5) / (df + 0.5))
+        avg_length = self.total_length / self.n_live if self.n_live else 1.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[docs] / max(avg_length, 1e-9))
+        return idf * freqs * (BM25_K1 + 1) / (freqs + norm)
+
+    def search(self, query, role=None, affiliation=None, operator='or', limit=10):
+        """
+        Rank characters by the BM25 score of their powers.
+
+        Parameters:
+        -----------
+        query : str
+            Terms, "quoted phrases" and -exclusions
+        role : str, optional
+            Only return characters with this role (case insensitive)
+        affiliation : str, optional
+            Only return characters with this affiliation (case insensitive)
+        operator : str, default='or'
+            Whether plain terms are alternatives ('or') or all required ('and')
+        limit : int, default=10
+            Maximum number of results
+
+        Returns:
+        --------
+        list of dict
+            Results with name, role, affiliation, powers and score, best first
+        """
+        if operator not in ('or', 'and'):
+            raise ValueError(f"Unknown operator '{operator}'. Use 'or' or 'and'.")
+        terms, phrases, excluded = parse_query(query, self.analyzer)
+        if not terms and not phrases:
+            return []
+
+        doc_parts, score_parts = [], []
+        # Docs that must match: every phrase, and every term with 'and'
+        required = []
+        for term in dict.fromkeys(terms):
+            docs, freqs = self._term_docs(term)
+            doc_parts.append(docs)
+            score_parts.append(self._bm25(term, docs, freqs))
+            if operator == 'and':
+                required.append(docs)
+        for tokens in phrases:
+            phrase_docs, counts = self._phrase_docs(tokens)
+            required.append(phrase_docs)
+            # A phrase scores as its terms would, counted at phrase frequency
+            for token in tokens:
+                doc_parts.append(phrase_docs)
+                score_parts.append(self._bm25(token, phrase_docs, counts))
+
+        docs = np.concatenate(doc_parts)
+        scores = np.concatenate(score_parts)
+        order = np.argsort(docs, kind='stable')
+        docs, scores = docs[order], scores[order]
+        unique_docs, starts = np.unique(docs, return_index=True)
+        totals = np.add.reduceat(scores, starts) if len(docs) else scores
+
+        keep = self.live[unique_docs]
+        for docs_required in required:
+            keep &= np.isin(unique_docs, docs_required)
+        for tokens in excluded:
+            excluded_docs = self._phrase_docs(tokens)[0] if len(tokens) > 1 else self._term_docs(tokens[0])[0]
+            keep &= ~np.isin(unique_docs, excluded_docs)
+        allowed = self._filter_docs(role, affiliation)
+        if allowed is not None:
+            keep &= np.isin(unique_docs, allowed)
+        unique_docs, totals = unique_docs[keep], totals[keep]
+
+        if len(unique_docs) > limit:
+            top = np.argpartition(-totals, limit - 1)[:limit]
+            unique_docs, totals = unique_docs[top], totals[top]
+        ranking = np.lexsort((unique_docs, -totals))
+
+        results = []
+        for i in ranking.tolist():
+            doc = int(unique_docs[i])
+            results.append({
+                'name': self.names[doc],
+                'role': self.roles[doc],
+                'affiliation': self.affiliations[doc],
+                'powers': self.powers[doc],
+                'score': round(float(totals[i]), 4),
+            })
+        return results
+
+    def stats(self):
+        """
+        Return the number of documents, terms and compressed postings bytes.
+        """
+        return {
+            'documents': self.n_live,
+            'tombstoned': len(self.names) - self.n_live,
+            'terms': sum(1 for count in self.doc_freq.values() if count > 0),
+            'postingsBytes': sum(postings.nbytes for postings in self.postings.values()),
+        }
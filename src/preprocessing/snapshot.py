@@ -0,0 +1,394 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_FORMAT_VERSION = 1
+META_FILE = 'meta.json'
+# Optional CompactTfidf of the Powers column saved inside the snapshot
+TFIDF_DIR = 'tfidf'
+# to_dataframe(categorical='auto') keeps a string column categorical when it
+# has at most this many distinct values per row
+AUTO_CATEGORICAL_RATIO = 0.5
+
+
+def is_snapshot(path):
+    """
+    Return True if ``path`` is a dataset snapshot directory.
+    """
+    return path is not None and os.path.isfile(os.path.join(path, META_FILE))
+
+
+def source_signature(path):
+    """
+    Cheap signature of a source file (size and modification time), used to
+    detect snapshots that are older than their CSV.
+    """
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class SnapshotWriter:
+    """
+    Streaming writer for the memory-mappable columnar snapshot format.
+
+    A snapshot is a directory holding, per column:
+
+    - numeric columns: ``c<i>.values.npy`` with the raw values
+    - string columns: ``c<i>.codes.npy`` (int32 dictionary codes, -1 for
+      missing), ``c<i>.dict.bin`` (concatenated UTF-8 dictionary entries) and
+      ``c<i>.offsets.npy`` (int64 start offsets of each entry, plus the end)
+    - text columns: ``c<i>.text.bin`` (every row's UTF-8 value, streamed to
+      disk) and ``c<i>.offsets.npy`` (int64 start offset per row, plus the
+      end); meant for near-unique columns such as names, where a dictionary
+      would grow with the row count. Missing values are stored as ''.
+
+    and a ``meta.json`` describing the columns. Rows are appended chunk by
+    chunk into preallocated ``.npy`` memmaps, so memory use is bounded by the
+    chunk size plus the string dictionaries. The directory is written under
+    a temporary name and renamed into place on ``close``.
+    """
+
+    def __init__(self, path, n_rows, metadata=None, text_columns=None):
+        """
+        Initialize the writer.
+
+        Parameters:
+        -----------
+        path : str
+            Destination snapshot directory
+        n_rows : int
+            Total number of rows that will be appended
+        metadata : dict, optional
+            Extra information stored in ``meta.json`` (e.g. the source file)
+        text_columns : list of str, optional
+            String columns stored per row instead of dictionary-encoded
+        """
+        self.path = os.path.abspath(path)
+        self.n_rows = n_rows
+        self.metadata = metadata or {}
+        self.rows_written = 0
+        self.columns = None
+        self.text_columns = set(text_columns or [])
+        self._arrays = {}
+        self._dictionaries = {}
+        self._text_files = {}
+        self._text_sizes = {}
+
+        parent = os.path.dirname(self.path)
+        os.makedirs(parent, exist_ok=True)
+        self._tmp_dir = tempfile.mkdtemp(dir=parent, prefix=f".{os.path.basename(self.path)}.tmp-")
+
+    def _init_columns(self, chunk):
+        self.columns = []
+        for i, name in enumerate(chunk.columns):
+            dtype = chunk[name].dtype
+            if name in self.text_columns:
+                kind, file_dtype, suffix = 'text', np.dtype(np.int64), 'offsets'
+                self._text_files[name] = open(os.path.join(self._tmp_dir, f'c{i}.text.bin'), 'wb')
+                self._text_sizes[name] = 0
+            elif dtype.kind in 'biuf':
+                kind, file_dtype, suffix = 'numeric', dtype, 'values'
+            else:
+                kind, file_dtype, suffix = 'string', np.dtype(np.int32), 'codes'
+                self._dictionaries[name] = {}
+            self.columns.append({'name': str(name), 'kind': kind, 'dtype': str(file_dtype), 'prefix': f'c{i}'})
+            self._arrays[name] = np.lib.format.open_memmap(
+                os.path.join(self._tmp_dir, f'c{i}.{suffix}.npy'),
+                mode='w+', dtype=file_dtype, shape=(self.n_rows + (kind == 'text'),)
+            )
+
+    def append(self, chunk):
+        """
+        Append a chunk of rows.
+
+        Parameters:
+        -----------
+        chunk : pandas.DataFrame
+            Rows to append; every chunk must have the same columns
+        """
+        if self.columns is None:
+            self._init_columns(chunk)
+        elif [str(col) for col in chunk.columns] != [col['name'] for col in self.columns]:
+            raise ValueError("All chunks must have the same columns.")
+
+        start, end = self.rows_written, self.rows_written + len(chunk)
+        if end > self.n_rows:
+            raise ValueError(f"Snapshot was declared with {self.n_rows} rows; got more.")
+
+        for column in self.columns:
+            values = chunk[column['name']]
+            if column['kind'] == 'numeric':
+                self._arrays[column['name']][start:end] = values.to_numpy()
+                continue
+            if column['kind'] == 'text':
+                encoded = [value.encode('utf-8') for value in values.fillna('').astype(str)]
+                offsets = self._arrays[column['name']]
+                offsets[start] = self._text_sizes[column['name']]
+                offsets[start + 1:end + 1] = self._text_sizes[column['name']] + np.cumsum(
+                    [len(value) for value in encoded], dtype=np.int64)
+                self._text_files[column['name']].write(b''.join(encoded))
+                self._text_sizes[column['name']] = int(offsets[end])
+                continue
+
+            # Factorize locally, then map local codes to global dictionary codes
+            local_codes, uniques = pd.factorize(values, use_na_sentinel=True)
+            dictionary = self._dictionaries[column['name']]
+            global_ids = np.array(
+                [dictionary.setdefault(str(value), len(dictionary)) for value in uniques] + [-1],
+                dtype=np.int32
+            )
+            # Local code -1 (missing) picks the trailing -1
+            self._arrays[column['name']][start:end] = global_ids[local_codes]
+
+        self.rows_written = end
+        return self
+
+    def close(self):
+        """
+        Finish the snapshot and atomically move it into place.
+
+        Returns:
+        --------
+        str
+            Path of the snapshot directory
+        """
+        if self.rows_written != self.n_rows:
+            self.abort()
+            raise ValueError(f"Snapshot was declared with {self.n_rows} rows; only {self.rows_written} were appended.")
+
+        for column in self.columns or []:
+            self._arrays[column['name']].flush()
+            if column['kind'] == 'text':
+                self._text_files.pop(column['name']).close()
+            if column['kind'] != 'string':
+                continue
+            encoded = [value.encode('utf-8') for value in self._dictionaries[column['name']]]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(value) for value in encoded], out=offsets[1:])
+            np.save(os.path.join(self._tmp_dir, f"{column['prefix']}.offsets.npy"), offsets)
+            with open(os.path.join(self._tmp_dir, f"{column['prefix']}.dict.bin"), 'wb') as f:
+                f.write(b''.join(encoded))
+        self._arrays.clear()
+
+        meta = dict(self.metadata)
+        meta.update({
+            'format_version': SNAPSHOT_FORMAT_VERSION,
+            'n_rows': self.n_rows,
+            'columns': self.columns or [],
+        })
+        with open(os.path.join(self._tmp_dir, META_FILE), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+        # Swap directories; readers holding maps of the old files keep them
+        old_dir = None
+        if os.path.exists(self.path):
+            old_dir = tempfile.mkdtemp(dir=os.path.dirname(self.path), prefix=f".{os.path.basename(self.path)}.old-")
+            os.rmdir(old_dir)
+            os.rename(self.path, old_dir)
+        os.rename(self._tmp_dir, self.path)
+        if old_dir is not None:
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+        return self.path
+
+    def abort(self):
+        """
+        Discard a partially written snapshot.
+        """
+        for f in self._text_files.values():
+            f.close()
+        self._text_files.clear()
+        self._arrays.clear()
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+
+def write_snapshot(df, path, metadata=None, text_columns=None):
+    """
+    Write a DataFrame as a snapshot directory.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        Data to write
+    path : str
+        Destination snapshot directory
+    metadata : dict, optional
+        Extra information stored in ``meta.json``
+    text_columns : list of str, optional
+        String columns stored per row instead of dictionary-encoded
+
+    Returns:
+    --------
+    str
+        Path of the snapshot directory
+    """
+    writer = SnapshotWriter(path, len(df), metadata, text_columns)
+    try:
+        writer.append(df)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.close()
+
+
+class DatasetSnapshot:
+    """
+    Read-only, memory-mapped view of a snapshot directory.
+
+    Opening a snapshot only parses ``meta.json`` and maps the column files,
+    so it takes constant time regardless of the row count, and every process
+    that opens the same snapshot shares its pages through the OS page cache.
+    """
+
+    def __init__(self, path):
+        """
+        Open a snapshot.
+
+        Parameters:
+        -----------
+        path : str
+            Snapshot directory
+        """
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        if self.meta.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format version: {self.meta.get('format_version')}")
+
+        self.n_rows = self.meta['n_rows']
+        self._columns = {column['name']: column for column in self.meta['columns']}
+        self._categories = {}
+
+    @classmethod
+    def open(cls, path):
+        """
+        Open a snapshot directory.
+        """
+        return cls(path)
+
+    @property
+    def columns(self):
+        return [column['name'] for column in self.meta['columns']]
+
+    def __len__(self):
+        return self.n_rows
+
+    def _file(self, column, suffix):
+        return os.path.join(self.path, f"{column['prefix']}.{suffix}")
+
+    def column_codes(self, name):
+        """
+        Return the memory-mapped values (numeric columns), dictionary codes
+        (string columns) or row offsets (text columns) of a column without
+        copying.
+        """
+        column = self._columns[name]
+        suffix = {'numeric': 'values.npy', 'string': 'codes.npy', 'text': 'offsets.npy'}[column['kind']]
+        return np.load(self._file(column, suffix), mmap_mode='r')
+
+    def _read_bytes(self, column, suffix, size):
+        # np.memmap rejects empty files
+        if size == 0:
+            return b''
+        return np.memmap(self._file(column, suffix), dtype=np.uint8, mode='r').tobytes()
+
+    def text_values(self, name):
+        """
+        Decode every row of a text column.
+        """
+        column = self._columns[name]
+        offsets = self.column_codes(name)
+        raw = self._read_bytes(column, 'text.bin', int(offsets[-1]))
+        bounds = offsets.tolist()
+        return [raw[bounds[i]:bounds[i + 1]].decode('utf-8') for i in range(len(bounds) - 1)]
+
+    def categories(self, name):
+        """
+        Return the decoded string dictionary of a string column.
+        """
+        if name not in self._categories:
+            column = self._columns[name]
+            offsets = np.load(self._file(column, 'offsets.npy'), mmap_mode='r')
+            raw = self._read_bytes(column, 'dict.bin', int(offsets[-1]))
+            bounds = offsets.tolist()
+            self._categories[name] = [
+                raw[bounds[i]:bounds[i + 1]].decode('utf-8') for i in range(len(bounds) - 1)
+            ]
+        return self._categories[name]
+
+    def to_dataframe(self, columns=None, categorical=False):
+        """
+        Materialize the snapshot as a DataFrame.
+
+        Parameters:
+        -----------
+        columns : list of str, optional
+            Columns to load (defaults to all)
+        categorical : bool or 'auto', default=False
+            Return string columns as ``pandas.Categorical`` (codes stay
+            compact) instead of object columns. ``'auto'`` only does so for
+            columns with at most ``len(self) * AUTO_CATEGORICAL_RATIO``
+            distinct values; near-unique columns such as names are cheaper
+            decoded, since their categories would be as large as the column
+
+        Returns:
+        --------
+        pandas.DataFrame
+            Snapshot contents
+        """
+        data = {}
+        for name in columns or self.columns:
+            column = self._columns[name]
+            values = self.column_codes(name)
+            if column['kind'] == 'numeric':
+                data[name] = values
+            elif column['kind'] == 'text':
+                data[name] = np.array(self.text_values(name), dtype=object)
+            elif categorical is True or (categorical == 'auto' and
+                                         len(self.categories(name)) <= self.n_rows * AUTO_CATEGORICAL_RATIO):
+                data[name] = pd.Categorical.from_codes(np.asarray(values), categories=self.categories(name))
+            else:
+                # Trailing None makes code -1 decode to a missing value
+                lookup = np.array(self.categories(name) + [None], dtype=object)
+                data[name] = lookup[values]
+        return pd.DataFrame(data, columns=columns or self.columns)
+
+
+def open_snapshot(path):
+    """
+    Open a snapshot directory.
+    """
+    return DatasetSnapshot.open(path)
+
+
+def main():
+    # Allow running as a script from the project root
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if project_root not in sys.path:
+        sys.path.append(project_root)
+    from src.preprocessing.data_processor import MarvelDataProcessor
+
+    parser = argparse.ArgumentParser(description='Build a memory-mappable snapshot of the cleaned character dataset')
+    parser.add_argument('csv', help='Source CSV file')
+    parser.add_argument('output', help='Snapshot directory to create or replace')
+    parser.add_argument('--n-jobs', type=int, default=1, help='Worker processes for vectorizing (-1: all CPUs)')
+    args = parser.parse_args()
+
+    # Same cleaning the API applies after reading the CSV
+    processor = MarvelDataProcessor(data_path=args.csv, n_jobs=args.n_jobs).fill_missing()
+    if 'Hero/Villain' in processor.get_processed_data().columns:
+        processor.label_power_levels_from_alignment()
+
+    processor.save_snapshot(args.output, source_path=args.csv)
+    # TF-IDF of the powers as the API's feature matrix vectorizes them
+    processor.vectorize_powers(min_df=1).save_tfidf(os.path.join(args.output, TFIDF_DIR))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+"""
+Deterministic synthetic character datasets for scale testing.
+
+Vocabularies (name words, real names, affiliations, power phrases, role mix)
+are learned from the bundled CSV, then rows are generated chunk by chunk so
+tens of millions of rows can be streamed to CSV or to a snapshot directory
+(``src/preprocessing/snapshot.py``) in bounded memory. The output depends
+only on the seed, the row count and the chunk size.
+
+Usage:
+    python -m src.preprocessing.synthetic --rows 1000000 --output data/synthetic_1m.csv
+    python -m src.preprocessing.synthetic --rows 20000000 --format snapshot --output data/synthetic_20m
+"""
+import argparse
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.preprocessing.snapshot import SnapshotWriter
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_SOURCE_PATH = os.path.join(project_root, 'data', 'marvel_characters_dataset.csv')
+
+SCHEMA = ['Character', 'Real Name', 'Affiliation', 'Powers', 'Role', 'Power Level', 'Hero/Villain']
+
+# The bundled data only has 'Low' levels, so the level mix is configured
+POWER_LEVEL_WEIGHTS = {'Low': 0.6, 'Medium': 0.3, 'High': 0.1}
+
+# Words combined into affiliation names beyond the ones in the source data
+AFFILIATION_WORDS = ['Dark', 'Secret', 'Young', 'New', 'Cosmic', 'Mighty', 'Shadow', 'Iron', 'Uncanny', 'Silver']
+AFFILIATION_NOUNS = ['Legion', 'Council', 'Squad', 'Order', 'Guard', 'Syndicate', 'Alliance', 'Brotherhood']
+
+# Spellings a duplicated character name may take
+NAME_VARIANTS = ('title', 'spaced', 'parenthetical', 'hyphenated')
+
+DEFAULT_CHUNK_ROWS = 100000
+
+
+def _cdf(weights):
+    weights = np.asarray(weights, dtype=np.float64)
+    cdf = np.cumsum(weights / weights.sum())
+    cdf[-1] = 1.0
+    return cdf
+
+
+def _sample(rng, cdf, size):
+    return np.searchsorted(cdf, rng.random(size), side='right')
+
+
+class SyntheticDatasetGenerator:
+    """
+    Seeded generator of character datasets with realistic skew.
+
+    - Affiliation sizes follow a Zipf law: rank ``k`` is picked with
+      probability proportional to ``1 / k**zipf_exponent``; the source
+      affiliations take the top ranks in their original order of size.
+    - Powers are 1-3 phrases drawn from the source phrase frequencies, with
+      the source distribution of phrases per character.
+    - Roles follow the source mix and 'Hero/Villain' mirrors 'Role'.
+    - A ``duplicate_rate`` fraction of rows reuse an earlier row's character
+      name in a different spelling (case, spacing, a parenthetical or
+      hyphens), like repeated entries in scraped data.
+    """
+
+    def __init__(self, n_rows, seed=42, source_path=DEFAULT_SOURCE_PATH, n_affiliations=None,
+                 zipf_exponent=1.1, duplicate_rate=0.02, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """
+        Initialize the generator.
+
+        Parameters:
+        -----------
+        n_rows : int
+            Number of rows to generate
+        seed : int, default=42
+            Random seed
+        source_path : str
+            CSV the vocabularies are learned from
+        n_affiliations : int, optional
+            Number of distinct affiliations (default: one per 50 rows, at
+            least as many as the source has)
+        zipf_exponent : float, default=1.1
+            Skew of the affiliation sizes
+        duplicate_rate : float, default=0.02
+            Fraction of rows that repeat an earlier character name
+        chunk_rows : int, default=100000
+            Rows generated per chunk
+        """
+        if n_rows < 0:
+            raise ValueError("n_rows must be non-negative.")
+        if not 0 <= duplicate_rate < 1:
+            raise ValueError("duplicate_rate must be in [0, 1).")
+
+        self.n_rows = n_rows
+        self.seed = seed
+        self.zipf_exponent = zipf_exponent
+        self.duplicate_rate = duplicate_rate
+        self.chunk_rows = chunk_rows
+
+        source = pd.read_csv(source_path).fillna('')
+        self._learn_vocabulary(source)
+
+        n_source_affiliations = len(self.affiliations)
+        if n_affiliations is None:
+            n_affiliations = max(n_source_affiliations, n_rows // 50)
+        self._extend_affiliations(n_affiliations)
+        ranks = np.arange(1, len(self.affiliations) + 1, dtype=np.float64)
+        self.affiliation_cdf = _cdf(ranks ** -zipf_exponent)
+
+    def _learn_vocabulary(self, source):
+        words = sorted({word for name in source['Character'].str.lower() for word in name.split()})
+        self.name_words = np.array(words, dtype=object)
+
+        real_names = [name.split() for name in source['Real Name'] if name.split()]
+        self.first_names = np.array(sorted({parts[0] for parts in real_names}), dtype=object)
+        self.last_names = np.array(sorted({parts[-1] for parts in real_names if len(parts) > 1}), dtype=object)
+
+        self.affiliations = source['Affiliation'].value_counts().index.tolist()
+
+        phrases = source['Powers'].str.split(',').explode().str.strip()
+        phrase_counts = phrases[phrases != ''].value_counts()
+        self.phrases = np.array(phrase_counts.index.tolist(), dtype=object)
+        self.phrase_cdf = _cdf(phrase_counts.to_numpy())
+
+        per_character = source['Powers'].str.split(',').str.len().clip(1, 3).value_counts()
+        self.phrase_count_cdf = _cdf([per_character.get(k, 0) for k in (1, 2, 3)])
+
+        roles = source['Role'].value_counts()
+        self.roles = np.array(roles.index.tolist(), dtype=object)
+        self.role_cdf = _cdf(roles.to_numpy())
+
+        self.power_levels = np.array(list(POWER_LEVEL_WEIGHTS), dtype=object)
+        self.power_level_cdf = _cdf(list(POWER_LEVEL_WEIGHTS.values()))
+
+    def _extend_affiliations(self, n_affiliations):
+        seen = set(self.affiliations)
+        n_words, n_nouns = len(AFFILIATION_WORDS), len(AFFILIATION_NOUNS)
+        index = 0
+        while len(self.affiliations) < n_affiliations:
+            word = AFFILIATION_WORDS[index % n_words]
+            noun = AFFILIATION_NOUNS[(index // n_words) % n_nouns]
+            generation = index // (n_words * n_nouns)
+            name = f"{word} {noun}" if generation == 0 else f"{word} {noun} {generation + 1}"
+            if name not in seen:
+                seen.add(name)
+                self.affiliations.append(name)
+            index += 1
+        self.affiliations = np.array(self.affiliations, dtype=object)
+
+    def character_names(self, row_ids):
+        """
+        Canonical character name of each row id (deterministic, no state).
+        """
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        n_words = len(self.name_words)
+        block = n_words * n_words
+        # An affine permutation of each block of ids spreads consecutive
+        # rows over the vocabulary while keeping word pairs unique
+        multiplier = next(m for m in range(7919, 7919 + block + 1) if math.gcd(m, block) == 1)
+        permuted = (row_ids % block * multiplier + 12345) % block
+        first = self.name_words[permuted % n_words]
+        second = self.name_words[permuted // n_words]
+        generation = row_ids // block
+        names = pd.Series(first) + ' ' + pd.Series(second)
+        numbered = generation > 0
+        names[numbered] = names[numbered] + ' ' + pd.Series(generation[numbered] + 1).astype(str).to_numpy()
+        return names.to_numpy()
+
+    def _name_variants(self, names, rng):
+        variants = rng.integers(len(NAME_VARIANTS), size=len(names))
+        names = pd.Series(names, dtype=object)
+        result = names.copy()
+        result[variants == 0] = names[variants == 0].str.title()
+        result[variants == 1] = '  ' + names[variants == 1] + ' '
+        result[variants == 2] = names[variants == 2] + ' (earth-616)'
+        result[variants == 3] = names[variants == 3].str.replace(' ', '-', regex=False)
+        return result.to_numpy()
+
+    def _powers(self, rng, size):
+        counts = _sample(rng, self.phrase_count_cdf, size) + 1
+        picks = self.phrases[_sample(rng, self.phrase_cdf, (size, 3))]
+        powers = pd.Series(picks[:, 0], dtype=object)
+        for k in (1, 2):
+            # Skip a phrase that repeats one already listed for the row
+            more = (counts > k) & (picks[:, k] != picks[:, 0]) & ((k == 1) | (picks[:, k] != picks[:, 1]))
+            powers[more] = powers[more] + ', ' + picks[more, k]
+        return powers.to_numpy()
+
+    def generate_chunk(self, chunk_index):
+        """
+        Generate one chunk of rows.
+
+        Parameters:
+        -----------
+        chunk_index : int
+            Chunk number; rows ``chunk_index * chunk_rows`` onwards
+
+        Returns:
+        --------
+        pandas.DataFrame
+            Rows with the SCHEMA columns
+        """
+        start = chunk_index * self.chunk_rows
+        size = max(0, min(self.chunk_rows, self.n_rows - start))
+        rng = np.random.default_rng([self.seed, chunk_index])
+        row_ids = np.arange(start, start + size, dtype=np.int64)
+
+        names = self.character_names(row_ids)
+        duplicate = (rng.random(size) < self.duplicate_rate) & (row_ids > 0)
+        if duplicate.any():
+            # Repeat an earlier row's name, spelled differently
+            earlier = (rng.random(int(duplicate.sum())) * row_ids[duplicate]).astype(np.int64)
+            names[duplicate] = self._name_variants(self.character_names(earlier), rng)
+
+        real_first = self.first_names[rng.integers(len(self.first_names), size=size)]
+        real_last = self.last_names[rng.integers(len(self.last_names), size=size)]
+        roles = self.roles[_sample(rng, self.role_cdf, size)]
+
+        return pd.DataFrame({
+            'Character': names,
+            'Real Name': (pd.Series(real_first) + ' ' + pd.Series(real_last)).to_numpy(),
+            'Affiliation': self.affiliations[_sample(rng, self.affiliation_cdf, size)],
+            'Powers': self._powers(rng, size),
+            'Role': roles,
+            'Power Level': self.power_levels[_sample(rng, self.power_level_cdf, size)],
+            'Hero/Villain': roles,
+        }, columns=SCHEMA)
+
+    def iter_chunks(self):
+        """
+        Yield the dataset chunk by chunk.
+        """
+        n_chunks = -(-self.n_rows // self.chunk_rows) if self.chunk_rows else 0
+        for chunk_index in range(n_chunks):
+            yield self.generate_chunk(chunk_index)
+
+    def to_dataframe(self):
+        """
+        Generate the whole dataset in memory (for small row counts).
+        """
+        chunks = list(self.iter_chunks())
+        return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=SCHEMA)
+
+    def to_csv(self, output_path):
+        """
+        Stream the dataset to a CSV file.
+
+        Parameters:
+        -----------
+        output_path : str
+            Destination CSV path
+        """
+        with open(output_path, 'w', newline='', encoding='utf-8') as f:
+            f.write(','.join(SCHEMA) + '\n')
+            for chunk in self.iter_chunks():
+                chunk.to_csv(f, header=False, index=False)
+        print(f"Synthetic dataset with {self.n_rows} rows saved to {output_path}")
+        return output_path
+
+    def to_snapshot(self, output_path):
+        """
+        Stream the dataset to a snapshot directory.
+
+        Names are stored as per-row text columns so the dictionaries stay
+        bounded by the vocabularies rather than the row count.
+
+        Parameters:
+        -----------
+        output_path : str
+            Destination snapshot directory
+        """
+        writer = SnapshotWriter(output_path, self.n_rows, {'source': 'synthetic', 'seed': self.seed},
+                                text_columns=['Character', 'Real Name'])
+        try:
+            for chunk in self.iter_chunks():
+                writer.append(chunk)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+        print(f"Synthetic snapshot with {self.n_rows} rows saved to {output_path}")
+        return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic character dataset')
+    parser.add_argument('--rows', type=int, required=True, help='Number of rows')
+    parser.add_argument('--output', required=True, help='CSV file or snapshot directory')
+    parser.add_argument('--format', choices=['csv', 'snapshot'], default='csv')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--source', default=DEFAULT_SOURCE_PATH, help='CSV to learn vocabularies from')
+    parser.add_argument('--affiliations', type=int, help='Number of distinct affiliations')
+    parser.add_argument('--zipf-exponent', type=float, default=1.1)
+    parser.add_argument('--duplicate-rate', type=float, default=0.02)
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    generator = SyntheticDatasetGenerator(
+        args.rows, seed=args.seed, source_path=args.source, n_affiliations=args.affiliations,
+        zipf_exponent=args.zipf_exponent, duplicate_rate=args.duplicate_rate, chunk_rows=args.chunk_rows
+    )
+    if args.format == 'snapshot':
+        generator.to_snapshot(args.output)
+    else:
+        generator.to_csv(args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,815 @@
+import datetime
+import hmac
+import json
+import os
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import numpy as np
+import pandas as pd
+from matplotlib.colors import is_color_like, to_hex
+
+from src.models.batching import MicroBatcher, batching_config_from_env
+from src.models.manager import ModelManager, ModelNotReady, manager_config_from_env
+from src.models.power_predictor import PowerPredictor
+from src.preprocessing.data_processor import MarvelDataProcessor
+from src.preprocessing.feature_matrix import CharacterFeatureMatrix
+from src.preprocessing.feature_store import FeatureStore
+from src.preprocessing.name_index import NameIndex
+from src.preprocessing.powers_index import PowersSearchIndex
+from src.preprocessing.compact_tfidf import CompactTfidf, is_tfidf
+from src.preprocessing.snapshot import TFIDF_DIR, is_snapshot, open_snapshot, source_signature
+from src.utils.cache import dataset_fingerprint
+from src.utils.prediction_store import ATTRIBUTES as STORED_ATTRIBUTES, PredictionStore
+from src.utils.serialization import available_formats, negotiate_format
+from src.visualization.chart_renderer import CHART_FORMATS, CHARTS, ChartRenderer, chart_params
+from src.visualization.network_visualizer import MarvelNetworkVisualizer
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Construct the absolute path to the CSV file
+DEFAULT_DATA_PATH = os.path.join(project_root, 'data', 'Marvels - 2 (1).csv')
+# Memory-mapped copy of the cleaned dataset (see src/preprocessing/snapshot.py)
+DEFAULT_SNAPSHOT_PATH = os.path.join(project_root, 'data', 'snapshot')
+DEFAULT_STORAGE_DIR = os.path.join(project_root, 'data', 'fetched_data')
+DEFAULT_CHART_CACHE_DIR = os.path.join(project_root, 'data', 'chart_cache')
+# Derived per-character features, one directory per dataset version
+DEFAULT_FEATURE_STORE_DIR = os.path.join(project_root, 'data', 'feature_store')
+
+# Integer chart parameters and their allowed (min, max); width and height
+# are word cloud pixels, bounded so a request cannot allocate a huge image
+CHART_INT_PARAMS = {'top_n': (1, 100), 'width': (16, 2000), 'height': (16, 2000), 'max_words': (1, 1000)}
+
+MAX_COMPARE_CHARACTERS = 20
+
+MAX_SEARCH_RESULTS = 100
+
+MAX_CENTRALITY_RESULTS = 100
+
+NUMERIC_ATTRIBUTES = ['strength', 'speed', 'durability', 'intelligence', 'energy_projection', 'fighting_skills']
+
+# Weighted average (intelligence and strength have higher weight)
+ATTRIBUTE_WEIGHTS = {
+    'strength': 1.2,
+    'speed': 1.0,
+    'durability': 1.1,
+    'intelligence': 1.3,
+    'energy_projection': 1.1,
+    'fighting_skills': 0.9
+}
+
+
+class ServiceError(Exception):
+    """
+    Error raised by the service layer, carrying the HTTP status to return.
+    """
+
+    def __init__(self, message, status=500):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def get_power_category(power_level):
+    """Categorize power level into Low, Medium, or High."""
+    if power_level >= 8:
+        return "High"
+    elif power_level >= 5:
+        return "Medium"
+    else:
+        return "Low"
+
+
+class PowerVerseService:
+    """
+    Framework-independent core of the PowerVerse API.
+
+    Owns the dataset, the trained model and every cache, and implements the
+    logic behind each route. The Flask app (``src/api.py``) and the ASGI app
+    (``src/asgi.py``) are thin adapters over one shared instance.
+    """
+
+    def __init__(self, data_path=DEFAULT_DATA_PATH, storage_dir=DEFAULT_STORAGE_DIR,
+                 chart_cache_dir=DEFAULT_CHART_CACHE_DIR, snapshot_path=DEFAULT_SNAPSHOT_PATH,
+                 feature_store_dir=DEFAULT_FEATURE_STORE_DIR, batching=None, retrain_interval=None, min_r2=0.0,
+                 admin_token=None):
+        """
+        Initialize the service and load the dataset.
+
+        Parameters:
+        -----------
+        data_path : str
+            Path to the character CSV file
+        storage_dir : str
+            Directory where prediction requests are stored
+        chart_cache_dir : str
+            Directory where rendered charts are cached
+        snapshot_path : str, optional
+            Snapshot of the cleaned dataset, preferred over the CSV when it
+            exists and is not older than it
+        feature_store_dir : str
+            Directory where the derived features of each dataset version are
+            stored
+        batching : dict, optional
+            ``MicroBatcher`` settings (max_batch_size, max_wait_ms) for
+            model-backed power predictions
+        retrain_interval : float, optional
+            Seconds between scheduled background retrains
+        min_r2 : float, default=0.0
+            Lowest held-out R² a newly trained power model may have to be
+            served
+        admin_token : str, optional
+            Bearer token required to retrain or roll back the model; both
+            are refused when unset
+        """
+        self.data_path = data_path
+        self.snapshot_path = snapshot_path
+        self.storage_dir = storage_dir
+        os.makedirs(storage_dir, exist_ok=True)
+        self.prediction_store = PredictionStore(storage_dir)
+
+        self.df = pd.DataFrame()
+        self.dataset_hash = None
+        self.min_r2 = min_r2
+        self.admin_token = admin_token
+        self._training_data = None
+        # The power model trains in the background; requests never wait for it
+        self.model_manager = ModelManager(self._train_power_model, self._validate_power_model,
+                                          on_swap=self._on_model_swap, retrain_interval=retrain_interval)
+        self.chart_renderer = ChartRenderer(chart_cache_dir)
+        self.feature_store = FeatureStore(feature_store_dir)
+        # Concurrent model predictions share one vectorized call
+        self.prediction_batcher = MicroBatcher(self._predict_power_batch, **(batching or {}))
+        self.network_visualizer = MarvelNetworkVisualizer(self.df)
+        self.feature_matrix = None
+        self.name_index = None
+        self.powers_index = None
+
+        self.load()
+
+    @property
+    def power_predictor(self):
+        """The served power model (raises ``ModelNotReady`` before the first one)."""
+        return self.model_manager.get()
+
+    def load(self):
+        """
+        Load the dataset and build the derived caches, then train the power
+        model in the background.
+        """
+        df, from_snapshot = self._read_dataset()
+
+        # Derived columns shared by the model, the network and compare;
+        # only materialized when the dataset changed
+        features = None
+        if not df.empty:
+            try:
+                features = self.feature_store.get(df, tfidf=self._saved_tfidf(df) if from_snapshot else None)
+            except Exception as e:
+                print(f"Error materializing character features: {e}")
+
+        # Training data of the power model
+        training_data = None
+        if not df.empty:
+            try:
+                # Snapshots already carry the cleaned, labeled columns
+                if not from_snapshot:
+                    if features is not None and 'Hero/Villain' in df.columns:
+                        df = df.copy()
+                        df['Estimated_Power_Level'] = features.tier_labels('alignment_tier')
+                    else:
+                        df = MarvelDataProcessor(df=df).label_power_levels_from_alignment().get_processed_data()
+                training_data = (df, features.predictor_features() if features is not None else None)
+            except Exception as e:
+                print(f"Error preparing power predictor training data: {e}")
+
+        # Affiliation network; analytics are cached until the graph changes
+        network_visualizer = MarvelNetworkVisualizer(df)
+        if not df.empty:
+            try:
+                network_visualizer.create_affiliation_network(compute_layout=False)
+            except Exception as e:
+                print(f"Error building affiliation network: {e}")
+
+        # Per-character feature vectors used by compare
+        feature_matrix = None
+        if not df.empty:
+            try:
+                feature_matrix = CharacterFeatureMatrix.build(
+                    df, dict(network_visualizer.graph.degree()),
+                    tfidf=self._saved_tfidf(df) if from_snapshot and features is None else None,
+                    features=features,
+                )
+            except Exception as e:
+                print(f"Error building character feature matrix: {e}")
+
+        # Trigram index behind /api/search; rebuilt with every load
+        name_index = None
+        if not df.empty:
+            try:
+                name_index = NameIndex.build(df)
+            except Exception as e:
+                print(f"Error building name search index: {e}")
+
+        # BM25 index behind /api/powers/search
+        powers_index = None
+        if not df.empty and 'Powers' in df.columns:
+            try:
+                powers_index = PowersSearchIndex.from_dataframe(df)
+            except Exception as e:
+                print(f"Error building powers search index: {e}")
+
+        self.df = df
+        self.dataset_hash = dataset_fingerprint(df)
+        self.network_visualizer = network_visualizer
+        self.feature_matrix = feature_matrix
+        self.name_index = name_index
+        self.powers_index = powers_index
+        self._training_data = training_data
+
+        # Predicted power levels in compare appear once a model is served
+        if self.model_manager.ready:
+            self._on_model_swap(self.model_manager.current)
+        self.model_manager.start('load')
+
+        return self
+
+    # Power model lifecycle
+
+    def _train_power_model(self):
+        """
+        Train and compile a power model on the loaded dataset (runs in the
+        model manager's worker thread).
+        """
+        if self._training_data is None:
+            raise ValueError("No training data loaded.")
+        df, encoded = self._training_data
+
+        power_predictor = PowerPredictor()
+        metrics = power_predictor.train(df, encoded=encoded)
+        print(f"Power predictor model trained successfully. R² score: {metrics['r2']:.2f}")
+
+        # Serve from the flattened forest; the sklearn estimator is dropped
+        return power_predictor.compile(), metrics
+
+    def _validate_power_model(self, model, metrics):
+        """
+        Reject models whose held-out R² is below ``min_r2`` or whose
+        predictions are not finite.
+        """
+        if not np.isfinite(metrics.get('r2', np.nan)) or metrics['r2'] < self.min_r2:
+            raise ValueError(f"R² score {metrics.get('r2')} is below the minimum of {self.min_r2}.")
+        roles = [name[len('role_'):] for name in model.feature_names if name.startswith('role_')] or ['Hero']
+        tiers = ['Low', 'Medium', 'High']
+        predictions = model.predict_power_levels([role for role in roles for _ in tiers], tiers * len(roles))
+        if not np.all(np.isfinite(predictions)):
+            raise ValueError("Model produces non-finite predictions.")
+
+    def _on_model_swap(self, version):
+        """
+        Refresh the predicted power levels shown by compare.
+        """
+        feature_matrix = self.feature_matrix
+        if feature_matrix is not None and 'Hero/Villain' in self.df.columns:
+            try:
+                feature_matrix.predicted_power = np.asarray(version.model.predict(self.df), dtype=float)
+            except Exception as e:
+                print(f"Error predicting power levels for compare: {e}")
+
+    def model_status(self):
+        """Return readiness, the served and previous model versions and training counters."""
+        return self.model_manager.status()
+
+    def authorize_admin(self, authorization):
+        """
+        Check the ``Authorization: Bearer <token>`` header of a model
+        administration request.
+
+        Raises:
+        -------
+        ServiceError
+            403 if no admin token is configured, 401 if the header does not
+            carry it
+        """
+        if not self.admin_token:
+            raise ServiceError("Model administration is disabled; set POWERVERSE_ADMIN_TOKEN to enable it.", 403)
+        scheme, _, token = (authorization or '').partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(token.strip().encode('utf-8'),
+                                                                  self.admin_token.encode('utf-8')):
+            raise ServiceError("Missing or invalid admin token.", 401)
+
+    def retrain_model(self, authorization=None):
+        """
+        Queue a background retrain; the served model stays in place until a
+        new one is validated.
+
+        Parameters:
+        -----------
+        authorization : str, optional
+            Authorization header of the request (see ``authorize_admin``)
+        """
+        self.authorize_admin(authorization)
+        if self._training_data is None:
+            raise ServiceError("No data loaded.", 503)
+        queued = self.model_manager.request_training('request')
+        return dict(self.model_status(), queued=queued)
+
+    def rollback_model(self, authorization=None):
+        """
+        Serve the previous power model again.
+
+        Parameters:
+        -----------
+        authorization : str, optional
+            Authorization header of the request (see ``authorize_admin``)
+        """
+        self.authorize_admin(authorization)
+        try:
+            self.model_manager.rollback()
+        except ValueError as e:
+            raise ServiceError(str(e), 409)
+        return self.model_status()
+
+    def _read_dataset(self):
+        """
+        Read the cleaned dataset, preferring an up-to-date snapshot.
+
+        Returns:
+        --------
+        tuple
+            (DataFrame, True if it came from the snapshot)
+        """
+        if is_snapshot(self.snapshot_path):
+            try:
+                snapshot = open_snapshot(self.snapshot_path)
+                signature = snapshot.meta.get('source_signature')
+                if (signature is None or not os.path.exists(self.data_path)
+                        or signature == source_signature(self.data_path)):
+                    df = snapshot.to_dataframe(categorical='auto')
+                    print(f"Successfully loaded Marvel dataset snapshot with {len(df)} characters")
+                    return df, True
+                print(f"Snapshot at {self.snapshot_path} is older than {self.data_path}; reading the CSV instead")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Error opening snapshot at {self.snapshot_path}: {e}; reading the CSV instead")
+
+        try:
+            df = pd.read_csv(self.data_path)
+            # Basic data cleaning: fill NaN values with empty strings or appropriate defaults
+            df.fillna('', inplace=True)
+            print(f"Successfully loaded Marvel dataset with {len(df)} characters")
+        except FileNotFoundError:
+            print(f"Error: Could not find the dataset at {self.data_path}")
+            df = pd.DataFrame()  # Create an empty DataFrame if file not found
+        return df, False
+
+    def _saved_tfidf(self, df):
+        """
+        Return the TF-IDF matrix saved with the snapshot, if it matches.
+        """
+        path = os.path.join(self.snapshot_path, TFIDF_DIR)
+        if not is_tfidf(path):
+            return None
+        try:
+            tfidf = CompactTfidf.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error opening TF-IDF matrix at {path}: {e}; vectorizing instead")
+            return None
+        if tfidf.shape[0] != len(df) or tfidf.params.get('min_df') != 1:
+            return None
+        return tfidf
+
+    def _require_data(self):
+        if self.df.empty:
+            raise ServiceError("Character data not loaded or file not found.", 500)
+
+    # Characters
+
+    def characters(self):
+        """Return every character as a list of records."""
+        self._require_data()
+        # Convert DataFrame to a list of dictionaries (JSON serializable)
+        return self.df.to_dict(orient='records')
+
+    def characters_frame(self):
+        """Return the character DataFrame for streaming serialization."""
+        self._require_data()
+        return self.df
+
+    def status(self):
+        """Return backend connectivity information."""
+        return {
+            "status": "online",
+            "timestamp": datetime.datetime.now().isoformat(),
+            "dataLoaded": not self.df.empty,
+            "characterCount": len(self.df) if not self.df.empty else 0,
+            "ready": self.model_manager.ready,
+            "modelVersion": self.model_manager.current.version if self.model_manager.ready else None,
+            "modelState": self.model_manager.state
+        }
+
+    # Predictions
+
+    def predict_power(self, data):
+        """
+        Predict a power level from numeric attributes or the legacy
+        categorical payload.
+
+        Model predictions of concurrent requests are micro-batched into one
+        model call (see ``src/models/batching.py``).
+
+        Parameters:
+        -----------
+        data : dict
+            Request payload
+
+        Returns:
+        --------
+        dict
+            {"powerLevel": float, "powerCategory": str}
+        """
+        power_level, model_input = self._prediction_input(data)
+        if model_input is not None:
+            self._require_model()
+            try:
+                power_level = self.prediction_batcher.submit(model_input)
+            except FutureTimeoutError:
+                raise ServiceError("Prediction timed out waiting for the model; try again later.", 503)
+            except Exception as e:
+                raise ServiceError(f"Error predicting power level: {str(e)}", 500)
+        return self._prediction_result(power_level)
+
+    async def predict_power_async(self, data):
+        """
+        ``predict_power`` for async callers; waiting for the batch does not
+        hold a thread.
+        """
+        power_level, model_input = self._prediction_input(data)
+        if model_input is not None:
+            self._require_model()
+            try:
+                power_level = await self.prediction_batcher.submit_async(model_input)
+            except Exception as e:
+                raise ServiceError(f"Error predicting power level: {str(e)}", 500)
+        return self._prediction_result(power_level)
+
+    def _prediction_input(self, data):
+        """
+        Validate a prediction payload.
+
+        Returns:
+        --------
+        tuple
+            (power level, None) for numeric attributes, or
+            (None, (hero_villain, estimated_power_level)) when the model
+            has to be called
+        """
+        if not isinstance(data, dict):
+            raise ServiceError("Error predicting power level: expected a JSON object.", 400)
+
+        # Check if we have numerical attributes (new format)
+        if all(key in data for key in NUMERIC_ATTRIBUTES):
+            try:
+                # Calculate power level from numerical attributes
+                weighted_sum = sum(data.get(attr, 5) * ATTRIBUTE_WEIGHTS[attr] for attr in NUMERIC_ATTRIBUTES)
+                total_weight = sum(ATTRIBUTE_WEIGHTS.values())
+                power_level = (weighted_sum / total_weight)
+            except Exception as e:
+                raise ServiceError(f"Error predicting power level: {str(e)}", 500)
+
+            # Ensure power level is within 1-10 range
+            return max(1, min(10, power_level)), None
+
+        # Legacy format with categorical data, predicted by the trained model
+        return None, (data.get('heroVillain', 'Hero'), data.get('estimatedPowerLevel', 'Medium'))
+
+    def _require_model(self):
+        # Requests are answered 503 until the first model is validated
+        try:
+            self.model_manager.get()
+        except ModelNotReady as e:
+            raise ServiceError(str(e), 503)
+
+    def _predict_power_batch(self, items):
+        """
+        Predict the power levels of a batch of (hero_villain,
+        estimated_power_level) pairs in one model call.
+        """
+        hero_villains, estimated_power_levels = zip(*items)
+        return self.power_predictor.predict_power_levels(hero_villains, estimated_power_levels)
+
+    @staticmethod
+    def _prediction_result(power_level):
+        return {
+            "powerLevel": float(power_level),
+            "powerCategory": get_power_category(power_level)
+        }
+
+    def prediction_batching_stats(self):
+        """Return micro-batching metrics (batch sizes, queue waits)."""
+        return self.prediction_batcher.stats()
+
+    def store_fetched_data(self, data_source, data):
+        """Store fetched data with timestamp for future use"""
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"{data_source}_{timestamp}.json"
+        filepath = os.path.join(self.storage_dir, filename)
+
+        with open(filepath, 'w') as f:
+            json.dump(data, f, indent=2)
+
+        print(f"Stored fetched data from {data_source} at {filepath}")
+        return filepath
+
+    def store_prediction(self, data, result):
+        """Store a prediction request and its result."""
+        return self.store_fetched_data("power_prediction", {
+            "request": data,
+            "result": result,
+            "timestamp": datetime.datetime.now().isoformat()
+        })
+
+    def prediction_stats(self, args):
+        """
+        Aggregate the compacted prediction history.
+
+        Parameters:
+        -----------
+        args : mapping
+            Query parameters: start, end, category, bucket, bins and
+            <attribute>_min / <attribute>_max bounds
+
+        Returns:
+        --------
+        dict
+            Category counts, attribute histograms and time buckets
+        """
+        try:
+            ranges = {}
+            for name in STORED_ATTRIBUTES + ['power_level']:
+                low, high = args.get(f'{name}_min'), args.get(f'{name}_max')
+                if low is not None or high is not None:
+                    ranges[name] = (
+                        float(low) if low is not None else None,
+                        float(high) if high is not None else None,
+                    )
+            return self.prediction_store.stats(
+                start=args.get('start'),
+                end=args.get('end'),
+                category=args.get('category'),
+                ranges=ranges,
+                bucket=args.get('bucket', 'day'),
+                bins=int(args.get('bins', 10)),
+            )
+        except ValueError as e:
+            raise ServiceError(f"Invalid prediction stats query: {e}", 400)
+
+    # Charts
+
+    def list_charts(self):
+        """Return the charts that can be rendered."""
+        return {"charts": list(CHARTS), "formats": list(CHART_FORMATS)}
+
+    def render_chart(self, chart_name, fmt='png', params=None):
+        """
+        Render (or serve a cached) chart image.
+
+        Returns:
+        --------
+        tuple
+            (image bytes, mimetype)
+
+        Raises:
+        -------
+        ServiceError
+            404 for an unknown chart, 400 for an unsupported format or an
+            invalid parameter
+
+        Only the parameters the chart reads are kept, and each is checked
+        against a bounded set of values (role and affiliation must occur in
+        the dataset), so requests cannot grow the chart cache without bound.
+        """
+        self._require_data()
+        if chart_name not in CHARTS:
+            raise ServiceError(f"Unknown chart '{chart_name}'. Available charts: {', '.join(CHARTS)}", 404)
+        if fmt not in CHART_FORMATS:
+            raise ServiceError(f"Unsupported format '{fmt}'. Use one of: {', '.join(CHART_FORMATS)}", 400)
+        params = chart_params(chart_name, params)
+        for key, (low, high) in CHART_INT_PARAMS.items():
+            if key not in params:
+                continue
+            try:
+                params[key] = int(params[key])
+            except (TypeError, ValueError):
+                raise ServiceError(f"{key} must be an integer.", 400)
+            if not low <= params[key] <= high:
+                raise ServiceError(f"{key} must be between {low} and {high}.", 400)
+        for key, column in (('role', 'Role'), ('affiliation', 'Affiliation')):
+            if key in params and (column not in self.df.columns
+                                  or params[key] not in set(self.df[column].dropna().astype(str))):
+                raise ServiceError(f"Unknown {key} '{params[key]}'.", 400)
+        if 'background_color' in params:
+            if not is_color_like(params['background_color']):
+                raise ServiceError(f"Invalid background_color '{params['background_color']}'.", 400)
+            # One cache entry per color, however it is spelled
+            params['background_color'] = to_hex(params['background_color'])
+        try:
+            image = self.chart_renderer.render(self.df, chart_name, fmt, params, dataset_hash=self.dataset_hash)
+        except ValueError as e:
+            raise ServiceError(str(e), 400)
+        return image, CHART_FORMATS[fmt]
+
+    def render_charts(self, chart_names=None, fmt='png'):
+        """Pre-render the chart set in parallel."""
+        self._require_data()
+        if chart_names is not None:
+            if not isinstance(chart_names, list) or not all(isinstance(name, str) for name in chart_names):
+                raise ServiceError("charts must be a list of chart names.", 400)
+            unknown = [name for name in chart_names if name not in CHARTS]
+            if unknown:
+                raise ServiceError(f"Unknown charts: {', '.join(unknown)}. Available charts: {', '.join(CHARTS)}", 400)
+        if fmt not in CHART_FORMATS:
+            raise ServiceError(f"Unsupported format '{fmt}'. Use one of: {', '.join(CHART_FORMATS)}", 400)
+        try:
+            paths = self.chart_renderer.render_all(self.df, chart_names, fmt, dataset_hash=self.dataset_hash)
+        except ValueError as e:
+            raise ServiceError(str(e), 400)
+        return {"rendered": sorted(paths), "format": fmt}
+
+    # Network analytics
+
+    def network_summary(self):
+        """Return headline statistics of the affiliation network."""
+        return self.network_visualizer.analytics.summary()
+
+    def network_centrality(self, metric, top_n=10, approximate=None):
+        """Return a degree, betweenness or closeness ranking."""
+        if self.network_visualizer.graph.number_of_nodes() == 0:
+            raise ServiceError("Affiliation network is empty.", 500)
+        try:
+            top_n = int(top_n)
+        except (TypeError, ValueError):
+            raise ServiceError("top_n must be an integer.", 400)
+        if not 1 <= top_n <= MAX_CENTRALITY_RESULTS:
+            raise ServiceError(f"top_n must be between 1 and {MAX_CENTRALITY_RESULTS}.", 400)
+
+        analytics = self.network_visualizer.analytics
+        if metric == 'degree':
+            ranking = analytics.top_degree(top_n)
+        elif metric == 'betweenness':
+            ranking = analytics.betweenness(top_n, approximate=approximate)
+        elif metric == 'closeness':
+            ranking = analytics.closeness(top_n, approximate=approximate)
+        else:
+            raise ServiceError(f"Unknown centrality metric '{metric}'.", 404)
+
+        return {
+            "metric": metric,
+            "graphVersion": analytics.version,
+            "ranking": [{"character": name, "score": score} for name, score in ranking]
+        }
+
+    def network_components(self):
+        """Return the connected components of the network."""
+        components = self.network_visualizer.analytics.connected_components()
+        return {"count": len(components), "components": components}
+
+    def network_communities(self, method='louvain'):
+        """Return detected character communities."""
+        try:
+            communities = self.network_visualizer.analytics.communities(method)
+        except ValueError as e:
+            raise ServiceError(str(e), 400)
+        return {"method": method, "count": len(communities), "communities": communities}
+
+    # Comparison
+
+    def compare(self, names_arg):
+        """
+        Compare characters given a comma-separated list of names.
+        """
+        if self.feature_matrix is None:
+            raise ServiceError("Character data not loaded or file not found.", 500)
+
+        names = [name.strip() for name in (names_arg or '').split(',') if name.strip()]
+        if len(names) < 2:
+            raise ServiceError("Provide at least two comma-separated names.", 400)
+        if len(names) > MAX_COMPARE_CHARACTERS:
+            raise ServiceError(f"At most {MAX_COMPARE_CHARACTERS} characters can be compared.", 400)
+
+        try:
+            return self.feature_matrix.compare(names)
+        except KeyError as e:
+            raise ServiceError(e.args[0], 404)
+
+
+    # Search
+
+    def search(self, query, limit=10, mode='auto'):
+        """
+        Search character and real names, tolerating typos.
+        """
+        if self.name_index is None:
+            raise ServiceError("Character data not loaded or file not found.", 500)
+        if not query or not query.strip():
+            raise ServiceError("Provide a search query with ?q=.", 400)
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            raise ServiceError("limit must be an integer.", 400)
+        if not 1 <= limit <= MAX_SEARCH_RESULTS:
+            raise ServiceError(f"limit must be between 1 and {MAX_SEARCH_RESULTS}.", 400)
+
+        try:
+            results = self.name_index.search(query, limit=limit, mode=mode)
+        except ValueError as e:
+            raise ServiceError(str(e), 400)
+        return {"query": query, "mode": mode, "count": len(results), "results": results}
+
+    def search_powers(self, args):
+        """
+        Full-text search over powers, ranked with BM25.
+
+        Parameters:
+        -----------
+        args : mapping
+            Query parameters: q, role, affiliation, operator and limit
+
+        Returns:
+        --------
+        dict
+            The query and the ranked characters
+        """
+        if self.powers_index is None:
+            raise ServiceError("Character data not loaded or file not found.", 500)
+        query = args.get('q')
+        if not query or not query.strip():
+            raise ServiceError("Provide a search query with ?q=.", 400)
+        try:
+            limit = int(args.get('limit', 10))
+        except (TypeError, ValueError):
+            raise ServiceError("limit must be an integer.", 400)
+        if not 1 <= limit <= MAX_SEARCH_RESULTS:
+            raise ServiceError(f"limit must be between 1 and {MAX_SEARCH_RESULTS}.", 400)
+
+        try:
+            results = self.powers_index.search(
+                query,
+                role=args.get('role'),
+                affiliation=args.get('affiliation'),
+                operator=args.get('operator', 'or'),
+                limit=limit,
+            )
+        except ValueError as e:
+            raise ServiceError(str(e), 400)
+        return {"query": query, "count": len(results), "results": results}
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service():
+    """
+    Return the process-wide service instance, creating it on first use.
+
+    Both the Flask and the ASGI applications call this, so when they run in
+    the same process they share one dataset, model and set of caches. Paths
+    can be overridden with the POWERVERSE_DATA_PATH, POWERVERSE_STORAGE_DIR,
+    POWERVERSE_CHART_CACHE_DIR, POWERVERSE_SNAPSHOT_PATH and
+    POWERVERSE_FEATURE_STORE_DIR environment variables, prediction batching
+    with POWERVERSE_BATCH_MAX_SIZE and POWERVERSE_BATCH_WAIT_MS, and model
+    training with POWERVERSE_RETRAIN_INTERVAL, POWERVERSE_MIN_R2 and
+    POWERVERSE_ADMIN_TOKEN.
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = PowerVerseService(
+                data_path=os.environ.get('POWERVERSE_DATA_PATH', DEFAULT_DATA_PATH),
+                storage_dir=os.environ.get('POWERVERSE_STORAGE_DIR', DEFAULT_STORAGE_DIR),
+                chart_cache_dir=os.environ.get('POWERVERSE_CHART_CACHE_DIR', DEFAULT_CHART_CACHE_DIR),
+                snapshot_path=os.environ.get('POWERVERSE_SNAPSHOT_PATH', DEFAULT_SNAPSHOT_PATH),
+                feature_store_dir=os.environ.get('POWERVERSE_FEATURE_STORE_DIR', DEFAULT_FEATURE_STORE_DIR),
+                batching=batching_config_from_env(),
+                **manager_config_from_env(),
+            )
+    return _service
+
+
+def choose_format(format_arg, accept_header):
+    """
+    Pick a response format from an explicit ``?format=`` argument or, if
+    absent, the Accept header.
+    """
+    if format_arg:
+        if format_arg not in available_formats():
+            raise ServiceError(f"Unsupported format '{format_arg}'. Use one of: {', '.join(available_formats())}", 406)
+        return format_arg
+    return negotiate_format(accept_header)
+
+
+def parse_bool(value):
+    """Parse an optional boolean query parameter (None when absent)."""
+    if value is None:
+        return None
+    return value.lower() in ('1', 'true', 'yes')
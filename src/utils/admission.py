@@ -0,0 +1,238 @@
+import asyncio
+import contextlib
+import math
+import os
+import threading
+import time
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request is shed instead of admitted.
+    """
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def admission_config_from_env(requests_per_cpu=1):
+    """
+    Read admission control settings from the environment.
+
+    POWERVERSE_MAX_IN_FLIGHT   concurrent requests allowed (default: CPU count
+                               x ``requests_per_cpu``)
+    POWERVERSE_MAX_QUEUE       requests allowed to wait (default: 2x in-flight)
+    POWERVERSE_QUEUE_TIMEOUT   seconds a request may wait (default: 0.5)
+
+    Parameters:
+    -----------
+    requests_per_cpu : int, default=1
+        Requests one CPU serves at once; micro-batched predictions share
+        one model call per batch, so a CPU serves a whole batch
+
+    Returns:
+    --------
+    dict
+        Keyword arguments for the admission controllers
+    """
+    max_in_flight = int(os.environ.get('POWERVERSE_MAX_IN_FLIGHT', (os.cpu_count() or 4) * requests_per_cpu))
+    return {
+        'max_in_flight': max_in_flight,
+        'max_queue': int(os.environ.get('POWERVERSE_MAX_QUEUE', max_in_flight * 2)),
+        'queue_timeout': float(os.environ.get('POWERVERSE_QUEUE_TIMEOUT', 0.5)),
+    }
+
+
+class _AdmissionStats:
+    def __init__(self, max_in_flight, max_queue, queue_timeout):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1.")
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+
+    @property
+    def retry_after(self):
+        # Whole seconds, as required by the Retry-After header
+        return max(1, math.ceil(self.queue_timeout))
+
+    def _reject_full(self):
+        self.shed_queue_full += 1
+        return AdmissionRejected("Server is at capacity; request queue is full.", self.retry_after)
+
+    def _reject_timeout(self):
+        self.shed_timeout += 1
+        return AdmissionRejected("Server is at capacity; timed out waiting for a slot.", self.retry_after)
+
+    def stats(self):
+        """
+        Return a snapshot of the limiter's configuration and counters.
+        """
+        return {
+            'maxInFlight': self.max_in_flight,
+            'maxQueue': self.max_queue,
+            'queueTimeout': self.queue_timeout,
+            'inFlight': self.in_flight,
+            'waiting': self.waiting,
+            'admitted': self.admitted,
+            'queued': self.queued,
+            'shed': self.shed_queue_full + self.shed_timeout,
+            'shedQueueFull': self.shed_queue_full,
+            'shedTimeout': self.shed_timeout,
+        }
+
+
+class AdmissionController(_AdmissionStats):
+    """
+    Concurrency limiter for CPU-bound routes served from threads (Flask).
+
+    At most ``max_in_flight`` requests run at once. Up to ``max_queue`` more
+    wait for a slot for at most ``queue_timeout`` seconds; anything beyond
+    that is rejected immediately so callers can answer 503 with Retry-After
+    instead of letting latency grow for every request.
+    """
+
+    def __init__(self, max_in_flight=4, max_queue=8, queue_timeout=0.5):
+        """
+        Initialize the limiter.
+
+        Parameters:
+        -----------
+        max_in_flight : int, default=4
+            Requests allowed to run concurrently
+        max_queue : int, default=8
+            Requests allowed to wait for a slot
+        queue_timeout : float, default=0.5
+            Seconds a request may wait before it is shed
+        """
+        super().__init__(max_in_flight, max_queue, queue_timeout)
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Take a slot, waiting in the bounded queue if necessary.
+
+        Raises:
+        -------
+        AdmissionRejected
+            If the queue is full or the wait deadline passes
+        """
+        with self._condition:
+            if self.in_flight < self.max_in_flight and self.waiting == 0:
+                self.in_flight += 1
+                self.admitted += 1
+                return
+            if self.waiting >= self.max_queue:
+                raise self._reject_full()
+
+            self.waiting += 1
+            self.queued += 1
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self.in_flight >= self.max_in_flight:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._reject_timeout()
+                    self._condition.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+            self.admitted += 1
+
+    def release(self):
+        """
+        Return a slot and wake one waiting request.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    @contextlib.contextmanager
+    def slot(self):
+        """
+        Context manager holding a slot for the duration of the block.
+        """
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class AsyncAdmissionController(_AdmissionStats):
+    """
+    Concurrency limiter for async handlers (ASGI).
+
+    Same policy and counters as ``AdmissionController``, built on asyncio
+    primitives so waiting requests never block the event loop.
+    """
+
+    def __init__(self, max_in_flight=4, max_queue=8, queue_timeout=0.5):
+        super().__init__(max_in_flight, max_queue, queue_timeout)
+        self._condition = None
+
+    def _get_condition(self):
+        # Created lazily so it binds to the running event loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self):
+        """
+        Take a slot, waiting in the bounded queue if necessary.
+
+        Raises:
+        -------
+        AdmissionRejected
+            If the queue is full or the wait deadline passes
+        """
+        condition = self._get_condition()
+        async with condition:
+            if self.in_flight < self.max_in_flight and self.waiting == 0:
+                self.in_flight += 1
+                self.admitted += 1
+                return
+            if self.waiting >= self.max_queue:
+                raise self._reject_full()
+
+            self.waiting += 1
+            self.queued += 1
+            try:
+                await asyncio.wait_for(
+                    condition.wait_for(lambda: self.in_flight < self.max_in_flight),
+                    self.queue_timeout
+                )
+            except asyncio.TimeoutError:
+                raise self._reject_timeout() from None
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+            self.admitted += 1
+
+    async def release(self):
+        """
+        Return a slot and wake one waiting request.
+        """
+        condition = self._get_condition()
+        async with condition:
+            self.in_flight -= 1
+            condition.notify()
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """
+        Async context manager holding a slot for the duration of the block.
+        """
+        await self.acquire()
+        try:
+            yield
+        finally:
+            await self.release()
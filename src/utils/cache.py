@@ -0,0 +1,77 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+
+def dataset_fingerprint(df):
+    """
+    Compute a content hash of a DataFrame.
+
+    The hash covers column names, dtypes and every cell value, so any edit
+    to the dataset produces a different fingerprint.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        DataFrame to fingerprint
+
+    Returns:
+    --------
+    str
+        Hex digest identifying the dataset contents
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(col) for col in df.columns]).encode('utf-8'))
+    digest.update(json.dumps([str(dtype) for dtype in df.dtypes]).encode('utf-8'))
+    if len(df) > 0:
+        row_hashes = pd.util.hash_pandas_object(df, index=False).values
+        digest.update(row_hashes.tobytes())
+    return digest.hexdigest()
+
+
+def cache_key(*parts):
+    """
+    Build a stable cache key from JSON-serializable parts.
+
+    Parameters:
+    -----------
+    *parts : object
+        Values that identify a cached artifact (dataset hash, parameters, ...)
+
+    Returns:
+    --------
+    str
+        Hex digest of the serialized parts
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def atomic_write_bytes(path, data):
+    """
+    Write bytes to a file atomically.
+
+    The data is written to a temporary file in the same directory and then
+    moved into place, so readers never observe a partially written file.
+
+    Parameters:
+    -----------
+    path : str
+        Destination file path
+    data : bytes
+        Content to write
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
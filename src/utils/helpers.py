@@ -32,15 +32,15 @@ def load_marvel_data(data_path):
     """
     return pd.read_csv(data_path)
 
-def create_power_wordcloud(powers_text, width=800, height=400, background_color='white', 
+def create_power_wordcloud(powers_text=None, width=800, height=400, background_color='white', 
                           max_words=100, contour_width=3, contour_color='steelblue',
-                          save_path=None):
+                          save_path=None, show=True, frequencies=None):
     """
     Create a word cloud visualization of character powers.
     
     Parameters:
     -----------
-    powers_text : str
+    powers_text : str, optional
         Text containing all powers to visualize
     width : int, default=800
         Width of the word cloud image
@@ -56,6 +56,12 @@ def create_power_wordcloud(powers_text, width=800, height=400, background_color=
         Color of the contour line
     save_path : str, optional
         Path to save the word cloud image
+    show : bool, default=True
+        Display the figure; pass False in scripts and servers
+    frequencies : dict, optional
+        Precomputed term frequencies (e.g. from
+        ``PowerTermCounter.frequencies``); used instead of ``powers_text``
+        so the text does not have to be concatenated and re-tokenized
     
     Returns:
     --------
@@ -69,7 +75,13 @@ def create_power_wordcloud(powers_text, width=800, height=400, background_color=
         max_words=max_words, 
         contour_width=contour_width, 
         contour_color=contour_color
-    ).generate(powers_text)
+    )
+    if frequencies is not None:
+        wordcloud.generate_from_frequencies(frequencies)
+    elif powers_text is not None:
+        wordcloud.generate(powers_text)
+    else:
+        raise ValueError("Either powers_text or frequencies must be provided.")
     
     plt.figure(figsize=(width/100, height/100))
     plt.imshow(wordcloud, interpolation='bilinear')
@@ -80,11 +92,14 @@ def create_power_wordcloud(powers_text, width=800, height=400, background_color=
         plt.savefig(save_path, dpi=300, bbox_inches='tight')
         print(f"Word cloud saved to {save_path}")
     
-    plt.show()
+    if show:
+        plt.show()
+    else:
+        plt.close()
     
     return wordcloud
 
-def plot_role_distribution(df, figsize=(10, 6), save_path=None):
+def plot_role_distribution(df, figsize=(10, 6), save_path=None, show=True):
     """
     Plot the distribution of character roles.
     
@@ -96,6 +111,8 @@ def plot_role_distribution(df, figsize=(10, 6), save_path=None):
         Figure size (width, height) in inches
     save_path : str, optional
         Path to save the plot image
+    show : bool, default=True
+        Display the figures; pass False in scripts and servers
     """
     plt.figure(figsize=figsize)
     role_counts = df['Role'].value_counts()
@@ -111,7 +128,10 @@ def plot_role_distribution(df, figsize=(10, 6), save_path=None):
         plt.savefig(save_path, dpi=300, bbox_inches='tight')
         print(f"Role distribution plot saved to {save_path}")
     
-    plt.show()
+    if show:
+        plt.show()
+    else:
+        plt.close()
     
     # Pie chart
     plt.figure(figsize=(8, 8))
@@ -130,9 +150,12 @@ def plot_role_distribution(df, figsize=(10, 6), save_path=None):
         plt.savefig(pie_save_path, dpi=300, bbox_inches='tight')
         print(f"Role pie chart saved to {pie_save_path}")
     
-    plt.show()
+    if show:
+        plt.show()
+    else:
+        plt.close()
 
-def plot_affiliation_distribution(df, top_n=10, figsize=(12, 8), save_path=None):
+def plot_affiliation_distribution(df, top_n=10, figsize=(12, 8), save_path=None, show=True):
     """
     Plot the distribution of character affiliations.
     
@@ -146,6 +169,8 @@ def plot_affiliation_distribution(df, top_n=10, figsize=(12, 8), save_path=None)
         Figure size (width, height) in inches
     save_path : str, optional
         Path to save the plot image
+    show : bool, default=True
+        Display the figures; pass False in scripts and servers
     """
     plt.figure(figsize=figsize)
     affiliation_counts = df['Affiliation'].value_counts().head(top_n)
@@ -159,9 +184,12 @@ def plot_affiliation_distribution(df, top_n=10, figsize=(12, 8), save_path=None)
         plt.savefig(save_path, dpi=300, bbox_inches='tight')
         print(f"Affiliation distribution plot saved to {save_path}")
     
-    plt.show()
+    if show:
+        plt.show()
+    else:
+        plt.close()
 
-def plot_power_level_distribution(df, figsize=(10, 6), save_path=None):
+def plot_power_level_distribution(df, figsize=(10, 6), save_path=None, show=True):
     """
     Plot the distribution of character power levels.
     
@@ -173,6 +201,8 @@ def plot_power_level_distribution(df, figsize=(10, 6), save_path=None):
         Figure size (width, height) in inches
     save_path : str, optional
         Path to save the plot image
+    show : bool, default=True
+        Display the figures; pass False in scripts and servers
     """
     power_level_col = 'Estimated_Power_Level' if 'Estimated_Power_Level' in df.columns else 'Power Level'
     
@@ -188,7 +218,10 @@ def plot_power_level_distribution(df, figsize=(10, 6), save_path=None):
         plt.savefig(save_path, dpi=300, bbox_inches='tight')
         print(f"Power level distribution plot saved to {save_path}")
     
-    plt.show()
+    if show:
+        plt.show()
+    else:
+        plt.close()
     
     # Compare power levels across roles
     plt.figure(figsize=(12, 8))
@@ -204,4 +237,7 @@ def plot_power_level_distribution(df, figsize=(10, 6), save_path=None):
         plt.savefig(role_power_save_path, dpi=300, bbox_inches='tight')
         print(f"Power level by role plot saved to {role_power_save_path}")
     
-    plt.show()
\ No newline at end of file
+    if show:
+        plt.show()
+    else:
+        plt.close()
\ No newline at end of file
@@ -0,0 +1,377 @@
+import argparse
+import datetime
+import glob
+import io
+import json
+import os
+import uuid
+
+import numpy as np
+
+from src.utils.cache import atomic_write_bytes
+
+# Raw prediction files written by PowerVerseService.store_prediction
+PREDICTION_FILE_PATTERN = 'power_prediction_*.json'
+COMPACTED_DIR = 'compacted'
+MANIFEST_FILE = 'manifest.json'
+
+ATTRIBUTES = ['strength', 'speed', 'durability', 'intelligence', 'energy_projection', 'fighting_skills']
+CATEGORIES = ['Low', 'Medium', 'High']
+
+# Time bucket widths in microseconds
+TIME_BUCKETS = {
+    'hour': 3600 * 10**6,
+    'day': 86400 * 10**6,
+    'week': 7 * 86400 * 10**6,
+}
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def to_micros(value):
+    """
+    Convert a naive datetime or ISO string to microseconds since the epoch.
+    """
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.replace(tzinfo=None)
+    return (value - _EPOCH) // datetime.timedelta(microseconds=1)
+
+
+def from_micros(micros):
+    """
+    Convert microseconds since the epoch back to an ISO timestamp.
+    """
+    return (_EPOCH + datetime.timedelta(microseconds=int(micros))).isoformat()
+
+
+def _parse_prediction(record):
+    # One row: timestamp, attribute values (NaN for legacy payloads), level, category
+    request = record.get('request') if isinstance(record.get('request'), dict) else {}
+    result = record.get('result') or {}
+
+    attributes = []
+    for attr in ATTRIBUTES:
+        try:
+            attributes.append(float(request[attr]))
+        except (KeyError, TypeError, ValueError):
+            attributes.append(np.nan)
+
+    category = result.get('powerCategory')
+    return (
+        to_micros(record['timestamp']),
+        attributes,
+        float(result.get('powerLevel', np.nan)),
+        CATEGORIES.index(category) if category in CATEGORIES else -1,
+    )
+
+
+def _zone_map(columns):
+    # Per-partition statistics used to skip partitions without reading them
+    zone = {
+        'rows': int(len(columns['timestamp'])),
+        'minTimestamp': int(columns['timestamp'].min()),
+        'maxTimestamp': int(columns['timestamp'].max()),
+        'categoryCounts': np.bincount(columns['category'][columns['category'] >= 0],
+                                      minlength=len(CATEGORIES)).tolist(),
+        'ranges': {},
+    }
+    for name in ATTRIBUTES + ['power_level']:
+        values = columns[name][~np.isnan(columns[name])]
+        zone['ranges'][name] = [float(values.min()), float(values.max())] if len(values) else None
+    return zone
+
+
+class PredictionStore:
+    """
+    Columnar store for the prediction history in the storage directory.
+
+    ``compact`` folds the one-file-per-request JSON history into day
+    partitions (``compacted/day=YYYY-MM-DD/part-*.npz``, one array per
+    column) described by ``compacted/manifest.json``. The manifest keeps a
+    zone map per partition (row count, time range, category counts and
+    attribute ranges), so ``stats`` skips partitions that cannot match a
+    query and only loads the columns it needs from the rest.
+    """
+
+    def __init__(self, storage_dir):
+        """
+        Initialize the store.
+
+        Parameters:
+        -----------
+        storage_dir : str
+            Directory holding the raw prediction files
+        """
+        self.storage_dir = storage_dir
+        self.compacted_dir = os.path.join(storage_dir, COMPACTED_DIR)
+        self.manifest_path = os.path.join(self.compacted_dir, MANIFEST_FILE)
+        self._manifest = None
+        self._manifest_mtime = None
+
+    def manifest(self):
+        """
+        Return the manifest, re-reading it when another process has compacted.
+        """
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return {'partitions': [], 'pendingDeletes': [], 'retained': []}
+        if self._manifest is None or mtime != self._manifest_mtime:
+            with open(self.manifest_path) as f:
+                self._manifest = json.load(f)
+            self._manifest_mtime = mtime
+        return self._manifest
+
+    def _finish_pending_deletes(self, manifest):
+        # Originals already recorded in the manifest by an interrupted run
+        removed = 0
+        for name in manifest.get('pendingDeletes', []):
+            try:
+                os.remove(os.path.join(self.storage_dir, name))
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def compact(self, delete_originals=True):
+        """
+        Merge raw prediction files into day partitions.
+
+        The manifest is the commit point: partitions are written first, then
+        the manifest naming them and the originals they replace is swapped in
+        atomically, and only then are the originals deleted. An interrupted
+        run therefore never loses or double-counts a prediction; the next run
+        finishes the pending deletes.
+
+        Parameters:
+        -----------
+        delete_originals : bool, default=True
+            Remove the raw JSON files once they are compacted
+
+        Returns:
+        --------
+        dict
+            Number of files compacted, skipped and deleted, and partitions written
+        """
+        manifest = self.manifest()
+        # Files already folded into a partition must not be counted twice
+        done = set(manifest.get('pendingDeletes', [])) | set(manifest.get('retained', []))
+        if delete_originals:
+            self._finish_pending_deletes(manifest)
+
+        rows_by_day = {}
+        sources = []
+        skipped = []
+        for path in sorted(glob.glob(os.path.join(self.storage_dir, PREDICTION_FILE_PATTERN))):
+            name = os.path.basename(path)
+            if name in done:
+                continue
+            try:
+                with open(path) as f:
+                    row = _parse_prediction(json.load(f))
+            except (OSError, ValueError, KeyError, TypeError, AttributeError):
+                # Unreadable or still being written; leave it for the next run
+                skipped.append(name)
+                continue
+            day = from_micros(row[0])[:10]
+            rows_by_day.setdefault(day, []).append(row)
+            sources.append(name)
+
+        partitions = list(manifest.get('partitions', []))
+        written = []
+        for day, rows in sorted(rows_by_day.items()):
+            rows.sort(key=lambda row: row[0])
+            columns = {
+                'timestamp': np.array([row[0] for row in rows], dtype=np.int64),
+                'power_level': np.array([row[2] for row in rows], dtype=np.float64),
+                'category': np.array([row[3] for row in rows], dtype=np.int8),
+            }
+            attributes = np.array([row[1] for row in rows], dtype=np.float64).reshape(len(rows), len(ATTRIBUTES))
+            for i, attr in enumerate(ATTRIBUTES):
+                columns[attr] = attributes[:, i]
+
+            relative_path = os.path.join(f'day={day}', f'part-{uuid.uuid4().hex[:12]}.npz')
+            buffer = io.BytesIO()
+            np.savez(buffer, **columns)
+            atomic_write_bytes(os.path.join(self.compacted_dir, relative_path), buffer.getvalue())
+
+            entry = {'path': relative_path, 'day': day}
+            entry.update(_zone_map(columns))
+            partitions.append(entry)
+            written.append(relative_path)
+
+        if sources:
+            # Deletes an interrupted run still owes stay owed (and skipped by
+            # later runs) until they are done, even in a keep-originals run
+            owed = [name for name in manifest.get('pendingDeletes', [])
+                    if os.path.exists(os.path.join(self.storage_dir, name))]
+            new_manifest = {
+                'partitions': partitions,
+                'pendingDeletes': owed + (sources if delete_originals else []),
+                'retained': manifest.get('retained', []) + ([] if delete_originals else sources),
+                'updatedAt': datetime.datetime.now().isoformat(),
+            }
+            atomic_write_bytes(self.manifest_path, json.dumps(new_manifest, indent=2).encode('utf-8'))
+            self._manifest = None
+
+        deleted = 0
+        if delete_originals and sources:
+            deleted = self._finish_pending_deletes(self.manifest())
+
+        return {
+            'compacted': len(sources),
+            'skipped': skipped,
+            'deleted': deleted,
+            'partitionsWritten': written,
+        }
+
+    @staticmethod
+    def _partition_may_match(partition, start, end, category, ranges):
+        if start is not None and partition['maxTimestamp'] < start:
+            return False
+        if end is not None and partition['minTimestamp'] >= end:
+            return False
+        if category is not None and partition['categoryCounts'][category] == 0:
+            return False
+        for name, (low, high) in ranges.items():
+            zone = partition['ranges'].get(name)
+            if zone is None:
+                return False
+            if low is not None and zone[1] < low:
+                return False
+            if high is not None and zone[0] > high:
+                return False
+        return True
+
+    def stats(self, start=None, end=None, category=None, ranges=None, bucket='day', bins=10):
+        """
+        Aggregate the compacted history.
+
+        Parameters:
+        -----------
+        start, end : str or datetime, optional
+            Half-open time range [start, end)
+        category : str, optional
+            Only count predictions in this power category
+        ranges : dict, optional
+            Attribute -> (min, max) inclusive bounds; either bound may be None
+        bucket : str, default='day'
+            Time bucket width: 'hour', 'day' or 'week'
+        bins : int, default=10
+            Histogram bins per attribute
+
+        Returns:
+        --------
+        dict
+            Category counts, attribute histograms and time buckets
+        """
+        if bucket not in TIME_BUCKETS:
+            raise ValueError(f"Unknown time bucket '{bucket}'. Expected one of {list(TIME_BUCKETS)}.")
+        if category is not None and category not in CATEGORIES:
+            raise ValueError(f"Unknown category '{category}'. Expected one of {CATEGORIES}.")
+        if bins < 1:
+            raise ValueError("bins must be at least 1.")
+        ranges = ranges or {}
+        for name in ranges:
+            if name not in ATTRIBUTES + ['power_level']:
+                raise ValueError(f"Unknown attribute '{name}'.")
+
+        start = to_micros(start) if start is not None else None
+        end = to_micros(end) if end is not None else None
+        category_code = CATEGORIES.index(category) if category is not None else None
+
+        partitions = self.manifest()['partitions']
+        selected = [p for p in partitions if self._partition_may_match(p, start, end, category_code, ranges)]
+
+        # Shared histogram edges from the zone maps, so partitions add up
+        histogram_columns = ATTRIBUTES + ['power_level']
+        edges = {}
+        for name in histogram_columns:
+            zones = [p['ranges'][name] for p in selected if p['ranges'].get(name) is not None]
+            if zones:
+                low, high = min(z[0] for z in zones), max(z[1] for z in zones)
+                edges[name] = np.linspace(low, high if high > low else low + 1, bins + 1)
+
+        category_counts = np.zeros(len(CATEGORIES), dtype=np.int64)
+        histograms = {name: np.zeros(bins, dtype=np.int64) for name in edges}
+        sums = dict.fromkeys(edges, 0.0)
+        time_buckets = {}
+        total = 0
+
+        # Only the columns the query touches are read from each partition
+        for partition in selected:
+            with np.load(os.path.join(self.compacted_dir, partition['path'])) as data:
+                timestamps = data['timestamp']
+                mask = np.ones(len(timestamps), dtype=bool)
+                if start is not None:
+                    mask &= timestamps >= start
+                if end is not None:
+                    mask &= timestamps < end
+                categories = data['category']
+                if category_code is not None:
+                    mask &= categories == category_code
+                for name, (low, high) in ranges.items():
+                    values = data[name]
+                    if low is not None:
+                        mask &= values >= low
+                    if high is not None:
+                        mask &= values <= high
+
+                if not mask.any():
+                    continue
+                total += int(mask.sum())
+                category_counts += np.bincount(categories[mask][categories[mask] >= 0],
+                                               minlength=len(CATEGORIES))
+
+                bucket_ids, counts = np.unique(timestamps[mask] // TIME_BUCKETS[bucket], return_counts=True)
+                for bucket_id, count in zip(bucket_ids.tolist(), counts.tolist()):
+                    time_buckets[bucket_id] = time_buckets.get(bucket_id, 0) + count
+
+                for name in edges:
+                    values = data[name][mask]
+                    values = values[~np.isnan(values)]
+                    histograms[name] += np.histogram(values, bins=edges[name])[0]
+                    sums[name] += float(values.sum())
+
+        return {
+            'count': total,
+            'categories': dict(zip(CATEGORIES, category_counts.tolist())),
+            'histograms': {
+                name: {
+                    'edges': edges[name].tolist(),
+                    'counts': histograms[name].tolist(),
+                    'mean': sums[name] / int(histograms[name].sum()) if histograms[name].sum() else None,
+                }
+                for name in edges
+            },
+            'timeBuckets': [
+                {'start': from_micros(bucket_id * TIME_BUCKETS[bucket]), 'count': count}
+                for bucket_id, count in sorted(time_buckets.items())
+            ],
+            'bucket': bucket,
+            'partitionsScanned': len(selected),
+            'partitionsSkipped': len(partitions) - len(selected),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compact or query the stored prediction history')
+    parser.add_argument('command', choices=['compact', 'stats'])
+    parser.add_argument('--storage-dir', default=os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'fetched_data'))
+    parser.add_argument('--keep-originals', action='store_true', help='Do not delete compacted JSON files')
+    args = parser.parse_args()
+
+    store = PredictionStore(args.storage_dir)
+    if args.command == 'compact':
+        summary = store.compact(delete_originals=not args.keep_originals)
+        print(f"Compacted {summary['compacted']} predictions into {len(summary['partitionsWritten'])} "
+              f"partitions; deleted {summary['deleted']} files, skipped {len(summary['skipped'])}")
+    else:
+        print(json.dumps(store.stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
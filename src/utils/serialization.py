@@ -0,0 +1,239 @@
+import json
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional fast encoder
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional binary format
+    msgpack = None
+
+# Response formats -> media type
+MEDIA_TYPES = {
+    'json': 'application/json',
+    'columnar': 'application/vnd.powerverse.columnar+json',
+    'msgpack': 'application/msgpack',
+}
+
+# Accepted media types -> response format
+_ACCEPT_ALIASES = {
+    'application/json': 'json',
+    'application/*': 'json',
+    '*/*': 'json',
+    'application/vnd.powerverse.columnar+json': 'columnar',
+    'application/msgpack': 'msgpack',
+    'application/x-msgpack': 'msgpack',
+    'application/vnd.msgpack': 'msgpack',
+}
+
+# Rows encoded per streamed chunk
+DEFAULT_CHUNK_ROWS = 5000
+
+
+def dumps(obj):
+    """
+    Encode an object as JSON bytes using the fastest available encoder.
+
+    Parameters:
+    -----------
+    obj : object
+        JSON-serializable object (numpy scalars and arrays are supported)
+
+    Returns:
+    --------
+    bytes
+        UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_json_default, ensure_ascii=False).encode('utf-8')
+
+
+def _json_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def available_formats():
+    """
+    Return the response formats supported in this environment.
+    """
+    formats = ['json', 'columnar']
+    if msgpack is not None:
+        formats.append('msgpack')
+    return formats
+
+
+def negotiate_format(accept_header, default='json'):
+    """
+    Pick a response format from an HTTP Accept header.
+
+    Parameters:
+    -----------
+    accept_header : str or None
+        Value of the Accept header
+    default : str, default='json'
+        Format used when the header is missing or nothing matches
+
+    Returns:
+    --------
+    str
+        One of 'json', 'columnar' or 'msgpack'
+    """
+    if not accept_header:
+        return default
+
+    candidates = []
+    for position, part in enumerate(accept_header.split(',')):
+        fields = [field.strip() for field in part.split(';')]
+        media_type = fields[0].lower()
+        quality = 1.0
+        for param in fields[1:]:
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        fmt = _ACCEPT_ALIASES.get(media_type)
+        if fmt is not None and quality > 0 and fmt in available_formats():
+            # Highest quality wins; ties go to the earliest listed type
+            candidates.append((-quality, position, fmt))
+
+    if not candidates:
+        return default
+    return min(candidates)[2]
+
+
+def _column_values(series):
+    # Native Python values for object columns, numpy arrays otherwise
+    if series.dtype.kind in 'biuf':
+        values = series.to_numpy()
+        if series.dtype.kind == 'f' and np.isnan(values).any():
+            return [None if np.isnan(v) else float(v) for v in values]
+        return values
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def iter_json_records(df, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Stream a DataFrame as a JSON array of row objects.
+
+    Each chunk is encoded column-wise by pandas' C encoder, so no Python dict
+    is created per row and the full document never exists in memory.
+
+    Yields:
+    -------
+    bytes
+        Consecutive pieces of the JSON document
+    """
+    yield b'['
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        encoded = chunk.to_json(orient='records', double_precision=15, force_ascii=False)
+        if start > 0:
+            yield b','
+        # Drop the chunk's own brackets so chunks join into one array
+        yield encoded[1:-1].encode('utf-8')
+    yield b']'
+
+
+def iter_columnar_json(df, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Stream a DataFrame as columnar JSON:
+    ``{"columns": [...], "rowCount": n, "data": {"col": [values...], ...}}``
+
+    Column arrays are far smaller than row objects because keys are written
+    once, and numeric columns are encoded straight from numpy buffers.
+
+    Yields:
+    -------
+    bytes
+        Consecutive pieces of the JSON document
+    """
+    columns = [str(col) for col in df.columns]
+    yield b'{"columns":' + dumps(columns) + b',"rowCount":' + str(len(df)).encode('ascii') + b',"data":{'
+    for position, col in enumerate(df.columns):
+        if position > 0:
+            yield b','
+        yield dumps(str(col)) + b':['
+        for start in range(0, len(df), chunk_rows):
+            values = _column_values(df[col].iloc[start:start + chunk_rows])
+            encoded = dumps(values)
+            if start > 0:
+                yield b','
+            yield encoded[1:-1]
+        yield b']'
+    yield b'}}'
+
+
+def iter_msgpack_records(df, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Stream a DataFrame as a MessagePack array of row maps.
+
+    Rows are packed straight from per-column value lists, so no intermediate
+    dict is built per row.
+
+    Yields:
+    -------
+    bytes
+        Consecutive pieces of the MessagePack document
+    """
+    if msgpack is None:
+        raise RuntimeError("MessagePack support requires the 'msgpack' package.")
+
+    packer = msgpack.Packer()
+    columns = [str(col) for col in df.columns]
+    packed_keys = [packer.pack(col) for col in columns]
+
+    yield packer.pack_array_header(len(df))
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        column_values = [_column_values(chunk[col]) for col in chunk.columns]
+        column_values = [v.tolist() if isinstance(v, np.ndarray) else v for v in column_values]
+        parts = []
+        map_header = packer.pack_map_header(len(columns))
+        for row in zip(*column_values):
+            parts.append(map_header)
+            for key, value in zip(packed_keys, row):
+                parts.append(key)
+                parts.append(packer.pack(value))
+        yield b''.join(parts)
+
+
+def iter_frame(df, fmt, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Stream a DataFrame in the requested format.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        Data to encode
+    fmt : str
+        'json', 'columnar' or 'msgpack'
+    chunk_rows : int
+        Rows encoded per chunk
+
+    Returns:
+    --------
+    iterator of bytes
+        Encoded document pieces
+    """
+    if fmt == 'columnar':
+        return iter_columnar_json(df, chunk_rows)
+    if fmt == 'msgpack':
+        return iter_msgpack_records(df, chunk_rows)
+    return iter_json_records(df, chunk_rows)
+
+
+def encode_frame(df, fmt='json'):
+    """
+    Encode a whole DataFrame in the requested format.
+    """
+    return b''.join(iter_frame(df, fmt))
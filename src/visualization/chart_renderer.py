@@ -0,0 +1,371 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from matplotlib.figure import Figure
+
+from src.preprocessing.power_terms import PowerTermCounter
+from src.utils.cache import atomic_write_bytes, cache_key, dataset_fingerprint
+
+# Bump when the drawing code changes so stale cached images are not served
+RENDERER_VERSION = 2
+
+CHART_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+
+def compute_chart_aggregates(df):
+    """
+    Compute every aggregate needed by the chart set in a single pass.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        DataFrame containing Marvel character data
+
+    Returns:
+    --------
+    dict
+        Small, picklable aggregates (counts and crosstabs) keyed by name
+    """
+    power_level_col = 'Estimated_Power_Level' if 'Estimated_Power_Level' in df.columns else 'Power Level'
+
+    aggregates = {
+        'role_counts': df['Role'].value_counts() if 'Role' in df.columns else pd.Series(dtype=int),
+        'affiliation_counts': df['Affiliation'].value_counts() if 'Affiliation' in df.columns else pd.Series(dtype=int),
+        'power_level_counts': pd.Series(dtype=int),
+        'role_power_counts': pd.DataFrame(),
+        'power_terms': {'totals': {}, 'by_role': {}, 'by_affiliation': {}, 'by_role_affiliation': {}},
+    }
+
+    if power_level_col in df.columns:
+        aggregates['power_level_counts'] = df[power_level_col].value_counts().sort_index()
+        if 'Role' in df.columns:
+            aggregates['role_power_counts'] = pd.crosstab(df['Role'], df[power_level_col])
+
+    if 'Powers' in df.columns and 'Character' in df.columns:
+        aggregates['power_terms'] = PowerTermCounter.from_dataframe(df).tables()
+
+    return aggregates
+
+
+def _draw_role_distribution(fig, aggregates, params):
+    import seaborn as sns
+
+    ax = fig.subplots()
+    role_counts = aggregates['role_counts']
+    sns.barplot(x=role_counts.index, y=role_counts.values, ax=ax)
+    ax.set_title('Distribution of Character Roles', fontsize=16)
+    ax.set_xlabel('Role')
+    ax.set_ylabel('Count')
+
+
+def _draw_role_pie(fig, aggregates, params):
+    import seaborn as sns
+
+    ax = fig.subplots()
+    role_counts = aggregates['role_counts']
+    ax.pie(
+        role_counts,
+        labels=role_counts.index,
+        autopct='%1.1f%%',
+        startangle=90,
+        colors=sns.color_palette('viridis', len(role_counts))
+    )
+    ax.set_title('Proportion of Character Roles', fontsize=16)
+    ax.axis('equal')
+
+
+def _draw_affiliation_distribution(fig, aggregates, params):
+    import seaborn as sns
+
+    top_n = int(params.get('top_n', 10))
+    ax = fig.subplots()
+    affiliation_counts = aggregates['affiliation_counts'].head(top_n)
+    sns.barplot(x=affiliation_counts.values, y=affiliation_counts.index, ax=ax)
+    ax.set_title(f'Top {top_n} Character Affiliations', fontsize=16)
+    ax.set_xlabel('Count')
+    ax.set_ylabel('Affiliation')
+
+
+def _draw_power_level_distribution(fig, aggregates, params):
+    import seaborn as sns
+
+    ax = fig.subplots()
+    power_level_counts = aggregates['power_level_counts']
+    sns.barplot(x=power_level_counts.index, y=power_level_counts.values, palette='viridis', ax=ax)
+    ax.set_title('Distribution of Character Power Levels', fontsize=16)
+    ax.set_xlabel('Power Level')
+    ax.set_ylabel('Count')
+
+
+def _draw_power_level_by_role(fig, aggregates, params):
+    ax = fig.subplots()
+    role_power_counts = aggregates['role_power_counts']
+    if not role_power_counts.empty:
+        role_power_counts.plot(kind='bar', stacked=True, colormap='viridis', ax=ax)
+        ax.legend(title='Power Level')
+    ax.set_title('Power Level Distribution by Role', fontsize=16)
+    ax.set_xlabel('Role')
+    ax.set_ylabel('Count')
+
+
+def _draw_power_wordcloud(fig, aggregates, params):
+    from wordcloud import WordCloud
+
+    # Filter with the precomputed frequency tables instead of rescanning text
+    power_terms = aggregates['power_terms']
+    role = params.get('role')
+    affiliation = params.get('affiliation')
+    if role and affiliation:
+        frequencies = power_terms['by_role_affiliation'].get((role, affiliation), {})
+    elif role:
+        frequencies = power_terms['by_role'].get(role, {})
+    elif affiliation:
+        frequencies = power_terms['by_affiliation'].get(affiliation, {})
+    else:
+        frequencies = power_terms['totals']
+
+    wordcloud = WordCloud(
+        width=int(params.get('width', 800)),
+        height=int(params.get('height', 400)),
+        background_color=params.get('background_color', 'white'),
+        max_words=int(params.get('max_words', 100)),
+        contour_width=3,
+        contour_color='steelblue'
+    ).generate_from_frequencies(frequencies or {'none': 1})
+
+    ax = fig.subplots()
+    ax.imshow(wordcloud, interpolation='bilinear')
+    ax.axis('off')
+    ax.set_title('Word Cloud of Marvel Character Powers', fontsize=20)
+
+
+# Chart name -> (drawing function, default figure size in inches, parameters
+# it reads); only those parameters are passed on and part of the cache key
+CHARTS = {
+    'role_distribution': (_draw_role_distribution, (10, 6), ()),
+    'role_pie': (_draw_role_pie, (8, 8), ()),
+    'affiliation_distribution': (_draw_affiliation_distribution, (12, 8), ('top_n',)),
+    'power_level_distribution': (_draw_power_level_distribution, (10, 6), ()),
+    'power_level_by_role': (_draw_power_level_by_role, (12, 8), ()),
+    'power_wordcloud': (_draw_power_wordcloud, (8, 4),
+                        ('width', 'height', 'max_words', 'background_color', 'role', 'affiliation')),
+}
+
+# Cached images kept by default; the least recently used are removed beyond it
+CACHE_MAX_FILES = 512
+
+
+def chart_params(chart_name, params):
+    """
+    Return the entries of ``params`` that ``chart_name`` reads.
+    """
+    used = CHARTS[chart_name][2] if chart_name in CHARTS else ()
+    return {key: (params or {})[key] for key in used if key in (params or {})}
+
+
+def render_chart(chart_name, aggregates, fmt='png', dpi=100, params=None):
+    """
+    Render a single chart to image bytes without touching pyplot.
+
+    Figures are created directly from ``matplotlib.figure.Figure`` and drawn
+    with the non-interactive Agg/SVG canvases, so this is safe to call from
+    servers, worker processes and threads.
+
+    Parameters:
+    -----------
+    chart_name : str
+        One of the keys of ``CHARTS``
+    aggregates : dict
+        Output of ``compute_chart_aggregates``
+    fmt : str, default='png'
+        Output format, 'png' or 'svg'
+    dpi : int, default=100
+        Resolution of raster output
+    params : dict, optional
+        Chart specific parameters (e.g. ``top_n``)
+
+    Returns:
+    --------
+    bytes
+        Encoded image
+    """
+    if chart_name not in CHARTS:
+        raise ValueError(f"Unknown chart '{chart_name}'. Available charts: {', '.join(CHARTS)}")
+    if fmt not in CHART_FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'. Use one of: {', '.join(CHART_FORMATS)}")
+
+    draw, figsize, _ = CHARTS[chart_name]
+    fig = Figure(figsize=figsize)
+    draw(fig, aggregates, chart_params(chart_name, params))
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, dpi=dpi, bbox_inches='tight')
+    return buffer.getvalue()
+
+
+def _init_worker():
+    # Worker processes never need a GUI backend
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+class ChartRenderer:
+    """
+    Headless chart rendering service with an on-disk cache.
+
+    Aggregates are computed once per dataset, charts are rendered in a
+    process pool, and every encoded image is cached under a key derived from
+    the dataset hash, chart name, format and the parameters the chart reads.
+    The cache holds at most ``max_files`` images; the least recently used
+    are pruned.
+    """
+
+    def __init__(self, cache_dir, max_workers=None, dpi=100, max_files=CACHE_MAX_FILES):
+        """
+        Initialize the chart renderer.
+
+        Parameters:
+        -----------
+        cache_dir : str
+            Directory used to store rendered images
+        max_workers : int, optional
+            Size of the rendering process pool (defaults to the CPU count)
+        dpi : int, default=100
+            Resolution of raster output
+        max_files : int, default=CACHE_MAX_FILES
+            Cached images kept before the least recently used are removed
+        """
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.dpi = dpi
+        self.max_files = max_files
+        self._executor = None
+        self._aggregates = {}  # dataset hash -> aggregates
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _get_aggregates(self, df, dataset_hash):
+        if dataset_hash not in self._aggregates:
+            # Only the aggregates of the current dataset are worth keeping
+            self._aggregates = {dataset_hash: compute_chart_aggregates(df)}
+        return self._aggregates[dataset_hash]
+
+    def _cache_path(self, dataset_hash, chart_name, fmt, params):
+        key = cache_key(RENDERER_VERSION, dataset_hash, chart_name, fmt, self.dpi, chart_params(chart_name, params))
+        return os.path.join(self.cache_dir, f"{chart_name}-{key[:24]}.{fmt}")
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker)
+        return self._executor
+
+    def render(self, df, chart_name, fmt='png', params=None, dataset_hash=None):
+        """
+        Render a chart, serving it from the cache when possible.
+
+        Parameters:
+        -----------
+        df : pandas.DataFrame
+            DataFrame containing Marvel character data
+        chart_name : str
+            One of the keys of ``CHARTS``
+        fmt : str, default='png'
+            Output format, 'png' or 'svg'
+        params : dict, optional
+            Chart specific parameters
+        dataset_hash : str, optional
+            Precomputed ``dataset_fingerprint`` of ``df``
+
+        Returns:
+        --------
+        bytes
+            Encoded image
+        """
+        dataset_hash = dataset_hash or dataset_fingerprint(df)
+        path = self._cache_path(dataset_hash, chart_name, fmt, params)
+        try:
+            with open(path, 'rb') as f:
+                image = f.read()
+            # Mark as recently used for pruning
+            os.utime(path)
+            return image
+        except FileNotFoundError:
+            pass
+
+        image = render_chart(chart_name, self._get_aggregates(df, dataset_hash), fmt, self.dpi, params)
+        atomic_write_bytes(path, image)
+        self.prune()
+        return image
+
+    def render_all(self, df, chart_names=None, fmt='png', params=None, dataset_hash=None):
+        """
+        Render a set of charts in parallel, skipping cached ones.
+
+        Parameters:
+        -----------
+        df : pandas.DataFrame
+            DataFrame containing Marvel character data
+        chart_names : list of str, optional
+            Charts to render (defaults to all charts)
+        fmt : str, default='png'
+            Output format, 'png' or 'svg'
+        params : dict, optional
+            Parameters applied to every chart
+        dataset_hash : str, optional
+            Precomputed ``dataset_fingerprint`` of ``df``
+
+        Returns:
+        --------
+        dict
+            Mapping of chart name to cache file path
+        """
+        dataset_hash = dataset_hash or dataset_fingerprint(df)
+        chart_names = list(chart_names or CHARTS)
+        paths = {name: self._cache_path(dataset_hash, name, fmt, params) for name in chart_names}
+
+        missing = [name for name, path in paths.items() if not os.path.exists(path)]
+        if missing:
+            aggregates = self._get_aggregates(df, dataset_hash)
+            executor = self._get_executor()
+            futures = {
+                name: executor.submit(render_chart, name, aggregates, fmt, self.dpi, params)
+                for name in missing
+            }
+            for name, future in futures.items():
+                atomic_write_bytes(paths[name], future.result())
+            self.prune()
+
+        return paths
+
+    def prune(self):
+        """
+        Remove the least recently used images beyond ``max_files``.
+        """
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.rsplit('.', 1)[-1] in CHART_FORMATS:
+                try:
+                    entries.append((entry.stat().st_mtime_ns, entry.path))
+                except FileNotFoundError:
+                    pass
+        if len(entries) <= self.max_files:
+            return self
+        entries.sort(reverse=True)
+        for _, path in entries[self.max_files:]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return self
+
+    def close(self):
+        """
+        Shut down the rendering process pool.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
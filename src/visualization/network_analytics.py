@@ -0,0 +1,352 @@
+import heapq
+import random
+
+import networkx as nx
+
+
+class NetworkAnalytics:
+    """
+    Cached graph analytics for the character affiliation network.
+
+    Every result is cached against the graph version; call ``invalidate``
+    whenever the graph changes, or ``apply_delta`` after a local change to
+    keep the degree rankings and components by updating them. Centrality metrics switch to sampled
+    approximations once the graph is larger than ``approximate_threshold``
+    nodes, because exact betweenness on clique-heavy affiliation graphs does
+    not scale.
+    """
+
+    def __init__(self, graph, approximate_threshold=2000, sample_size=256, seed=42):
+        """
+        Initialize the analytics layer.
+
+        Parameters:
+        -----------
+        graph : networkx.Graph
+            Graph to analyze
+        approximate_threshold : int, default=2000
+            Node count above which centralities are approximated
+        sample_size : int, default=256
+            Number of sampled source nodes for approximate centralities
+        seed : int, default=42
+            Random seed used for sampling and community detection
+        """
+        self.graph = graph
+        self.approximate_threshold = approximate_threshold
+        self.sample_size = sample_size
+        self.seed = seed
+        self.version = 0
+        self._cache = {}
+        self._component_of = None  # node -> cached component, kept by apply_delta
+
+    def invalidate(self):
+        """
+        Mark the graph as changed and drop every cached result.
+        """
+        self.version += 1
+        self._cache.clear()
+        self._component_of = None
+        return self
+
+    def apply_delta(self, changed=(), removed=()):
+        """
+        Update the cache after a local change instead of dropping it.
+
+        Degree rankings are re-ranked from their previous entries plus the
+        changed nodes; a ranking that can no longer be proven complete (a
+        node left it and an unseen one may take its place) is dropped and
+        recomputed on next use. Components are recomputed only over the
+        components the change touched. Centralities and communities are
+        global and are dropped.
+
+        Parameters:
+        -----------
+        changed : iterable, optional
+            Added nodes and both ends of every added or removed edge
+        removed : iterable, optional
+            Nodes removed from the graph
+        """
+        changed = {node for node in changed if node in self.graph}
+        removed = set(removed)
+        self.version += 1
+        if not changed and not removed:
+            # Attribute-only change: no cached result depends on it
+            return self
+
+        updated = {}
+        for key, value in self._cache.items():
+            if key[0] == 'degree':
+                ranking = self._update_ranking(value, key[1], changed, removed)
+                if ranking is not None:
+                    updated[key] = ranking
+            elif key[0] == 'components':
+                updated[key] = self._update_components(value, changed, removed)
+        self._cache = updated
+        return self
+
+    def _update_ranking(self, ranking, top_n, changed, removed):
+        # Nodes outside the old ranking that did not change have at most the
+        # old last degree; a complete old ranking (fewer nodes than top_n)
+        # leaves no such nodes
+        complete = len(ranking) < top_n
+        candidates = {node for node, _ in ranking if node not in removed} | changed
+        new = heapq.nlargest(top_n, ((node, self.graph.degree(node)) for node in candidates), key=lambda x: x[1])
+        if complete:
+            return new
+        if len(new) < min(top_n, self.graph.number_of_nodes()) or (new and new[-1][1] < ranking[-1][1]):
+            return None
+        return new
+
+    def _update_components(self, components, changed, removed):
+        # Edges only change next to changed nodes, so components without a
+        # changed or removed node are unaffected
+        if self._component_of is None:
+            self._component_of = {node: component for component in components for node in component}
+        touched = {id(self._component_of[node]) for node in changed | removed if node in self._component_of}
+        region = set(changed)
+        kept = []
+        for component in components:
+            if id(component) in touched:
+                region.update(component)
+            else:
+                kept.append(component)
+        region -= removed
+        for node in removed:
+            self._component_of.pop(node, None)
+
+        rebuilt = self._region_components(region)
+        for component in rebuilt:
+            for node in component:
+                self._component_of[node] = component
+        return sorted(kept + rebuilt, key=len, reverse=True)
+
+    def _region_components(self, region):
+        # Components of a node set no edge leaves; the search stops as soon
+        # as every node is assigned, so a clique costs one adjacency scan
+        remaining = set(region)
+        components = []
+        while remaining:
+            start = remaining.pop()
+            component = [start]
+            frontier = [start]
+            while frontier and remaining:
+                for neighbor in self.graph.adj[frontier.pop()]:
+                    if neighbor in remaining:
+                        remaining.remove(neighbor)
+                        component.append(neighbor)
+                        frontier.append(neighbor)
+            components.append(component)
+        return components
+
+    def check_cache(self):
+        """
+        Compare cached degree rankings and components with fresh results.
+
+        Returns:
+        --------
+        list
+            Descriptions of the differences (empty when consistent)
+        """
+        problems = []
+        for key, value in self._cache.items():
+            if key[0] == 'degree':
+                fresh = heapq.nlargest(key[1], self.graph.degree(), key=lambda x: x[1])
+                if [degree for _, degree in value] != [degree for _, degree in fresh]:
+                    problems.append(f"cached top {key[1]} degree ranking differs")
+                elif any(self.graph.degree(node) != degree for node, degree in value if node in self.graph):
+                    problems.append(f"cached top {key[1]} degree ranking has stale degrees")
+            elif key[0] == 'components':
+                fresh = {frozenset(c) for c in nx.connected_components(self.graph)}
+                if {frozenset(c) for c in value} != fresh:
+                    problems.append("cached components differ")
+        return problems
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def _use_approximation(self, approximate):
+        if approximate is None:
+            return self.graph.number_of_nodes() > self.approximate_threshold
+        return approximate
+
+    @staticmethod
+    def _top(scores, top_n):
+        # Partial selection: O(N log k) instead of sorting every node
+        if top_n is None:
+            return sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        return heapq.nlargest(top_n, scores.items(), key=lambda x: x[1])
+
+    def top_degree(self, top_n=10):
+        """
+        Get the characters with the most connections.
+
+        Parameters:
+        -----------
+        top_n : int, default=10
+            Number of characters to return
+
+        Returns:
+        --------
+        list
+            List of tuples (character_name, connection_count)
+        """
+        # A cached longer ranking also answers shorter requests
+        for key, ranking in self._cache.items():
+            if key[0] == 'degree' and key[1] >= top_n:
+                return ranking[:top_n]
+
+        ranking = self._cached(
+            ('degree', top_n),
+            lambda: heapq.nlargest(top_n, self.graph.degree(), key=lambda x: x[1])
+        )
+        return list(ranking)
+
+    def betweenness(self, top_n=None, approximate=None):
+        """
+        Get betweenness centrality scores.
+
+        Parameters:
+        -----------
+        top_n : int, optional
+            Only return the highest scoring characters
+        approximate : bool, optional
+            Force (True) or disable (False) source sampling; by default
+            sampling is used above ``approximate_threshold`` nodes
+
+        Returns:
+        --------
+        list
+            List of tuples (character_name, score), highest first
+        """
+        approximate = self._use_approximation(approximate)
+
+        def compute():
+            k = None
+            if approximate:
+                k = min(self.sample_size, self.graph.number_of_nodes())
+            return nx.betweenness_centrality(self.graph, k=k, seed=self.seed)
+
+        scores = self._cached(('betweenness', approximate), compute)
+        return self._top(scores, top_n)
+
+    def closeness(self, top_n=None, approximate=None):
+        """
+        Get closeness centrality scores.
+
+        The approximation runs a BFS from sampled pivots (at least one per
+        connected component, the rest spread proportionally to component
+        size) and extrapolates each node's distance sum from the pivots.
+
+        Parameters:
+        -----------
+        top_n : int, optional
+            Only return the highest scoring characters
+        approximate : bool, optional
+            Force (True) or disable (False) pivot sampling; by default
+            sampling is used above ``approximate_threshold`` nodes
+
+        Returns:
+        --------
+        list
+            List of tuples (character_name, score), highest first
+        """
+        approximate = self._use_approximation(approximate)
+
+        def compute():
+            if not approximate:
+                return nx.closeness_centrality(self.graph)
+            return self._approximate_closeness()
+
+        scores = self._cached(('closeness', approximate), compute)
+        return self._top(scores, top_n)
+
+    def _approximate_closeness(self):
+        n = self.graph.number_of_nodes()
+        scores = {}
+        if n <= 1:
+            return {node: 0.0 for node in self.graph.nodes}
+
+        rng = random.Random(self.seed)
+        for component in self.connected_components():
+            size = len(component)
+            if size == 1:
+                scores[component[0]] = 0.0
+                continue
+
+            n_pivots = min(size, max(1, round(self.sample_size * size / n)))
+            pivots = rng.sample(component, n_pivots)
+
+            distance_sums = dict.fromkeys(component, 0)
+            pivot_counts = dict.fromkeys(component, 0)
+            for pivot in pivots:
+                for node, distance in nx.single_source_shortest_path_length(self.graph, pivot).items():
+                    if node != pivot:
+                        distance_sums[node] += distance
+                        pivot_counts[node] += 1
+
+            for node in component:
+                if pivot_counts[node] == 0:
+                    # Only reached by itself: the single pivot of its component
+                    distance_sums[node] = sum(nx.single_source_shortest_path_length(self.graph, node).values())
+                    pivot_counts[node] = size - 1
+                estimated_sum = distance_sums[node] * (size - 1) / pivot_counts[node]
+                # Same normalization as networkx (wf_improved=True)
+                scores[node] = (size - 1) ** 2 / (estimated_sum * (n - 1)) if estimated_sum > 0 else 0.0
+
+        return scores
+
+    def connected_components(self):
+        """
+        Get connected components, largest first.
+
+        Returns:
+        --------
+        list
+            List of lists of character names
+        """
+        return self._cached(
+            ('components',),
+            lambda: sorted((list(c) for c in nx.connected_components(self.graph)), key=len, reverse=True)
+        )
+
+    def communities(self, method='louvain'):
+        """
+        Detect communities of characters.
+
+        Parameters:
+        -----------
+        method : str, default='louvain'
+            'louvain' for modularity optimization or 'label_propagation'
+            for a faster, near-linear alternative on very large graphs
+
+        Returns:
+        --------
+        list
+            List of lists of character names, largest first
+        """
+        def compute():
+            if method == 'louvain':
+                found = nx.community.louvain_communities(self.graph, seed=self.seed)
+            elif method == 'label_propagation':
+                found = nx.community.label_propagation_communities(self.graph)
+            else:
+                raise ValueError(f"Unknown community detection method '{method}'.")
+            return sorted((list(c) for c in found), key=len, reverse=True)
+
+        return self._cached(('communities', method), compute)
+
+    def summary(self):
+        """
+        Return headline statistics about the graph.
+        """
+        components = self.connected_components()
+        return {
+            'version': self.version,
+            'nodes': self.graph.number_of_nodes(),
+            'edges': self.graph.number_of_edges(),
+            'components': len(components),
+            'largest_component': len(components[0]) if components else 0,
+            'approximate': self._use_approximation(None),
+        }
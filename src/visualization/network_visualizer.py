@@ -1,13 +1,27 @@
 import networkx as nx
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 import json
 import os
+import random
+
+from src.visualization.network_analytics import NetworkAnalytics
+
+# Node attributes ``update_character`` can change
+NODE_ATTRIBUTES = ('role', 'affiliation', 'power_level')
 
 class MarvelNetworkVisualizer:
     """
     Class for creating and visualizing network graphs of Marvel characters
     based on their affiliations and other relationships.
+    
+    After ``create_affiliation_network``, characters can be added, updated
+    and removed one at a time: only the affected affiliation groups are
+    touched and the cached analytics are updated from the delta. These
+    updates assume character names are unique (as after ``clean_data``)
+    and do not modify ``df``; ``to_dataframe`` returns the current
+    characters.
     """
     
     def __init__(self, df=None):
@@ -22,6 +36,8 @@ class MarvelNetworkVisualizer:
         self.df = df
         self.graph = nx.Graph()
         self.pos = None  # Node positions for visualization
+        self.groups = {}  # affiliation -> {character: None}, in insertion order
+        self.analytics = NetworkAnalytics(self.graph)  # Cached per graph version
     
     def load_data(self, df):
         """
@@ -35,10 +51,16 @@ class MarvelNetworkVisualizer:
         self.df = df
         return self
     
-    def create_affiliation_network(self):
+    def create_affiliation_network(self, compute_layout=True):
         """
         Create a network graph where characters are connected if they
         share the same affiliation.
+        
+        Parameters:
+        -----------
+        compute_layout : bool, default=True
+            Compute the spring layout used by ``visualize_network``; servers
+            that only query the graph can skip this cost
         """
         if self.df is None:
             raise ValueError("No data loaded. Please load data first.")
@@ -56,9 +78,12 @@ class MarvelNetworkVisualizer:
             )
         
         # Add edges (shared affiliations)
+        self.groups = {}
         affiliations = self.df['Affiliation'].unique()
         for affiliation in affiliations:
             chars_in_affiliation = self.df[self.df['Affiliation'] == affiliation]['Character'].tolist()
+            if chars_in_affiliation:
+                self.groups[affiliation] = dict.fromkeys(chars_in_affiliation)
             for i in range(len(chars_in_affiliation)):
                 for j in range(i+1, len(chars_in_affiliation)):
                     self.graph.add_edge(
@@ -67,11 +92,203 @@ class MarvelNetworkVisualizer:
                         affiliation=affiliation
                     )
         
+        # Cached analytics belong to the previous graph
+        self.analytics.invalidate()
+        
         # Calculate node positions for visualization
-        self.pos = nx.spring_layout(self.graph, seed=42)
+        self.pos = nx.spring_layout(self.graph, seed=42) if compute_layout else None
+        
+        return self
+    
+    def _join_group(self, name, affiliation):
+        # Connect a character to its affiliation group; returns the members
+        if pd.isna(affiliation):
+            return set()
+        members = self.groups.setdefault(affiliation, {})
+        self.graph.add_edges_from((name, member, {'affiliation': affiliation}) for member in members)
+        members[name] = None
+        return set(members)
+    
+    def _leave_group(self, name, affiliation):
+        # Disconnect a character from its affiliation group; returns the members
+        members = self.groups.get(affiliation) if not pd.isna(affiliation) else None
+        if not members or name not in members:
+            return set()
+        del members[name]
+        if name in self.graph:
+            self.graph.remove_edges_from((name, member) for member in members)
+        if not members:
+            del self.groups[affiliation]
+        return set(members) | {name}
+    
+    def _place(self, name, affiliation):
+        # Position a new node next to its group instead of re-running the layout
+        if self.pos is None:
+            return
+        rng = random.Random(name)
+        members = [member for member in self.groups.get(affiliation, ()) if member in self.pos]
+        if members:
+            center = np.mean([self.pos[member] for member in members], axis=0)
+            self.pos[name] = center + np.array([rng.uniform(-0.05, 0.05), rng.uniform(-0.05, 0.05)])
+        else:
+            self.pos[name] = np.array([rng.uniform(-1, 1), rng.uniform(-1, 1)])
+    
+    def add_character(self, name, role=None, affiliation=None, power_level='Low'):
+        """
+        Add a character to the network without rebuilding it.
+        
+        The character is connected to the members of its affiliation group
+        and nothing else is touched; cached analytics are updated from the
+        changed degrees. Adding a name that is already in the network
+        updates it instead.
+        
+        Parameters:
+        -----------
+        name : str
+            Character name
+        role : str, optional
+            Character role
+        affiliation : str, optional
+            Affiliation; characters without one have no connections
+        power_level : str, default='Low'
+            Estimated power level
+        """
+        if name in self.graph:
+            return self.update_character(name, role=role, affiliation=affiliation, power_level=power_level)
+        
+        self.graph.add_node(name, role=role, affiliation=affiliation, power_level=power_level)
+        changed = self._join_group(name, affiliation) | {name}
+        self._place(name, affiliation)
+        self.analytics.apply_delta(changed)
+        
+        return self
+    
+    def update_character(self, name, **changes):
+        """
+        Change attributes of a character in place.
+        
+        A new affiliation moves the character between the two affiliation
+        groups; other attributes only change the node.
+        
+        Parameters:
+        -----------
+        name : str
+            Character name
+        **changes
+            New values for 'role', 'affiliation' and/or 'power_level'
+        """
+        if name not in self.graph:
+            raise ValueError(f"Character '{name}' not found in the graph.")
+        unknown = set(changes) - set(NODE_ATTRIBUTES)
+        if unknown:
+            raise ValueError(f"Unknown attributes {sorted(unknown)}. Expected some of {list(NODE_ATTRIBUTES)}.")
+        
+        attributes = self.graph.nodes[name]
+        changed = set()
+        if 'affiliation' in changes:
+            old, new = attributes['affiliation'], changes['affiliation']
+            if not (old == new or (pd.isna(old) and pd.isna(new))):
+                changed = self._leave_group(name, old) | self._join_group(name, new) | {name}
+        attributes.update(changes)
+        if changed and self.pos is not None:
+            self.pos.pop(name, None)
+            self._place(name, changes['affiliation'])
+        self.analytics.apply_delta(changed)
+        
+        return self
+    
+    def change_affiliation(self, name, affiliation):
+        """
+        Move a character to another affiliation.
+        
+        Parameters:
+        -----------
+        name : str
+            Character name
+        affiliation : str
+            New affiliation
+        """
+        return self.update_character(name, affiliation=affiliation)
+    
+    def remove_character(self, name):
+        """
+        Remove a character and its connections from the network.
+        
+        Parameters:
+        -----------
+        name : str
+            Character name
+        """
+        if name not in self.graph:
+            raise ValueError(f"Character '{name}' not found in the graph.")
+        
+        changed = self._leave_group(name, self.graph.nodes[name]['affiliation']) - {name}
+        self.graph.remove_node(name)
+        if self.pos is not None:
+            self.pos.pop(name, None)
+        self.analytics.apply_delta(changed, removed={name})
         
         return self
     
+    def to_dataframe(self):
+        """
+        Return the characters currently in the network.
+        
+        Returns:
+        --------
+        pandas.DataFrame
+            'Character', 'Role', 'Affiliation' and 'Estimated_Power_Level'
+            columns, in node order
+        """
+        nodes = self.graph.nodes(data=True)
+        return pd.DataFrame({
+            'Character': [node for node, _ in nodes],
+            'Role': [data['role'] for _, data in nodes],
+            'Affiliation': [data['affiliation'] for _, data in nodes],
+            'Estimated_Power_Level': [data['power_level'] for _, data in nodes],
+        })
+    
+    def check_consistency(self, df=None):
+        """
+        Compare the network with a full rebuild.
+        
+        Parameters:
+        -----------
+        df : pandas.DataFrame, optional
+            Data the network should match (defaults to ``to_dataframe()``,
+            which checks the edges and cached analytics against the nodes)
+        
+        Returns:
+        --------
+        list
+            Descriptions of the differences (empty when consistent)
+        """
+        rebuilt = MarvelNetworkVisualizer(self.to_dataframe() if df is None else df)
+        rebuilt.create_affiliation_network(compute_layout=False)
+        
+        def normalized(value):
+            return None if pd.isna(value) else value
+        
+        def node_table(graph):
+            return {node: tuple(normalized(data[key]) for key in NODE_ATTRIBUTES)
+                    for node, data in graph.nodes(data=True)}
+        
+        def edge_table(graph):
+            return {frozenset((u, v)): data['affiliation'] for u, v, data in graph.edges(data=True)}
+        
+        problems = []
+        if node_table(self.graph) != node_table(rebuilt.graph):
+            problems.append("nodes differ from a full rebuild")
+        if edge_table(self.graph) != edge_table(rebuilt.graph):
+            problems.append("edges differ from a full rebuild")
+        groups = {affiliation: set(members) for affiliation, members in self.groups.items()}
+        if groups != {affiliation: set(members) for affiliation, members in rebuilt.groups.items()}:
+            problems.append("affiliation groups differ from a full rebuild")
+        if self.pos is not None and set(self.pos) != set(self.graph.nodes):
+            problems.append("layout positions do not match the nodes")
+        problems.extend(self.analytics.check_cache())
+        return problems
+        
     def visualize_network(self, figsize=(16, 12), save_path=None):
         """
         Visualize the character network.
@@ -86,6 +303,9 @@ class MarvelNetworkVisualizer:
         if len(self.graph.nodes) == 0:
             raise ValueError("Graph is empty. Create a network first.")
         
+        if self.pos is None:
+            self.pos = nx.spring_layout(self.graph, seed=42)
+        
         # Create figure
         plt.figure(figsize=figsize)
         
@@ -209,10 +429,5 @@ class MarvelNetworkVisualizer:
         if len(self.graph.nodes) == 0:
             raise ValueError("Graph is empty. Create a network first.")
         
-        # Get degree (connection count) for each character
-        degree_dict = dict(self.graph.degree())
-        
-        # Sort by degree (descending) and get top N
-        sorted_characters = sorted(degree_dict.items(), key=lambda x: x[1], reverse=True)[:top_n]
-        
-        return sorted_characters
\ No newline at end of file
+        # Heap-based partial ranking, cached until the graph changes
+        return self.analytics.top_degree(top_n)
\ No newline at end of file
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Import ``src`` from the project root, as the benchmarks do
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+# Bundled character data used by the tests
+DATA_PATH = os.path.join(project_root, 'data', 'marvel_characters_dataset.csv')
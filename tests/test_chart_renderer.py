@@ -0,0 +1,40 @@
+"""
+The chart cache must only grow with parameters a chart actually reads, and
+stay within its size bound.
+"""
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import DATA_PATH
+from src.visualization.chart_renderer import ChartRenderer
+
+
+@pytest.fixture(scope='module')
+def df():
+    return pd.read_csv(DATA_PATH)
+
+
+def test_ignored_params_share_a_cache_entry(df, tmp_path):
+    renderer = ChartRenderer(str(tmp_path))
+
+    renderer.render(df, 'role_pie', params={'width': 300})
+    renderer.render(df, 'role_pie', params={'width': 400, 'role': 'Hero'})
+    renderer.render(df, 'role_pie')
+
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_cache_keeps_most_recently_used(df, tmp_path):
+    renderer = ChartRenderer(str(tmp_path), max_files=2)
+
+    first = renderer._cache_path('hash', 'affiliation_distribution', 'svg', {'top_n': 1})
+    for top_n in (1, 2, 3):
+        renderer.render(df, 'affiliation_distribution', 'svg', {'top_n': top_n}, dataset_hash='hash')
+        os.utime(renderer._cache_path('hash', 'affiliation_distribution', 'svg', {'top_n': top_n}),
+                 ns=(top_n * 10**9, top_n * 10**9))
+    renderer.render(df, 'affiliation_distribution', 'svg', {'top_n': 4}, dataset_hash='hash')
+
+    assert len(os.listdir(tmp_path)) == 2
+    assert not os.path.exists(first)
@@ -0,0 +1,67 @@
+"""
+Compiled forests must predict exactly what the scikit-learn models they
+were compiled from predict.
+"""
+import numpy as np
+import pytest
+
+from conftest import DATA_PATH
+from src.models.compiled_forest import CompiledPowerPredictor
+from src.models.power_predictor import PowerPredictor
+from src.models.role_predictor import RolePredictor
+from src.preprocessing.data_processor import MarvelDataProcessor
+
+# Same tolerance as check_parity
+ATOL = 1e-12
+
+
+@pytest.fixture(scope='module')
+def df():
+    df = MarvelDataProcessor(data_path=DATA_PATH).fill_missing().get_processed_data()
+    if 'Hero/Villain' not in df.columns:
+        df['Hero/Villain'] = df['Role']
+    return MarvelDataProcessor(df=df).estimate_power_levels().get_processed_data()
+
+
+@pytest.fixture(scope='module')
+def power(df):
+    predictor = PowerPredictor()
+    predictor.train(df)
+    return predictor
+
+
+def test_power_regressor_matches_sklearn(df, power):
+    compiled = power.compile()
+
+    np.testing.assert_allclose(compiled.predict(df), power.predict(df), rtol=0, atol=ATOL)
+    X = power.scaler.transform(power.encode_features(df).reindex(columns=power.feature_names, fill_value=0))
+    np.testing.assert_allclose(compiled.forest.predict(X), power.model.predict(X), rtol=0, atol=ATOL)
+
+
+def test_power_levels_match_sklearn(power):
+    compiled = power.compile()
+    pairs = [(role, tier) for role in ('Hero', 'Villain', 'Antihero') for tier in ('Low', 'Medium', 'High')]
+
+    expected = [power.predict_power_level(*pair) for pair in pairs]
+    np.testing.assert_allclose([compiled.predict_power_level(*pair) for pair in pairs], expected, rtol=0, atol=ATOL)
+    np.testing.assert_allclose(compiled.predict_power_levels(*zip(*pairs)), expected, rtol=0, atol=ATOL)
+
+
+def test_saved_power_predictor_matches_sklearn(df, power, tmp_path):
+    power.compile().save(str(tmp_path))
+
+    reloaded = CompiledPowerPredictor.load(str(tmp_path))
+
+    np.testing.assert_allclose(reloaded.predict(df), power.predict(df), rtol=0, atol=ATOL)
+
+
+def test_role_classifier_matches_sklearn(df):
+    processor = MarvelDataProcessor(df=df).vectorize_powers(min_df=1)
+    X = processor.get_tfidf_matrix()
+    role = RolePredictor()
+    role.train(X, df['Role'].astype(str).values)
+
+    compiled = role.compile()
+
+    np.testing.assert_array_equal(compiled.predict(X), role.predict(X))
+    np.testing.assert_allclose(compiled.predict_proba(X), role.predict_proba(X), rtol=0, atol=ATOL)
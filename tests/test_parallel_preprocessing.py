@@ -0,0 +1,52 @@
+"""
+The process-pool preprocessing paths must give the same results as the
+serial ones.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import DATA_PATH
+from src.preprocessing.compact_tfidf import CompactTfidf
+from src.preprocessing.data_processor import POWERS_STOP_WORDS, estimate_power_level
+from src.preprocessing.parallel import fit_tfidf, map_text
+
+
+@pytest.fixture(scope='module')
+def df():
+    return pd.read_csv(DATA_PATH)
+
+
+@pytest.mark.parametrize('column, func, na_value', [
+    ('Character', str.title, np.nan),
+    ('Real Name', str.title, np.nan),
+    ('Powers', estimate_power_level, 'Low'),
+])
+def test_map_text_matches_serial(df, column, func, na_value):
+    series = df[column].copy()
+    series.iloc[3] = np.nan
+    expected = series.apply(lambda value: func(value) if isinstance(value, str) else na_value)
+
+    result = map_text(series, func, n_jobs=2, na_value=na_value)
+
+    pd.testing.assert_series_equal(result, expected)
+
+
+@pytest.mark.parametrize('min_df, max_df, max_features', [
+    (1, 1.0, None),
+    (2, 1.0, None),
+    (0.05, 0.5, None),
+    (1, 0.9, 10),
+    (0.02, 1.0, 25),
+])
+def test_fit_tfidf_matches_serial(df, min_df, max_df, max_features):
+    powers = df['Powers'].fillna('')
+    params = {'stop_words': POWERS_STOP_WORDS, 'min_df': min_df, 'max_df': max_df, 'max_features': max_features}
+    serial = CompactTfidf.fit(powers, **params)
+
+    parallel = fit_tfidf(powers, n_jobs=2, **params)
+
+    assert parallel.shape == serial.shape
+    np.testing.assert_array_equal(parallel.get_feature_names_out(), serial.get_feature_names_out())
+    for name in ('data', 'indices', 'indptr', 'idf'):
+        np.testing.assert_array_equal(getattr(parallel, name), getattr(serial, name), err_msg=name)
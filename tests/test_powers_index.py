@@ -0,0 +1,48 @@
+"""
+Every row of the dataset must be searchable in the powers index, including
+rows that share a character name.
+"""
+import pandas as pd
+
+from conftest import DATA_PATH
+from src.preprocessing.powers_index import PowersSearchIndex
+
+
+def test_duplicate_names_are_all_indexed():
+    df = pd.DataFrame({
+        'Character': ['black widow', 'hulk', 'black widow'],
+        'Powers': ['Espionage', 'Superhuman strength', 'Rocket science'],
+        'Role': ['Hero', 'Hero', 'Hero'],
+    })
+
+    index = PowersSearchIndex.from_dataframe(df)
+
+    assert len(index) == 3
+    assert [r['name'] for r in index.search('espionage')] == ['black widow']
+    assert [r['name'] for r in index.search('rocket')] == ['black widow']
+
+
+def test_duplicate_names_survive_compaction():
+    df = pd.DataFrame({
+        'Character': ['a', 'b', 'a', 'c'],
+        'Powers': ['flight', 'telepathy', 'espionage', 'speed'],
+    })
+    index = PowersSearchIndex.from_dataframe(df)
+
+    index.remove_character(1)
+    index.compact()
+    index.update_character('a', 'invisibility', key=2)
+
+    assert len(index) == 3
+    assert [r['name'] for r in index.search('flight')] == ['a']
+    assert [r['name'] for r in index.search('invisibility')] == ['a']
+    assert index.search('espionage') == []
+
+
+def test_bundled_dataset_indexes_every_row():
+    df = pd.read_csv(DATA_PATH)
+
+    index = PowersSearchIndex.from_dataframe(df)
+
+    assert len(index) == len(df)
+    assert index.search('espionage')
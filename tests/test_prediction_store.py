@@ -0,0 +1,48 @@
+"""
+Compaction of the prediction history must never lose or double-count a
+prediction, including after an interrupted run.
+"""
+import json
+import os
+
+from src.utils.prediction_store import PredictionStore
+
+
+def write_prediction(storage_dir, i):
+    record = {
+        'timestamp': f'2025-08-01T12:00:0{i}',
+        'request': {'strength': i + 1},
+        'result': {'powerLevel': float(i + 1), 'powerCategory': 'Low'},
+    }
+    with open(os.path.join(storage_dir, f'power_prediction_{i}.json'), 'w') as f:
+        json.dump(record, f)
+
+
+def test_compact_counts_each_prediction_once(tmp_path):
+    store = PredictionStore(str(tmp_path))
+    for i in range(3):
+        write_prediction(str(tmp_path), i)
+
+    store.compact()
+
+    assert store.stats()['count'] == 3
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.json')]
+
+
+def test_interrupted_compaction_then_keep_originals(tmp_path, monkeypatch):
+    store = PredictionStore(str(tmp_path))
+    write_prediction(str(tmp_path), 0)
+    write_prediction(str(tmp_path), 1)
+
+    # Interrupted after the manifest is written, before the originals are deleted
+    monkeypatch.setattr(PredictionStore, '_finish_pending_deletes', lambda self, manifest: 0)
+    store.compact()
+    monkeypatch.undo()
+
+    write_prediction(str(tmp_path), 2)
+    store.compact(delete_originals=False)
+    assert store.stats()['count'] == 3
+
+    store.compact()
+    assert store.stats()['count'] == 3
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith('.json')) == ['power_prediction_2.json']
@@ -0,0 +1,32 @@
+"""
+Snapshot loads keep low-cardinality columns categorical and still go through
+the same cleaning as a CSV load.
+"""
+import numpy as np
+import pandas as pd
+
+from conftest import DATA_PATH
+from src.preprocessing.data_processor import MarvelDataProcessor
+from src.preprocessing.snapshot import open_snapshot, write_snapshot
+
+
+def test_auto_categorical_skips_near_unique_columns(tmp_path):
+    df = pd.read_csv(DATA_PATH)
+    write_snapshot(df, str(tmp_path / 'snapshot'))
+
+    loaded = open_snapshot(str(tmp_path / 'snapshot')).to_dataframe(categorical='auto')
+
+    assert isinstance(loaded['Role'].dtype, pd.CategoricalDtype)
+    assert not isinstance(loaded['Character'].dtype, pd.CategoricalDtype)
+    assert loaded.astype(object).equals(df.astype(object))
+
+
+def test_fill_missing_on_categorical_snapshot(tmp_path):
+    df = pd.read_csv(DATA_PATH)
+    df.loc[3, 'Role'] = np.nan
+    write_snapshot(df, str(tmp_path / 'snapshot'))
+
+    processor = MarvelDataProcessor(str(tmp_path / 'snapshot')).fill_missing()
+
+    assert processor.df.loc[3, 'Role'] == ''
+    assert processor.df['Role'].isna().sum() == 0